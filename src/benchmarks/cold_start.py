@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent import futures
+from typing import Any, Dict, List, NamedTuple
+
+import grpc
+from benchmarks.load import git_commit
+from google.protobuf import descriptor_pb2, descriptor_pool
+from grpc_reflection.v1alpha import reflection, reflection_pb2, reflection_pb2_grpc
+from grpc_requests.aio import AsyncClient
+from grpc_requests.client import LAZY_METHODS, Client
+from grpc_requests.descriptor_cache import DescriptorCache
+
+"""
+cold_start
+
+Benchmark of the time a new reflection client takes to make its first call. A
+server generated from synthetic schemas, with many services importing a deep graph
+of shared files, is served with reflection. Every run starts a fresh process, times
+the client creation and its first call, and reports the number of reflection streams
+and requests the server received, the number of files registered and the resident
+memory the process kept once the client was closed, mostly the descriptor pool.
+
+Modes are eager registration, lazy=True, lazy="method" and eager registration from
+a warm DescriptorCache, each with the sync and async clients.
+
+Run from the src directory:
+
+    python -m benchmarks.cold_start --services 200 --depth 10 --output cold.json
+"""
+
+PACKAGE = "coldstart"
+MODES = ("eager", "lazy", "lazy_methods", "cached")
+CLIENTS = ("sync", "aio")
+TYPE_MESSAGE = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+TYPE_STRING = descriptor_pb2.FieldDescriptorProto.TYPE_STRING
+LABEL_OPTIONAL = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+
+
+class Schema(NamedTuple):
+    """
+    :param services: Number of services, each defined in its own file.
+    :param methods: Number of methods of each service.
+    :param depth: Number of levels of shared files below the service files.
+    :param width: Number of files per level, each importing every file of the
+        level below it.
+    """
+
+    services: int
+    methods: int
+    depth: int
+    width: int
+
+    def service_name(self, index: int) -> str:
+        return f"{PACKAGE}.Service{index}"
+
+
+def _message(name: str, fields: List[str]) -> descriptor_pb2.DescriptorProto:
+    message = descriptor_pb2.DescriptorProto(name=name)
+    message.field.add(name="name", number=1, type=TYPE_STRING, label=LABEL_OPTIONAL)
+    for number, type_name in enumerate(fields, start=2):
+        message.field.add(
+            name=f"field{number}",
+            number=number,
+            type=TYPE_MESSAGE,
+            type_name=f".{PACKAGE}.{type_name}",
+            label=LABEL_OPTIONAL,
+        )
+    return message
+
+
+def _common_file(level: int, index: int) -> str:
+    return f"{PACKAGE}/common_{level}_{index}.proto"
+
+
+def generate_files(schema: Schema) -> List[descriptor_pb2.FileDescriptorProto]:
+    """FileDescriptorProtos of the schema, each after the files it imports."""
+    files = []
+    below: List[int] = []
+    for level in range(schema.depth):
+        for index in range(schema.width):
+            file = descriptor_pb2.FileDescriptorProto(
+                name=_common_file(level, index),
+                package=PACKAGE,
+                syntax="proto3",
+                dependency=[_common_file(level - 1, i) for i in below],
+            )
+            file.message_type.append(
+                _message(
+                    f"Common{level}x{index}", [f"Common{level - 1}x{i}" for i in below]
+                )
+            )
+            files.append(file)
+        below = list(range(schema.width))
+    top = [f"Common{schema.depth - 1}x{i}" for i in below]
+    for index in range(schema.services):
+        file = descriptor_pb2.FileDescriptorProto(
+            name=f"{PACKAGE}/service_{index}.proto",
+            package=PACKAGE,
+            syntax="proto3",
+            dependency=[_common_file(schema.depth - 1, i) for i in below],
+        )
+        file.message_type.append(_message(f"Request{index}", top))
+        file.message_type.append(_message(f"Reply{index}", top))
+        service = file.service.add(name=f"Service{index}")
+        for method in range(schema.methods):
+            service.method.add(
+                name=f"Method{method}",
+                input_type=f".{PACKAGE}.Request{index}",
+                output_type=f".{PACKAGE}.Reply{index}",
+            )
+        files.append(file)
+    return files
+
+
+class CountingReflectionServicer(reflection.ReflectionServicer):
+    """Reflection servicer counting the streams and requests it receives."""
+
+    def __init__(self, service_names, pool, streams, requests):
+        super().__init__(service_names, pool=pool)
+        self._streams = streams
+        self._requests = requests
+
+    def _count(self, request_iterator):
+        for request in request_iterator:
+            with self._requests.get_lock():
+                self._requests.value += 1
+            yield request
+
+    def ServerReflectionInfo(self, request_iterator, context):
+        with self._streams.get_lock():
+            self._streams.value += 1
+        return super().ServerReflectionInfo(self._count(request_iterator), context)
+
+
+def serve(port: str, schema: Schema, streams, requests):
+    pool = descriptor_pool.DescriptorPool()
+    # clients register the reflection service as well
+    pool.AddSerializedFile(reflection_pb2.DESCRIPTOR.serialized_pb)
+    for file in generate_files(schema):
+        pool.Add(file)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    service_names = []
+    for index in range(schema.services):
+        service_name = schema.service_name(index)
+        service_names.append(service_name)
+        # without serializers requests and replies are bytes, b"" is an empty reply
+        handlers = {
+            f"Method{method}": grpc.unary_unary_rpc_method_handler(
+                lambda request, context: b""
+            )
+            for method in range(schema.methods)
+        }
+        server.add_generic_rpc_handlers(
+            (grpc.method_handlers_generic_handler(service_name, handlers),)
+        )
+    service_names.append(reflection.SERVICE_NAME)
+    servicer = CountingReflectionServicer(service_names, pool, streams, requests)
+    reflection_pb2_grpc.add_ServerReflectionServicer_to_server(servicer, server)
+    server.add_insecure_port(f"[::]:{port}")
+    server.start()
+    server.wait_for_termination()
+
+
+def rss_bytes() -> int:
+    """Resident memory of the process, or its peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def client_kwargs(mode: str, cache_directory: str) -> Dict[str, Any]:
+    if mode == "lazy":
+        return {"lazy": True}
+    if mode == "lazy_methods":
+        return {"lazy": LAZY_METHODS}
+    if mode == "cached":
+        return {"descriptor_cache": DescriptorCache(cache_directory)}
+    return {}
+
+
+async def _first_async_call(endpoint: str, mode: str, kwargs, service: str):
+    if mode in ("eager", "cached"):
+        client = await AsyncClient.create(endpoint, **kwargs)
+    else:
+        client = AsyncClient(endpoint, **kwargs)
+    created = time.perf_counter()
+    await client.request(service, "Method0", {"name": "cold"})
+    await client.channel.close()
+    return created
+
+
+def first_call(
+    client: str, mode: str, endpoint: str, schema: Schema, cache_directory: str, results
+):
+    """Run in a fresh process: create a client and make its first call."""
+    pool = descriptor_pool.DescriptorPool()
+    kwargs = client_kwargs(mode, cache_directory)
+    kwargs["descriptor_pool"] = pool
+    service = schema.service_name(0)
+    gc.collect()
+    rss = rss_bytes()
+    start = time.perf_counter()
+    if client == "sync":
+        sync_client = Client(endpoint, **kwargs)
+        created = time.perf_counter()
+        sync_client.request(service, "Method0", {"name": "cold"})
+        sync_client.channel.close()
+    else:
+        created = asyncio.run(_first_async_call(endpoint, mode, kwargs, service))
+    end = time.perf_counter()
+    gc.collect()
+    registered = 0
+    for file in generate_files(schema):
+        try:
+            pool.FindFileByName(file.name)
+        except KeyError:
+            continue
+        registered += 1
+    results.put(
+        {
+            "create_seconds": created - start,
+            "first_call_seconds": end - start,
+            "files_registered": registered,
+            "retained_bytes": rss_bytes() - rss,
+        }
+    )
+
+
+def run_case(context, args, schema: Schema, client: str, mode: str, counters):
+    streams, requests = counters
+    with streams.get_lock(), requests.get_lock():
+        streams.value = 0
+        requests.value = 0
+    results = context.Queue()
+    process = context.Process(
+        target=first_call,
+        args=(client, mode, f"localhost:{args.port}", schema, args.cache, results),
+    )
+    process.start()
+    process.join()
+    if process.exitcode:
+        raise RuntimeError(f"{client}/{mode} run failed")
+    result = results.get(timeout=5)
+    result["reflection_streams"] = streams.value
+    result["reflection_requests"] = requests.value
+    return result
+
+
+def run(args) -> Dict[str, Any]:
+    schema = Schema(args.services, args.methods, args.depth, args.width)
+    context = multiprocessing.get_context("spawn")
+    counters = (context.Value("i", 0), context.Value("i", 0))
+    server_process = context.Process(target=serve, args=(args.port, schema, *counters))
+    server_process.start()
+    results = []
+    try:
+        time.sleep(1)
+        if "cached" in args.modes:
+            # fills the descriptor cache read by the cached runs
+            run_case(context, args, schema, "sync", "cached", counters)
+        for client in args.clients:
+            for mode in args.modes:
+                runs = [
+                    run_case(context, args, schema, client, mode, counters)
+                    for _ in range(args.repeat)
+                ]
+                result: Dict[str, Any] = {
+                    "key": f"{client}/{mode}",
+                    "client": client,
+                    "mode": mode,
+                }
+                for name in runs[0]:
+                    result[name] = statistics.median(run[name] for run in runs)
+                results.append(result)
+    finally:
+        server_process.terminate()
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "grpcio": grpc.__version__,
+        "schema": schema._asdict(),
+        "total_files": len(generate_files(schema)),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+
+def report(results: Dict[str, Any], baseline: Dict[str, Dict[str, Any]]):
+    print(f"{results['schema']['services']} services, {results['total_files']} files")
+    print(
+        f"{'case':<20}{'create ms':>11}{'first ms':>10}{'streams':>9}{'requests':>10}"
+        f"{'files':>7}{'retained KiB':>14}" + ("  vs baseline" if baseline else "")
+    )
+    for result in results["results"]:
+        line = (
+            f"{result['key']:<20}{result['create_seconds'] * 1e3:>11.1f}"
+            f"{result['first_call_seconds'] * 1e3:>10.1f}"
+            f"{result['reflection_streams']:>9.0f}{result['reflection_requests']:>10.0f}"
+            f"{result['files_registered']:>7.0f}{result['retained_bytes'] / 1024:>14.0f}"
+        )
+        previous = baseline.get(result["key"])
+        if previous:
+            change = result["first_call_seconds"] / previous["first_call_seconds"] - 1
+            line += f"{change:>+12.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time to first call of new reflection clients"
+    )
+    parser.add_argument("--services", type=int, default=50)
+    parser.add_argument("--methods", type=int, default=5, help="methods per service")
+    parser.add_argument("--depth", type=int, default=8, help="levels of shared files")
+    parser.add_argument("--width", type=int, default=4, help="shared files per level")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs per case, the median is reported"
+    )
+    parser.add_argument("--clients", nargs="+", choices=CLIENTS, default=CLIENTS)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare first calls with")
+    parser.add_argument("--port", default="50063")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {result["key"]: result for result in json.load(f)["results"]}
+
+    with tempfile.TemporaryDirectory() as cache:
+        args.cache = cache
+        results = run(args)
+
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import multiprocessing
+import time
+from typing import Callable, List, Tuple
+
+import grpc
+from grpc_requests.client import Client
+from tests.test_servers.helloworld.helloworld_pb2 import HelloReply, HelloRequest
+from tests.test_servers.helloworld.helloworld_server import HelloWorldServer
+
+"""
+dispatch
+
+Microbenchmark of the per call overhead of sync unary requests: the raw grpc
+multicallable, Client.request and a method resolved once with Client.bind_method.
+The dispatch only section replaces the grpc handlers with a function returning a
+prebuilt reply, so the remaining time is the overhead of grpc_requests itself.
+
+Run from the src directory:
+
+    python -m benchmarks.dispatch --calls 5000
+"""
+
+SERVICE = "helloworld.Greeter"
+METHOD = "SayHello"
+
+
+def serve(port: str):
+    HelloWorldServer(port).serve()
+
+
+def measure(call: Callable[[], object], calls: int, rounds: int) -> float:
+    """Best mean microseconds per call over several rounds, after a warm up."""
+    for _ in range(min(calls, 200)):
+        call()
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e6
+
+
+def make_cases(
+    client: Client, handler: Callable
+) -> List[Tuple[str, Callable[[], object]]]:
+    say_hello = client.bind_method(SERVICE, METHOD)
+    data = {"name": "sinsky"}
+    message = HelloRequest(name="sinsky")
+    return [
+        ("handler, message", lambda: handler(message)),
+        (
+            "request, message, raw_output",
+            lambda: client.request(SERVICE, METHOD, message, raw_output=True),
+        ),
+        (
+            "bind_method, message, raw_output",
+            lambda: say_hello(message, raw_output=True),
+        ),
+        ("request, dict", lambda: client.request(SERVICE, METHOD, data)),
+        ("bind_method, dict", lambda: say_hello(data)),
+    ]
+
+
+def without_network(client: Client) -> Callable:
+    """Replace the handlers of the client with one answering without a server."""
+    reply = HelloReply(message="Hello, sinsky!")
+
+    def handler(request, **kwargs):
+        return reply
+
+    methods_meta = client._service_methods_meta[SERVICE]
+    for name, method_meta in methods_meta.items():
+        methods_meta[name] = method_meta._replace(handler=handler)
+    return handler
+
+
+def report(title: str, results: List[Tuple[str, float]]):
+    print(title)
+    baseline = results[0][1]
+    for name, micros in results:
+        print(f"  {name:<34}{micros:>10.2f} us/call{micros - baseline:>+10.2f} us")
+
+
+def run(endpoint: str, calls: int, rounds: int):
+    client = Client(endpoint)
+    raw_handler = grpc.insecure_channel(endpoint).unary_unary(
+        f"/{SERVICE}/{METHOD}",
+        request_serializer=HelloRequest.SerializeToString,
+        response_deserializer=HelloReply.FromString,
+    )
+    cases = make_cases(client, raw_handler)
+    report(
+        "over the network",
+        [(name, measure(call, calls, rounds)) for name, call in cases],
+    )
+
+    offline_client = Client(endpoint)
+    cases = make_cases(offline_client, without_network(offline_client))
+    report(
+        "dispatch only, handlers answer without a server",
+        [(name, measure(call, calls * 10, rounds)) for name, call in cases],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per call overhead of sync unary requests"
+    )
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--port", default="50061")
+    args = parser.parse_args()
+
+    server_process = multiprocessing.Process(target=serve, args=(args.port,))
+    server_process.start()
+    try:
+        time.sleep(1)
+        run(f"localhost:{args.port}", args.calls, args.rounds)
+    finally:
+        server_process.terminate()
+
+
+if __name__ == "__main__":
+    main()
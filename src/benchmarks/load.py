@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import grpc
+from google.protobuf import __version__ as protobuf_version
+from google.protobuf.json_format import ParseDict
+from grpc_requests.aio import AsyncClient
+from grpc_requests.client import Client, MethodType
+from tests.test_servers.client_tester.client_tester_pb2 import TestRequest
+from tests.test_servers.client_tester.client_tester_server import ClientTesterServer
+
+"""
+load
+
+Load benchmark of the sync and async clients against the bundled client_tester
+server, one case per client, MethodType, request input and payload size. Each case
+reports its throughput, p50 and p99 latency and the CPU time the client process
+spent per call, and the results can be written as JSON to compare them across
+commits.
+
+Inputs are a dict request with a dict response, a dict request with raw_output, and
+a prebuilt message with raw_output.
+
+Run from the src directory:
+
+    python -m benchmarks.load --duration 2 --output load.json
+    python -m benchmarks.load --clients sync --baseline load.json
+"""
+
+SERVICE = "client_tester.ClientTester"
+METHODS = {
+    MethodType.UNARY_UNARY: "TestUnaryUnary",
+    MethodType.UNARY_STREAM: "TestUnaryStream",
+    MethodType.STREAM_UNARY: "TestStreamUnary",
+    MethodType.STREAM_STREAM: "TestStreamStream",
+}
+# request messages sent per call of client streaming methods
+STREAM_REQUESTS = 8
+# readings per request, the server streams back one response per reading
+READINGS = 4
+PAYLOADS = {"small": 16, "large": 64 * 1024}
+INPUTS = ("dict", "raw_output", "message")
+CLIENTS = ("sync", "aio")
+
+
+class Case(NamedTuple):
+    client: str
+    method_type: MethodType
+    input: str
+    payload: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.client}/{self.method_type.value}/{self.input}/{self.payload}"
+
+
+class Result(NamedTuple):
+    case: Case
+    calls: int
+    seconds: float
+    cpu_seconds: float
+    latencies: List[float]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.case.key,
+            "client": self.case.client,
+            "method_type": self.case.method_type.value,
+            "input": self.case.input,
+            "payload": self.case.payload,
+            "calls": self.calls,
+            "calls_per_second": self.calls / self.seconds,
+            "p50_us": percentile(self.latencies, 0.5) * 1e6,
+            "p99_us": percentile(self.latencies, 0.99) * 1e6,
+            "cpu_us_per_call": self.cpu_seconds / self.calls * 1e6,
+        }
+
+
+def serve(port: str):
+    ClientTesterServer(port).serve()
+
+
+def percentile(latencies: List[float], fraction: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def request_data(payload: str) -> Dict[str, Any]:
+    size = PAYLOADS[payload]
+    return {
+        "factor": 3,
+        "readings": [1.5] * READINGS,
+        "request_name": "n" * min(size, 64),
+        # bytes fields are base64 strings in dicts
+        "extra_data": ["eA==" * (size // 4)],
+    }
+
+
+def make_request(case: Case):
+    """The request of a call of the case, a message stream for client streaming."""
+    data = request_data(case.payload)
+    request = ParseDict(data, TestRequest()) if case.input == "message" else data
+    if case.method_type.is_unary_request:
+        return lambda: request
+    return lambda: [request] * STREAM_REQUESTS
+
+
+def make_call(client: Client, case: Case) -> Callable[[], Any]:
+    method = METHODS[case.method_type]
+    raw_output = case.input != "dict"
+    request = make_request(case)
+    if case.method_type.is_unary_response:
+        return lambda: client.request(SERVICE, method, request(), raw_output=raw_output)
+    return lambda: list(
+        client.request(SERVICE, method, request(), raw_output=raw_output)
+    )
+
+
+def make_async_call(client: AsyncClient, case: Case) -> Callable[[], Any]:
+    method = METHODS[case.method_type]
+    raw_output = case.input != "dict"
+    request = make_request(case)
+
+    async def call():
+        result = await client.request(SERVICE, method, request(), raw_output=raw_output)
+        if case.method_type.is_unary_response:
+            return result
+        return [response async for response in result]
+
+    return call
+
+
+def run_sync(endpoint: str, case: Case, duration: float, warmup: int) -> Result:
+    client = Client(endpoint)
+    call = make_call(client, case)
+    for _ in range(warmup):
+        call()
+    latencies = []
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    deadline = start + duration
+    while True:
+        call_start = time.perf_counter()
+        call()
+        end = time.perf_counter()
+        latencies.append(end - call_start)
+        if end >= deadline:
+            break
+    client.channel.close()
+    return Result(
+        case, len(latencies), end - start, time.process_time() - start_cpu, latencies
+    )
+
+
+async def run_async(
+    endpoint: str, case: Case, duration: float, warmup: int, concurrency: int
+) -> Result:
+    client = AsyncClient(endpoint)
+    call = make_async_call(client, case)
+    for _ in range(warmup):
+        await call()
+    latencies: List[float] = []
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            call_start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - call_start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    end = time.perf_counter()
+    await client.channel.close()
+    return Result(
+        case, len(latencies), end - start, time.process_time() - start_cpu, latencies
+    )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]):
+    print(
+        f"{'case':<42}{'calls/s':>10}{'p50 us':>10}{'p99 us':>10}{'cpu us':>10}"
+        + ("  vs baseline" if baseline else "")
+    )
+    for result in results:
+        line = (
+            f"{result['key']:<42}{result['calls_per_second']:>10.0f}"
+            f"{result['p50_us']:>10.1f}{result['p99_us']:>10.1f}"
+            f"{result['cpu_us_per_call']:>10.1f}"
+        )
+        previous = baseline.get(result["key"])
+        if previous:
+            change = result["calls_per_second"] / previous["calls_per_second"] - 1
+            line += f"{change:>+12.1%}"
+        print(line)
+
+
+def run(args) -> Dict[str, Any]:
+    endpoint = f"localhost:{args.port}"
+    results = []
+    for client in args.clients:
+        for method_type in args.method_types:
+            for input_ in args.inputs:
+                for payload in args.payloads:
+                    case = Case(client, MethodType(method_type), input_, payload)
+                    if client == "sync":
+                        result = run_sync(endpoint, case, args.duration, args.warmup)
+                    else:
+                        result = asyncio.run(
+                            run_async(
+                                endpoint,
+                                case,
+                                args.duration,
+                                args.warmup,
+                                args.concurrency,
+                            )
+                        )
+                    results.append(result.as_dict())
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "grpcio": grpc.__version__,
+        "protobuf": protobuf_version,
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Throughput, latency and CPU per call of the clients"
+    )
+    parser.add_argument("--duration", type=float, default=1.0, help="seconds per case")
+    parser.add_argument("--warmup", type=int, default=50, help="calls before a case")
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="concurrent calls of aio cases"
+    )
+    parser.add_argument("--clients", nargs="+", choices=CLIENTS, default=CLIENTS)
+    parser.add_argument(
+        "--method-types",
+        nargs="+",
+        choices=[method_type.value for method_type in METHODS],
+        default=[method_type.value for method_type in METHODS],
+    )
+    parser.add_argument("--inputs", nargs="+", choices=INPUTS, default=INPUTS)
+    parser.add_argument(
+        "--payloads", nargs="+", choices=list(PAYLOADS), default=list(PAYLOADS)
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare throughput with")
+    parser.add_argument("--port", default="50062")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {result["key"]: result for result in json.load(f)["results"]}
+
+    server_process = multiprocessing.Process(target=serve, args=(args.port,))
+    server_process.start()
+    try:
+        time.sleep(1)
+        results = run(args)
+    finally:
+        server_process.terminate()
+
+    report(results["results"], baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
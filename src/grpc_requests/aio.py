@@ -1,15 +1,25 @@
+import asyncio
+import inspect
 import logging
-from contextlib import suppress
+import time
+from collections import deque
+from concurrent.futures import Executor
+from contextlib import nullcontext, suppress
 from enum import Enum
-from functools import partial
 from typing import (
     Any,
     AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
     Dict,
+    Hashable,
     Iterable,
     List,
+    Mapping,
     NamedTuple,
     Optional,
+    Set,
     Tuple,
     Union,
 )
@@ -31,11 +41,38 @@ from google.protobuf import (
 
 # noqa: E501
 from google.protobuf.descriptor import MethodDescriptor, ServiceDescriptor
-from google.protobuf.descriptor_pb2 import ServiceDescriptorProto
+from google.protobuf.descriptor_pb2 import MethodDescriptorProto
 from google.protobuf.json_format import MessageToDict, ParseDict
 from grpc_reflection.v1alpha import reflection_pb2, reflection_pb2_grpc
 
-from .client import CredentialsInfo
+from .client import (
+    _ENCODING_ERRORS,
+    LAZY_METHODS,
+    CredentialsInfo,
+    LazyMethodsMeta,
+    serialize_bytes,
+)
+from .client import MessageParsers as SyncMessageParsers
+from .client import MessageParsersProtocol as SyncMessageParsersProtocol
+from .channel_pool import ROUND_ROBIN, ChannelPool, pool_channel_options
+from .client_cache import ClientCache
+from .codec import MessageDecoder, MessageEncoder, MessageView
+from .descriptor_cache import DescriptorCache, collect_file_descriptors
+from .metrics import (
+    AsyncInstrumentedMultiCallable,
+    AsyncInstrumentedParsers,
+    Metrics,
+)
+from .schema_registry import MethodSchema, ServiceSchema, schema_registry
+from .singleflight import AsyncSingleFlight, call_key
+from .tracing import (
+    AsyncTracedMultiCallable,
+    AsyncTracedParsers,
+    REFLECTION_ATTRIBUTES,
+    Tracer,
+    rpc_attributes,
+)
+from .upload import UploadResult, write_upload
 from .utils import load_data
 
 logger = logging.getLogger(__name__)
@@ -87,6 +124,8 @@ class BaseAsyncClient:
         compression=None,
         credentials: Optional[CredentialsInfo] = None,
         interceptors=None,
+        channel_pool_size: int = 1,
+        channel_pool_strategy: str = ROUND_ROBIN,
         **kwargs,
     ):
         self.endpoint = endpoint
@@ -94,51 +133,89 @@ class BaseAsyncClient:
         self._desc_pool = descriptor_pool or _descriptor_pool.Default()
         self.compression = compression
         self.channel_options = channel_options
-        if ssl:
+        self._ssl = ssl
+        self._credentials = credentials
+        self._interceptors = interceptors
+        if channel_pool_size < 1:
+            raise ValueError("channel_pool_size must be at least 1")
+        self._channel_pool: Optional[ChannelPool] = None
+        if channel_pool_size == 1:
+            self._channel = self._create_channel(self.channel_options)
+        else:
+            self._channel_pool = ChannelPool(
+                [
+                    self._create_channel(pool_channel_options(self.channel_options, i))
+                    for i in range(channel_pool_size)
+                ],
+                channel_pool_strategy,
+            )
+            self._channel = self._channel_pool.channels[0]
+
+    def _create_channel(self, channel_options):
+        if self._ssl:
             _credentials = {}
-            if credentials:
+            if self._credentials:
                 _credentials = {
                     k: load_data(v) if isinstance(v, str) else v
-                    for k, v in credentials.items()
+                    for k, v in self._credentials.items()
                 }
 
-            self._channel = grpc.aio.secure_channel(
-                endpoint,
+            return grpc.aio.secure_channel(
+                self.endpoint,
                 grpc.ssl_channel_credentials(**_credentials),
-                options=self.channel_options,
+                options=channel_options,
                 compression=self.compression,
-                interceptors=interceptors,
+                interceptors=self._interceptors,
             )
 
-        else:
-            self._channel = grpc.aio.insecure_channel(
-                endpoint,
-                options=self.channel_options,
-                compression=self.compression,
-                interceptors=interceptors,
-            )
+        return grpc.aio.insecure_channel(
+            self.endpoint,
+            options=channel_options,
+            compression=self.compression,
+            interceptors=self._interceptors,
+        )
 
     @property
     def channel(self):
         return self._channel
 
+    @property
+    def channels(self):
+        if self._channel_pool is None:
+            return [self._channel]
+        return self._channel_pool.channels
+
+    def _make_handler(self, method_type: str, **kwargs):
+        """
+        Create the multicallable of a method, spreading its calls over the channel
+        pool if the client has one.
+
+        :param method_type: Name of the channel method creating the multicallable,
+            e.g. unary_unary.
+        :param kwargs: Arguments of the channel method.
+        """
+        if self._channel_pool is None:
+            return getattr(self._channel, method_type)(**kwargs)
+        return self._channel_pool.multicallable(method_type, **kwargs)
+
     @classmethod
     def get_by_endpoint(cls, endpoint: str, **kwargs):
-        global _cached_clients
-        if endpoint not in _cached_clients:
-            _cached_clients[endpoint] = cls(endpoint, **kwargs)
-        return _cached_clients[endpoint]
+        return client_cache.get(cls, endpoint, **kwargs)
+
+    async def close(self):
+        for channel in self.channels:
+            await channel.close()
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         with suppress(Exception):
-            await self._channel._close(None)
+            await self.close()
         return False
 
     def __del__(self):
-        if self._channel:
+        if getattr(self, "_channel", None):
             with suppress(Exception):
                 del self._channel
 
@@ -146,22 +223,52 @@ class BaseAsyncClient:
 class MessageParsersProtocol(Protocol):
     def parse_request_data(self, request_data, input_type): ...
 
-    def parse_stream_requests(self, stream_requests_data: Iterable, input_type): ...
+    def parse_stream_requests(
+        self, stream_requests_data: Union[Iterable, AsyncIterable], input_type
+    ): ...
 
     async def parse_response(self, response): ...
 
     async def parse_stream_responses(self, responses: AsyncIterable): ...
 
 
+def _parse_stream_requests(
+    parse_request_data, stream_requests_data: Union[Iterable, AsyncIterable], input_type
+):
+    """
+    Encode the requests of a stream one at a time, as the channel asks for them.
+    Async iterables are encoded by an async generator, so the producer is only
+    resumed once grpc is ready to write the previous request.
+    """
+    if isinstance(stream_requests_data, AsyncIterable):
+        return _parse_async_stream_requests(
+            parse_request_data, stream_requests_data, input_type
+        )
+    return (
+        parse_request_data(request_data or {}, input_type)
+        for request_data in stream_requests_data
+    )
+
+
+async def _parse_async_stream_requests(
+    parse_request_data, stream_requests_data: AsyncIterable, input_type
+):
+    async for request_data in stream_requests_data:
+        yield parse_request_data(request_data or {}, input_type)
+
+
 class MessageParsers(MessageParsersProtocol):
     def parse_request_data(self, request_data, input_type):
         _data = request_data or {}
         request = ParseDict(_data, input_type()) if isinstance(_data, dict) else _data
         return request
 
-    def parse_stream_requests(self, stream_requests_data: Iterable, input_type):
-        for request_data in stream_requests_data:
-            yield self.parse_request_data(request_data or {}, input_type)
+    def parse_stream_requests(
+        self, stream_requests_data: Union[Iterable, AsyncIterable], input_type
+    ):
+        return _parse_stream_requests(
+            self.parse_request_data, stream_requests_data, input_type
+        )
 
     async def parse_response(self, response):
         return MessageToDict(response, preserving_proto_field_name=True)
@@ -171,6 +278,116 @@ class MessageParsers(MessageParsersProtocol):
             yield await self.parse_response(resp)
 
 
+class CompiledMessageParsers(MessageParsers):
+    """
+    MessageParsers variant that builds a dedicated encoder the first time each input
+    type is seen, and a dedicated decoder the first time each output type is seen,
+    instead of walking the descriptors through ParseDict and MessageToDict on every
+    message. Produces the same messages and dictionaries as MessageParsers.
+    """
+
+    def __init__(self):
+        self._encoder = MessageEncoder()
+        self._decoder = MessageDecoder()
+
+    def parse_request_data(self, request_data, input_type):
+        _data = request_data or {}
+        if isinstance(_data, dict):
+            return self._encoder.encode(_data, input_type)
+        return _data
+
+    async def parse_response(self, response):
+        return self._decoder.decode(response)
+
+
+class MessageViewParsers(CompiledMessageParsers):
+    """
+    CompiledMessageParsers variant returning responses as read-only MessageView
+    mappings, which convert each field only when it is accessed.
+    """
+
+    async def parse_response(self, response) -> MessageView:
+        return self._decoder.view(response)
+
+
+def _exceeds_size(data, limit: int) -> bool:
+    """
+    Rough estimate of whether the message encoded from a request dictionary is larger
+    than limit bytes. Stops walking the data as soon as the limit is exceeded.
+    """
+    remaining = limit
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, (str, bytes)):
+            remaining -= len(value) + 2
+        elif isinstance(value, dict):
+            remaining -= 2 * len(value)
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+        else:
+            remaining -= 8
+        if remaining < 0:
+            return True
+    return False
+
+
+class ExecutorMessageParsers(MessageParsersProtocol):
+    """
+    Runs the conversions of synchronous message parsers, and sends the ones of large
+    messages to an executor so they do not block the event loop.
+
+    Requests estimated to encode to at least threshold bytes, and responses whose
+    serialized size is at least threshold bytes, are converted in the executor.
+    Smaller messages are converted inline, where the executor round trip would cost
+    more than the conversion itself.
+
+    :param parsers: Synchronous parsers doing the conversions, such as
+        grpc_requests.client.CompiledMessageParsers. Defaults to
+        grpc_requests.client.MessageParsers.
+    :param executor: Executor the large messages are converted in. None uses the
+        default executor of the running event loop.
+    :param threshold: Message size in bytes from which conversions are offloaded.
+    """
+
+    def __init__(
+        self,
+        parsers: Optional[SyncMessageParsersProtocol] = None,
+        executor: Optional[Executor] = None,
+        threshold: int = 64 * 1024,
+    ):
+        self._parsers = parsers if parsers else SyncMessageParsers()
+        self._executor = executor
+        self.threshold = threshold
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    async def parse_request_data(self, request_data, input_type):
+        _data = request_data or {}
+        if isinstance(_data, dict) and _exceeds_size(_data, self.threshold):
+            return await self._run(self._parsers.parse_request_data, _data, input_type)
+        return self._parsers.parse_request_data(_data, input_type)
+
+    async def parse_stream_requests(
+        self, stream_requests_data: Union[Iterable, AsyncIterable], input_type
+    ):
+        async for request_data in _iterate(stream_requests_data):
+            yield await self.parse_request_data(request_data, input_type)
+
+    async def parse_response(self, response):
+        if response.ByteSize() >= self.threshold:
+            return await self._run(self._parsers.parse_response, response)
+        return self._parsers.parse_response(response)
+
+    async def parse_stream_responses(self, responses: AsyncIterable):
+        async for resp in responses:
+            yield await self.parse_response(resp)
+
+
 class CustomArgumentParsers(MessageParsersProtocol):
     _message_to_dict_kwargs: Optional[Dict[str, Any]]
     _parse_dict_kwargs: Optional[Dict[str, Any]]
@@ -191,9 +408,12 @@ class CustomArgumentParsers(MessageParsersProtocol):
             request = _data
         return request
 
-    def parse_stream_requests(self, stream_requests_data: Iterable, input_type):
-        for request_data in stream_requests_data:
-            yield self.parse_request_data(request_data or {}, input_type)
+    def parse_stream_requests(
+        self, stream_requests_data: Union[Iterable, AsyncIterable], input_type
+    ):
+        return _parse_stream_requests(
+            self.parse_request_data, stream_requests_data, input_type
+        )
 
     async def parse_response(self, response):
         return MessageToDict(response, **self._message_to_dict_kwargs)
@@ -249,6 +469,60 @@ MethodTypeMatch: Dict[Tuple[bool, bool], MethodType] = {
 }
 
 
+async def _iterate(requests: Union[Iterable, AsyncIterable]):
+    if isinstance(requests, AsyncIterable):
+        async for request in requests:
+            yield request
+    else:
+        for request in requests:
+            yield request
+
+
+async def _collect(task: asyncio.Future, return_exceptions: bool):
+    try:
+        return await task
+    except (grpc.RpcError, *_ENCODING_ERRORS) as err:
+        if return_exceptions:
+            return err
+        raise
+
+
+async def _ordered_results(call, requests, max_in_flight: int, return_exceptions):
+    in_flight: deque = deque()
+    try:
+        async for request in _iterate(requests):
+            if len(in_flight) >= max_in_flight:
+                yield await _collect(in_flight.popleft(), return_exceptions)
+            in_flight.append(asyncio.ensure_future(call(request)))
+        while in_flight:
+            yield await _collect(in_flight.popleft(), return_exceptions)
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def _completed_results(call, requests, max_in_flight: int, return_exceptions):
+    in_flight: Dict[asyncio.Future, int] = {}
+    try:
+        index = 0
+        async for request in _iterate(requests):
+            while len(in_flight) >= max_in_flight:
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield in_flight.pop(task), await _collect(task, return_exceptions)
+            in_flight[asyncio.ensure_future(call(request))] = index
+            index += 1
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield in_flight.pop(task), await _collect(task, return_exceptions)
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
 class BaseAsyncGrpcClient(BaseAsyncClient):
     def __init__(
         self,
@@ -260,8 +534,15 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
         compression=None,
         skip_check_method_available=False,
         message_parsers: Optional[MessageParsersProtocol] = None,
+        metrics: Optional[Metrics] = None,
+        tracer: Optional[Tracer] = None,
+        registration_concurrency: int = 10,
+        idempotent_methods: Optional[Iterable[str]] = None,
+        single_flight_metadata: Optional[Iterable[str]] = None,
         **kwargs,
     ):
+        if registration_concurrency < 1:
+            raise ValueError("registration_concurrency must be at least 1")
         super().__init__(
             endpoint,
             symbol_db,
@@ -275,7 +556,19 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
         self.has_server_registered = False
         self._skip_check_method_available = skip_check_method_available
         self._message_parsers = message_parsers if message_parsers else MessageParsers()
-        self._service_methods_meta: Dict[str, Dict[str, MethodMetaData]] = {}
+        self._metrics = metrics
+        self._tracer = tracer
+        self._service_methods_meta: Dict[str, Mapping[str, MethodMetaData]] = {}
+        self._bytes_handlers: Dict[Tuple[str, str], Any] = {}
+        self._registration_concurrency = registration_concurrency
+        # unary calls of these "service/method" names share identical calls in flight
+        self._idempotent_methods = frozenset(idempotent_methods or ())
+        self._single_flight_metadata = (
+            None
+            if single_flight_metadata is None
+            else frozenset(single_flight_metadata)
+        )
+        self._single_flight = AsyncSingleFlight() if self._idempotent_methods else None
 
     @classmethod
     async def create(cls, endpoint: str, **kwargs) -> "BaseAsyncGrpcClient":
@@ -286,12 +579,37 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
     async def _get_service_names(self):
         raise NotImplementedError()
 
+    def _span(self, name: str, attributes: Dict[str, Any]):
+        if self._tracer is None:
+            return nullcontext()
+        return self._tracer.span(name, attributes)
+
+    def _is_single_flight(self, name: str, method_meta: MethodMetaData) -> bool:
+        return (
+            method_meta.method_type == MethodType.UNARY_UNARY
+            and name in self._idempotent_methods
+        )
+
+    def _single_flight_key(
+        self, name: str, method_meta: MethodMetaData, request, raw_output, kwargs
+    ) -> Optional[Hashable]:
+        if not self._is_single_flight(name, method_meta):
+            return None
+        return call_key(name, request, raw_output, kwargs, self._single_flight_metadata)
+
     async def check_method_available(
         self, service: str, method: str, method_type: Optional[MethodType] = None
     ):
         if self._skip_check_method_available:
             return True
-        if not self.has_server_registered:
+        if self._lazy:
+            # resolves the requested service only, others are resolved on first use
+            if (
+                service not in self._service_methods_meta
+                and service in await self.service_names()
+            ):
+                await self.register_service(service)
+        elif not self.has_server_registered:
             await self.register_all_service()
         methods_meta = self._service_methods_meta.get(service)
         if not methods_meta:
@@ -314,56 +632,124 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
             )
         return True
 
-    def _register_methods(
-        self, service_descriptor: ServiceDescriptor
-    ) -> Dict[str, MethodMetaData]:
-        svc_desc_proto = ServiceDescriptorProto()
-        service_descriptor.CopyToProto(svc_desc_proto)
-        service_full_name = service_descriptor.full_name
-        metadata: Dict[str, MethodMetaData] = {}
-        for method_proto in svc_desc_proto.method:
-            method_name = method_proto.name
-            method_desc: MethodDescriptor = service_descriptor.methods_by_name[
-                method_name
-            ]
+    def _build_method_schema(self, method_desc: MethodDescriptor) -> MethodSchema:
+        method_proto = MethodDescriptorProto()
+        method_desc.CopyToProto(method_proto)
 
-            if get_message_class_supported:
-                input_type = GetMessageClass(method_desc.input_type)
-                output_type = GetMessageClass(method_desc.output_type)
-            else:
-                msg_factory = message_factory.MessageFactory(self._desc_pool)
-                input_type = msg_factory.GetPrototype(method_desc.input_type)
-                output_type = msg_factory.GetPrototype(method_desc.output_type)
+        if get_message_class_supported:
+            input_type = GetMessageClass(method_desc.input_type)
+            output_type = GetMessageClass(method_desc.output_type)
+        else:
+            msg_factory = message_factory.MessageFactory(self._desc_pool)
+            input_type = msg_factory.GetPrototype(method_desc.input_type)
+            output_type = msg_factory.GetPrototype(method_desc.output_type)
+
+        return MethodSchema(
+            name=method_desc.name,
+            input_type=input_type,
+            output_type=output_type,
+            client_streaming=method_proto.client_streaming,
+            server_streaming=method_proto.server_streaming,
+            descriptor=method_desc,
+        )
 
-            method_type = MethodTypeMatch[
-                (method_proto.client_streaming, method_proto.server_streaming)
-            ]
+    def _build_service_schema(
+        self, service_descriptor: ServiceDescriptor, fingerprint: str
+    ) -> ServiceSchema:
+        return ServiceSchema(
+            service_descriptor.full_name,
+            fingerprint,
+            tuple(
+                self._build_method_schema(method_desc)
+                for method_desc in service_descriptor.methods
+            ),
+        )
 
-            method_register_func = getattr(self.channel, method_type.value)
-            handler = method_register_func(
-                method=self._make_method_full_name(service_full_name, method_name),
-                request_serializer=input_type.SerializeToString,
-                response_deserializer=output_type.FromString,
+    def _make_method_meta(self, service_name: str, method: MethodSchema):
+        method_type = MethodTypeMatch[
+            (method.client_streaming, method.server_streaming)
+        ]
+        handler = self._make_handler(
+            method_type.value,
+            method=self._make_method_full_name(service_name, method.name),
+            request_serializer=method.input_type.SerializeToString,
+            response_deserializer=method.output_type.FromString,
+        )
+        parsers = self._message_parsers
+        if self._metrics is not None:
+            recorder = self._metrics.recorder(service_name, method.name)
+            handler = AsyncInstrumentedMultiCallable(handler, recorder)
+            parsers = AsyncInstrumentedParsers(parsers, recorder)
+        if self._tracer is not None:
+            attributes = rpc_attributes(service_name, method.name)
+            handler = AsyncTracedMultiCallable(
+                handler, self._tracer, f"{service_name}/{method.name}", attributes
             )
-            metadata[method_name] = MethodMetaData(
-                method_type=method_type,
-                input_type=input_type,
-                output_type=output_type,
-                handler=handler,
-                descriptor=method_desc,
-                parsers=self._message_parsers,
+            parsers = AsyncTracedParsers(parsers, self._tracer, attributes)
+        return MethodMetaData(
+            method_type=method_type,
+            input_type=method.input_type,
+            output_type=method.output_type,
+            handler=handler,
+            descriptor=method.descriptor,
+            parsers=parsers,
+        )
+
+    def _register_methods(
+        self, service_descriptor: ServiceDescriptor
+    ) -> Mapping[str, MethodMetaData]:
+        service_name = service_descriptor.full_name
+        if self._lazy == LAZY_METHODS:
+            return LazyMethodsMeta(
+                [method_desc.name for method_desc in service_descriptor.methods],
+                lambda name: self._make_method_meta(
+                    service_name,
+                    self._build_method_schema(service_descriptor.methods_by_name[name]),
+                ),
             )
-        return metadata
+
+        # message classes are shared by all clients of the same schema, descriptors
+        # come from the pool of this client
+        schema = schema_registry.get_or_create(
+            service_descriptor, self._build_service_schema
+        )
+        methods_by_name = service_descriptor.methods_by_name
+        return {
+            method.name: self._make_method_meta(
+                service_name,
+                method._replace(descriptor=methods_by_name[method.name]),
+            )
+            for method in schema.methods
+        }
 
     async def register_service(self, service_name):
         logger.debug(f"start {service_name} register")
-        svc_desc = self.get_service_descriptor(service_name)
-        self._service_methods_meta[service_name] = self._register_methods(svc_desc)
+        with self._span(
+            "grpc_requests.register_service", {"rpc.service": service_name}
+        ):
+            svc_desc = self.get_service_descriptor(service_name)
+            self._service_methods_meta[service_name] = self._register_methods(svc_desc)
         logger.debug(f"end {service_name} register")
 
     async def register_all_service(self):
-        for service in await self.service_names():
-            await self.register_service(service)
+        """
+        Register all services concurrently, with at most registration_concurrency
+        services being registered at a time.
+        """
+        semaphore = asyncio.Semaphore(self._registration_concurrency)
+
+        async def register(service):
+            async with semaphore:
+                await self.register_service(service)
+
+        # keep the methods meta of services already registered lazily
+        await asyncio.gather(
+            *[
+                register(service)
+                for service in await self.service_names()
+                if service not in self._service_methods_meta
+            ]
+        )
         self.has_server_registered = True
 
     async def service_names(self):
@@ -398,6 +784,19 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
         method_meta = await self.get_method_meta(service, method)
 
         _request = method_meta.request_parser(request, method_meta.input_type)
+        if inspect.isawaitable(_request):
+            _request = await _request
+        if self._single_flight is not None:
+            name = f"{service}/{method}"
+            key = self._single_flight_key(
+                name, method_meta, _request, raw_output, kwargs
+            )
+            if key is not None:
+                return await self._single_flight.do(
+                    key,
+                    lambda: self._call_unary(method_meta, _request, raw_output, kwargs),
+                    kwargs.get("timeout"),
+                )
         if method_meta.method_type.is_unary_response:
             result = await method_meta.handler(_request, **kwargs)
 
@@ -407,14 +806,180 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
                 return await method_meta.response_parser(result)
         else:
             result = method_meta.handler(_request, **kwargs)
+            if raw_output:
+                return result
             return method_meta.response_parser(result)
 
+    def _bind_single_flight(
+        self, name: str, method_meta: MethodMetaData, single_flight: AsyncSingleFlight
+    ) -> Callable[..., Awaitable[Any]]:
+        parse_request = method_meta.request_parser
+        await_request = inspect.iscoroutinefunction(parse_request)
+
+        async def call(request=None, raw_output=False, **kwargs):
+            message = parse_request(request, method_meta.input_type)
+            if await_request:
+                message = await message
+            key = call_key(
+                name, message, raw_output, kwargs, self._single_flight_metadata
+            )
+            if key is None:
+                return await self._call_unary(method_meta, message, raw_output, kwargs)
+            return await single_flight.do(
+                key,
+                lambda: self._call_unary(method_meta, message, raw_output, kwargs),
+                kwargs.get("timeout"),
+            )
+
+        return call
+
+    @staticmethod
+    async def _call_unary(method_meta: MethodMetaData, request, raw_output, kwargs):
+        result = await method_meta.handler(request, **kwargs)
+        if raw_output:
+            return result
+        return await method_meta.response_parser(result)
+
     async def request(
         self, service: str, method: str, request=None, raw_output=False, **kwargs
     ):
         await self.check_method_available(service, method)
         return await self._request(service, method, request, raw_output, **kwargs)
 
+    async def request_many(
+        self,
+        service: str,
+        method: str,
+        requests: Union[Iterable, AsyncIterable],
+        max_in_flight: int = 64,
+        ordered: bool = True,
+        raw_output: bool = False,
+        return_exceptions: bool = False,
+        **kwargs,
+    ) -> AsyncIterator:
+        """
+        Make one request per item of requests to a method with a unary response,
+        running up to max_in_flight of them concurrently.
+
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :param requests: Iterable or async iterable of requests, each as accepted by
+            request. It is consumed lazily, as requests complete.
+        :param max_in_flight: Maximum number of requests awaiting a response.
+        :param ordered: If True, results are yielded in the order of requests.
+            Otherwise (index, result) tuples are yielded as requests complete.
+        :param raw_output: If True, responses are not parsed.
+        :param return_exceptions: If True, a failed request yields its grpc.RpcError,
+            or the error encoding it, instead of raising it.
+        :param kwargs: Keyword arguments passed to every call, e.g. timeout or metadata.
+        :return: Async iterator of results. Requests still in flight are cancelled
+            when it is closed.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        await self.check_method_available(service, method)
+        method_meta = await self.get_method_meta(service, method)
+        if not method_meta.method_type.is_unary_response:
+            raise ValueError(
+                f"{method} is {method_meta.method_type.value}, request_many needs a unary response"
+            )
+        bound = await self.bind_method(service, method)
+
+        def call(request):
+            return bound(request, raw_output=raw_output, **kwargs)
+
+        if ordered:
+            return _ordered_results(call, requests, max_in_flight, return_exceptions)
+        return _completed_results(call, requests, max_in_flight, return_exceptions)
+
+    async def stream_upload(
+        self,
+        service: str,
+        method: str,
+        records: Union[Iterable, AsyncIterable],
+        chunk_size: int = 256,
+        buffer_chunks: int = 4,
+        raw_output: bool = False,
+        **kwargs,
+    ) -> UploadResult:
+        """
+        Stream a large number of records to a stream_unary method. Records are encoded
+        a chunk at a time by a separate task, ahead of the messages being written with
+        call.write, which amortizes the per message overhead of a request stream.
+
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :param records: Iterable or async iterable of requests, each as accepted by
+            request.
+        :param chunk_size: Number of records encoded at once.
+        :param buffer_chunks: Maximum number of encoded chunks waiting to be written.
+        :param raw_output: If True, the response is not parsed.
+        :param kwargs: Keyword arguments of the call, e.g. timeout or metadata.
+        :return: The response and the stats of the upload.
+        """
+        await self.check_method_available(service, method, MethodType.STREAM_UNARY)
+        method_meta = await self.get_method_meta(service, method)
+        parse_request = method_meta.parsers.parse_request_data
+        input_type = method_meta.input_type
+
+        await_request = inspect.iscoroutinefunction(parse_request)
+
+        async def encode_chunk(chunk):
+            if await_request:
+                return [await parse_request(record, input_type) for record in chunk]
+            return [parse_request(record, input_type) for record in chunk]
+
+        started = time.perf_counter()
+        call = method_meta.handler(**kwargs)
+        stats = await write_upload(
+            call, encode_chunk, records, chunk_size, buffer_chunks
+        )
+        response = await call
+        if not raw_output:
+            response = await method_meta.response_parser(response)
+        return UploadResult(
+            response, stats._replace(elapsed=time.perf_counter() - started)
+        )
+
+    async def get_bytes_handler(self, service: str, method: str):
+        """
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :return: Multicallable of the method sending pre-serialized requests and
+            returning the response bytes, without any protobuf parsing.
+        """
+        key = (service, method)
+        handler = self._bytes_handlers.get(key)
+        if handler is None:
+            await self.check_method_available(service, method)
+            method_meta = await self.get_method_meta(service, method)
+            handler = self._make_handler(
+                method_meta.method_type.value,
+                method=self._make_method_full_name(service, method),
+                request_serializer=serialize_bytes,
+                response_deserializer=None,
+            )
+            self._bytes_handlers[key] = handler
+        return handler
+
+    async def request_bytes(self, service: str, method: str, request, **kwargs):
+        """
+        Forward wire format messages to a method untouched.
+
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :param request: Serialized request as bytes or memoryview, or an iterable or
+            async iterable of them for client streaming methods.
+        :param kwargs: Keyword arguments of the call, e.g. timeout or metadata.
+        :return: The serialized response, or an async iterator of them for server
+            streaming methods.
+        """
+        handler = await self.get_bytes_handler(service, method)
+        method_meta = await self.get_method_meta(service, method)
+        if method_meta.method_type.is_unary_response:
+            return await handler(request, **kwargs)
+        return handler(request, **kwargs)
+
     async def unary_unary(
         self, service: str, method: str, request=None, raw_output=False, **kwargs
     ):
@@ -460,6 +1025,59 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
 
         return self._service_methods_meta[service][method]
 
+    async def bind_method(
+        self, service: str, method: str, method_type: Optional[MethodType] = None
+    ) -> Callable[..., Awaitable[Any]]:
+        """
+        Resolve a method once into a coroutine function with its parsers and handler
+        already chosen. It takes the same request, raw_output and keyword arguments
+        as request, without repeating the availability check and lookups on each call.
+
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :param method_type: If given, the method must be of this type.
+        :return: Coroutine function making requests to the method.
+        """
+        await self.check_method_available(service, method, method_type)
+        methods_meta = await self.get_methods_meta(service)
+        try:
+            method_meta = methods_meta[method]
+        except KeyError as err:
+            raise ValueError(f"{service} doesn't support {method} method") from err
+
+        handler = method_meta.handler
+        input_type = method_meta.input_type
+        parse_request = method_meta.request_parser
+        parse_response = method_meta.response_parser
+        await_request = inspect.iscoroutinefunction(parse_request)
+
+        if method_meta.method_type.is_unary_response:
+
+            async def call(request=None, raw_output=False, **kwargs):
+                _request = parse_request(request, input_type)
+                if await_request:
+                    _request = await _request
+                result = await handler(_request, **kwargs)
+                if raw_output:
+                    return result
+                return await parse_response(result)
+
+        else:
+
+            async def call(request=None, raw_output=False, **kwargs):
+                _request = parse_request(request, input_type)
+                if await_request:
+                    _request = await _request
+                result = handler(_request, **kwargs)
+                if raw_output:
+                    return result
+                return parse_response(result)
+
+        name = f"{service}/{method}"
+        if self._single_flight is None or not self._is_single_flight(name, method_meta):
+            return call
+        return self._bind_single_flight(name, method_meta, self._single_flight)
+
     async def make_handler_argument(self, service: str, method: str):
         data_type = await self.get_method_meta(service, method)
         return {
@@ -490,6 +1108,7 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
         ssl=False,
         compression=None,
         message_parsers: Optional[MessageParsersProtocol] = None,
+        descriptor_cache: Optional[DescriptorCache] = None,
         **kwargs,
     ):
         super().__init__(
@@ -503,6 +1122,9 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
             **kwargs,
         )
         self.reflection_stub = reflection_pb2_grpc.ServerReflectionStub(self.channel)
+        self._descriptor_cache = descriptor_cache
+        self._descriptor_cache_loaded: Optional[bool] = None
+        self._pending_lookups: Dict[Tuple[str, str], asyncio.Future] = {}
 
     @classmethod
     async def create(cls, endpoint: str, **kwargs) -> "ReflectionAsyncClient":
@@ -515,8 +1137,9 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
         return responses
 
     async def _reflection_single_request(self, request):
-        async for result in self._reflection_request(request):
-            return result
+        with self._span("grpc_requests.reflection", REFLECTION_ATTRIBUTES):
+            async for result in self._reflection_request(request):
+                return result
 
     async def _get_service_names(self):
         request = reflection_pb2.ServerReflectionRequest(list_services="")
@@ -524,21 +1147,44 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
         services = tuple([s.name for s in resp.list_services_response.service])
         return services
 
-    async def get_file_descriptors_by_name(self, name):
-        request = reflection_pb2.ServerReflectionRequest(file_by_filename=name)
+    async def _deduplicated(
+        self, kind: str, key: str, factory: Callable[[], Awaitable]
+    ):
+        """
+        Share one in-flight lookup between all concurrent callers asking for the same key.
+        The lookup is shielded so a cancelled caller does not cancel it for the others.
+        """
+        pending = self._pending_lookups.get((kind, key))
+        if pending is None:
+            pending = asyncio.ensure_future(factory())
+            self._pending_lookups[(kind, key)] = pending
+            pending.add_done_callback(
+                lambda _: self._pending_lookups.pop((kind, key), None)
+            )
+        return await asyncio.shield(pending)
+
+    async def _fetch_file_descriptors(self, request):
         result = await self._reflection_single_request(request)
         return [
             descriptor_pb2.FileDescriptorProto.FromString(proto)
             for proto in result.file_descriptor_response.file_descriptor_proto
         ]
 
+    async def get_file_descriptors_by_name(self, name):
+        request = reflection_pb2.ServerReflectionRequest(file_by_filename=name)
+        file_descriptors = await self._deduplicated(
+            "file_by_filename", name, lambda: self._fetch_file_descriptors(request)
+        )
+        return list(file_descriptors)
+
     async def get_file_descriptors_by_symbol(self, symbol):
         request = reflection_pb2.ServerReflectionRequest(file_containing_symbol=symbol)
-        result = await self._reflection_single_request(request)
-        return [
-            descriptor_pb2.FileDescriptorProto.FromString(proto)
-            for proto in result.file_descriptor_response.file_descriptor_proto
-        ]
+        file_descriptors = await self._deduplicated(
+            "file_containing_symbol",
+            symbol,
+            lambda: self._fetch_file_descriptors(request),
+        )
+        return list(file_descriptors)
 
     def _is_descriptor_registered(self, filename):
         try:
@@ -557,10 +1203,24 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
         registration, this is not guaranteed in the reflection specification.
         :param file_descriptors: List of FileDescriptorProto to register
         """
-        for file_descriptor in file_descriptors:
-            await self._register_file_descriptor(file_descriptor, file_descriptors)
+        with self._span(
+            "grpc_requests.register_file_descriptors",
+            {"grpc_requests.files": len(file_descriptors)},
+        ):
+            for file_descriptor in file_descriptors:
+                await self._register_file_descriptor(file_descriptor, file_descriptors)
 
     async def _register_file_descriptor(self, file_descriptor, file_descriptors):
+        if not self._is_descriptor_registered(file_descriptor.name):
+            # Services registered concurrently often share dependencies, only one of
+            # them may add a given file to the pool
+            await self._deduplicated(
+                "register",
+                file_descriptor.name,
+                lambda: self._add_file_descriptor(file_descriptor, file_descriptors),
+            )
+
+    async def _add_file_descriptor(self, file_descriptor, file_descriptors):
         if not self._is_descriptor_registered(file_descriptor.name):
             logger.debug(f"start {file_descriptor.name} register")
             dependencies = list(file_descriptor.dependency)
@@ -603,11 +1263,58 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
         except KeyError:
             return False
 
+    async def _register_cached_descriptors(self) -> bool:
+        """
+        Register the descriptors of the descriptor cache into the pool, once per client.
+        :return: True if a valid cache entry was registered.
+        """
+        if self._descriptor_cache is None:
+            return False
+        if self._descriptor_cache_loaded is None:
+            service_names = (
+                await self.service_names()
+                if self._descriptor_cache.validate_services
+                else None
+            )
+            entry = self._descriptor_cache.load(self.endpoint, service_names)
+            self._descriptor_cache_loaded = entry is not None
+            if entry is not None:
+                logger.debug(f"loading {self.endpoint} descriptors from cache")
+                if self._service_names is None:
+                    self._service_names = list(entry.service_names)
+                await self.register_file_descriptors(entry.file_descriptors)
+        return self._descriptor_cache_loaded
+
+    async def _save_cached_descriptors(self):
+        service_names = await self.service_names()
+        files = [
+            self.get_service_descriptor(service_name).file
+            for service_name in service_names
+            if self._is_service_registered(service_name)
+        ]
+        self._descriptor_cache.save(  # type: ignore[union-attr]
+            self.endpoint, service_names, collect_file_descriptors(files)
+        )
+
+    async def register_all_service(self):
+        cached = await self._register_cached_descriptors()
+        await super(ReflectionAsyncClient, self).register_all_service()
+        if self._descriptor_cache is not None and not cached:
+            await self._save_cached_descriptors()
+
     async def register_service(self, service_name):
+        if not self._is_service_registered(service_name):
+            await self._register_cached_descriptors()
         if not self._is_service_registered(service_name):
             logger.debug(f"start {service_name} registration")
-            file_descriptors = await self.get_file_descriptors_by_symbol(service_name)
-            await self.register_file_descriptors(file_descriptors)
+            with self._span(
+                "grpc_requests.resolve_services",
+                {"grpc_requests.services": [service_name]},
+            ):
+                file_descriptors = await self.get_file_descriptors_by_symbol(
+                    service_name
+                )
+                await self.register_file_descriptors(file_descriptors)
             logger.debug(f"{service_name} registration complete")
         await super(ReflectionAsyncClient, self).register_service(service_name)
 
@@ -642,7 +1349,7 @@ class StubAsyncClient(BaseAsyncGrpcClient):
 
 class ServiceClient:
     _method_names: Tuple[str, ...]
-    _methods_meta: Dict[str, MethodMetaData]
+    _methods_meta: Mapping[str, MethodMetaData]
     client: BaseAsyncGrpcClient
     name: str
 
@@ -650,14 +1357,28 @@ class ServiceClient:
         self.client = client
         self.name = service_name
 
-    def _register_methods(self):
+    async def _register_methods(self):
+        if isinstance(self._methods_meta, LazyMethodsMeta):
+            # methods are bound on first call, see __getattr__
+            return
         for method in self._method_names:
-            setattr(self, method, partial(self.client.request, self.name, method))
+            setattr(self, method, await self.client.bind_method(self.name, method))
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self._methods_meta:
+            raise AttributeError(name)
+
+        async def bind_and_call(*args, **kwargs):
+            bound = await self.client.bind_method(self.name, name)
+            setattr(self, name, bound)
+            return await bound(*args, **kwargs)
+
+        return bind_and_call
 
     async def register(self):
         self._methods_meta = await self.client.get_methods_meta(self.name)
         self._method_names = tuple(self._methods_meta.keys())
-        self._register_methods()
+        await self._register_methods()
 
     @classmethod
     async def create(cls, client: BaseAsyncGrpcClient, service_name: str):
@@ -676,27 +1397,36 @@ class ServiceClient:
 
 AsyncClient = ReflectionAsyncClient
 
-_cached_clients: Dict[
-    str, Union[BaseAsyncClient, StubAsyncClient, ReflectionAsyncClient]
-] = {}
+_closing_clients: Set[asyncio.Task] = set()
+
+
+def _close_evicted_client(client: BaseAsyncClient):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # without a running loop the channels are released when the client is collected
+        return
+    task = loop.create_task(client.close())
+    _closing_clients.add(task)
+    task.add_done_callback(_closing_clients.discard)
+
+
+# Clients shared by get_by_endpoint, keyed by client class and connection settings
+client_cache = ClientCache(close=_close_evicted_client)
 
 
 def get_by_endpoint(endpoint, service_descriptors=None, **kwargs) -> AsyncClient:
-    global _cached_clients
-    if endpoint not in _cached_clients:
-        if service_descriptors:
-            _cached_clients[endpoint] = StubAsyncClient(
-                endpoint, service_descriptors=service_descriptors, **kwargs
-            )
-        else:
-            _cached_clients[endpoint] = AsyncClient(endpoint, **kwargs)
-    return _cached_clients[endpoint]  # type: ignore[return-value]
+    if service_descriptors:
+        return client_cache.get(  # type: ignore[return-value]
+            StubAsyncClient, endpoint, service_descriptors=service_descriptors, **kwargs
+        )
+    return client_cache.get(AsyncClient, endpoint, **kwargs)
 
 
 def reset_cached_async_client(endpoint=None):
-    global _cached_clients
-    if endpoint:
-        if endpoint in _cached_clients:
-            del _cached_clients[endpoint]
-    else:
-        _cached_clients = {}
+    """
+    Drop cached clients without closing them.
+
+    :param endpoint: If given, only the clients of this endpoint are dropped.
+    """
+    client_cache.clear(endpoint)
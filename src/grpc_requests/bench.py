@@ -0,0 +1,271 @@
+import asyncio
+import itertools
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import grpc
+
+from .aio import AsyncClient, MessageParsers
+from .client import _ENCODING_ERRORS, MethodType
+
+logger = logging.getLogger(__name__)
+
+REQUEST_NUMBER = "{{.RequestNumber}}"
+TIMESTAMP = "{{.TimestampUnix}}"
+PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+
+
+class RequestSource:
+    """
+    Requests of a benchmark, cycled through in order. Each request is a JSON text,
+    whose {{.RequestNumber}} and {{.TimestampUnix}} placeholders are replaced on
+    every call. Texts without placeholders are parsed once.
+
+    :param texts: JSON text of each request. Requests of client streaming methods
+        are JSON arrays of messages.
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        if not texts:
+            raise ValueError("at least one request is required")
+        self._texts = list(texts)
+        self._parsed = [
+            None if REQUEST_NUMBER in text or TIMESTAMP in text else json.loads(text)
+            for text in self._texts
+        ]
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "RequestSource":
+        with open(path) as f:
+            return cls([line for line in f if line.strip()])
+
+    def encode(self, encode: Callable[[Any], Any]):
+        """
+        Encode the requests without placeholders once, so calls send the messages, and
+        check that the others encode, so that a request not matching the method fails
+        before the first call.
+
+        :param encode: Encodes a parsed request into the message, or the messages, sent.
+        """
+        for index, parsed in enumerate(self._parsed):
+            try:
+                encoded = encode(self.get(index))
+            except _ENCODING_ERRORS as err:
+                raise ValueError(f"request {index + 1} is invalid: {err}") from err
+            if parsed is not None:
+                self._parsed[index] = encoded
+
+    def get(self, index: int):
+        parsed = self._parsed[index % len(self._parsed)]
+        if parsed is not None:
+            return parsed
+        text = self._texts[index % len(self._texts)]
+        text = text.replace(REQUEST_NUMBER, str(index))
+        return json.loads(text.replace(TIMESTAMP, str(int(time.time()))))
+
+
+class BenchReport(NamedTuple):
+    """
+    :param calls: Number of calls made.
+    :param elapsed: Seconds from the first call to the end of the last one.
+    :param latencies: Seconds each call took, sorted.
+    :param status_codes: Number of calls per status code name, e.g. OK.
+    :param cpu_seconds: CPU time of the client process during the benchmark.
+    """
+
+    calls: int
+    elapsed: float
+    latencies: List[float]
+    status_codes: Dict[str, int]
+    cpu_seconds: float
+
+    @property
+    def rps(self) -> float:
+        return self.calls / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        index = int(percent / 100 * len(self.latencies))
+        return self.latencies[min(index, len(self.latencies) - 1)]
+
+    def histogram(self, buckets: int = 10) -> List[Tuple[float, int]]:
+        """
+        Latency histogram with buckets of equal width between the fastest and slowest
+        calls, as (upper bound in seconds, number of calls) pairs.
+        """
+        if not self.latencies:
+            return []
+        fastest, slowest = self.latencies[0], self.latencies[-1]
+        width = (slowest - fastest) / buckets
+        counts = [0] * buckets
+        for latency in self.latencies:
+            index = int((latency - fastest) / width) if width else 0
+            counts[min(index, buckets - 1)] += 1
+        return [(fastest + width * (i + 1), count) for i, count in enumerate(counts)]
+
+    def as_dict(self) -> Dict[str, Any]:
+        latencies = self.latencies
+        return {
+            "calls": self.calls,
+            "elapsed": self.elapsed,
+            "rps": self.rps,
+            "fastest": latencies[0] if latencies else 0.0,
+            "slowest": latencies[-1] if latencies else 0.0,
+            "average": sum(latencies) / len(latencies) if latencies else 0.0,
+            "percentiles": {str(p): self.percentile(p) for p in PERCENTILES},
+            "histogram": self.histogram(),
+            "status_codes": self.status_codes,
+            "cpu_seconds": self.cpu_seconds,
+        }
+
+
+def format_report(report: BenchReport) -> str:
+    summary = report.as_dict()
+    lines = [
+        "Summary:",
+        f"  Count:\t{report.calls}",
+        f"  Total:\t{report.elapsed * 1e3:.2f} ms",
+        f"  Slowest:\t{summary['slowest'] * 1e3:.2f} ms",
+        f"  Fastest:\t{summary['fastest'] * 1e3:.2f} ms",
+        f"  Average:\t{summary['average'] * 1e3:.2f} ms",
+        f"  Requests/sec:\t{report.rps:.2f}",
+        f"  CPU:\t\t{report.cpu_seconds * 1e3:.2f} ms, "
+        f"{report.cpu_seconds / report.calls * 1e6 if report.calls else 0:.1f} us/call",
+        "",
+        "Response time histogram:",
+    ]
+    histogram = report.histogram()
+    most = max((count for _, count in histogram), default=0)
+    for bound, count in histogram:
+        bar = "∎" * (round(40 * count / most) if most else 0)
+        lines.append(f"  {bound * 1e3:.3f} [{count}]\t|{bar}")
+    lines += ["", "Latency distribution:"]
+    for percent in PERCENTILES:
+        lines.append(f"  {percent} % in {report.percentile(percent) * 1e3:.2f} ms")
+    lines += ["", "Status code distribution:"]
+    for code, count in sorted(report.status_codes.items()):
+        lines.append(f"  [{code}]\t{count} responses")
+    return "\n".join(lines)
+
+
+def _check_limits(
+    concurrency: int,
+    rps: Optional[float],
+    duration: Optional[float],
+    total: Optional[int],
+):
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if rps is not None and rps <= 0:
+        raise ValueError("rps must be positive")
+    if duration is None and total is None:
+        raise ValueError("duration or total is required")
+
+
+def _request_encoder(method_meta) -> Callable[[Any], Any]:
+    parse_request_data = MessageParsers().parse_request_data
+    input_type = method_meta.input_type
+    if method_meta.method_type.is_unary_request:
+        return lambda request: parse_request_data(request, input_type)
+    return lambda requests: [
+        parse_request_data(request, input_type)
+        for request in (requests if isinstance(requests, list) else [requests])
+    ]
+
+
+async def _call(call, method_type: MethodType, request, call_kwargs) -> grpc.StatusCode:
+    if not method_type.is_unary_request and not isinstance(request, list):
+        request = [request]
+    try:
+        result = await call(request, **call_kwargs)
+        if not method_type.is_unary_response:
+            async for _ in result:
+                pass
+    except grpc.RpcError as err:
+        return err.code()
+    return grpc.StatusCode.OK
+
+
+async def run_bench(
+    endpoint: str,
+    service: str,
+    method: str,
+    requests: RequestSource,
+    concurrency: int = 1,
+    rps: Optional[float] = None,
+    duration: Optional[float] = None,
+    total: Optional[int] = None,
+    timeout: Optional[float] = None,
+    metadata: Optional[Sequence[Tuple[str, str]]] = None,
+    **client_kwargs,
+) -> BenchReport:
+    """
+    Call a method repeatedly with an async client, which resolves it with reflection
+    like request does, until the duration has elapsed or total calls were made.
+    Unary responses are not decoded, streamed responses are read to the end.
+
+    :param endpoint: The endpoint of the server.
+    :param service: The full name of the service.
+    :param method: The name of the method.
+    :param requests: The requests, cycled through.
+    :param concurrency: Number of calls in flight at a time.
+    :param rps: If given, calls are started at this overall rate at most.
+    :param duration: Seconds after which no more calls are started.
+    :param total: Number of calls to make.
+    :param timeout: Timeout in seconds of each call.
+    :param metadata: Metadata sent with each call.
+    :param client_kwargs: Keyword arguments of the AsyncClient, e.g. ssl.
+    """
+    _check_limits(concurrency, rps, duration, total)
+    async with AsyncClient(endpoint, **client_kwargs) as client:
+        call = await client.bind_method(service, method)
+        method_meta = await client.get_method_meta(service, method)
+        method_type = method_meta.method_type
+        requests.encode(_request_encoder(method_meta))
+        call_kwargs: Dict[str, Any] = {"raw_output": True}
+        if timeout is not None:
+            call_kwargs["timeout"] = timeout
+        if metadata:
+            call_kwargs["metadata"] = list(metadata)
+
+        latencies: List[float] = []
+        status_codes: Counter = Counter()
+        indexes = itertools.count()
+        start = time.perf_counter()
+        deadline = start + duration if duration is not None else float("inf")
+
+        async def worker():
+            for index in indexes:
+                if total is not None and index >= total:
+                    return
+                if rps is not None:
+                    scheduled = start + index / rps
+                    if scheduled >= deadline:
+                        return
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                if time.perf_counter() >= deadline:
+                    return
+                call_start = time.perf_counter()
+                code = await _call(call, method_type, requests.get(index), call_kwargs)
+                latencies.append(time.perf_counter() - call_start)
+                status_codes[code.name] += 1
+
+        start_cpu = time.process_time()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        cpu_seconds = time.process_time() - start_cpu
+
+    logger.debug(f"{len(latencies)} calls in {elapsed:.3f}s")
+    return BenchReport(
+        calls=len(latencies),
+        elapsed=elapsed,
+        latencies=sorted(latencies),
+        status_codes=dict(status_codes),
+        cpu_seconds=cpu_seconds,
+    )
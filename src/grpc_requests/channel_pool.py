@@ -0,0 +1,122 @@
+import threading
+from itertools import count
+from typing import Any, List, Optional, Sequence, Tuple
+
+ROUND_ROBIN = "round_robin"
+LEAST_BUSY = "least_busy"
+POOL_STRATEGIES = (ROUND_ROBIN, LEAST_BUSY)
+
+# Channels created with identical arguments share their subchannels, and with them
+# the HTTP/2 connection, so every pooled channel gets its own value of this argument
+POOL_INDEX_OPTION = "grpc_requests.channel_pool_index"
+
+
+def pool_channel_options(
+    channel_options: Optional[Sequence[Tuple[str, Any]]], index: int
+) -> List[Tuple[str, Any]]:
+    """
+    :param channel_options: Channel options given to the client.
+    :param index: Index of the channel in the pool.
+    :return: Channel options of the pooled channel at index.
+    """
+    return [*(channel_options or []), (POOL_INDEX_OPTION, index)]
+
+
+class ChannelPool:
+    """
+    Spreads calls over several channels to the same endpoint, so they are not limited
+    by the concurrent streams of a single HTTP/2 connection.
+
+    :param channels: The pooled channels, sync or aio.
+    :param strategy: round_robin picks the channels in turn, least_busy picks the
+        channel with the fewest calls in flight.
+    """
+
+    def __init__(self, channels: Sequence[Any], strategy: str = ROUND_ROBIN):
+        if not channels:
+            raise ValueError("a channel pool needs at least one channel")
+        if strategy not in POOL_STRATEGIES:
+            raise ValueError(
+                f"unknown channel pool strategy {strategy}, expected one of {POOL_STRATEGIES}"
+            )
+        self.channels = list(channels)
+        self.strategy = strategy
+        self._turns = count()
+        self._in_flight = [0] * len(self.channels)
+        self._lock = threading.Lock()
+
+    @property
+    def tracks_in_flight(self) -> bool:
+        return self.strategy == LEAST_BUSY
+
+    def in_flight(self) -> List[int]:
+        """Number of calls in flight per channel, only tracked by least_busy pools."""
+        return list(self._in_flight)
+
+    def pick(self) -> int:
+        if self.strategy == ROUND_ROBIN:
+            return next(self._turns) % len(self.channels)
+        in_flight = self._in_flight
+        return min(range(len(in_flight)), key=in_flight.__getitem__)
+
+    def acquire(self, index: int):
+        with self._lock:
+            self._in_flight[index] += 1
+
+    def release(self, index: int):
+        with self._lock:
+            self._in_flight[index] -= 1
+
+    def multicallable(self, method_type: str, **kwargs) -> "PooledMultiCallable":
+        """
+        :param method_type: Name of the channel method creating the multicallable,
+            e.g. unary_unary.
+        :param kwargs: Arguments of the channel method.
+        :return: Multicallable spreading its calls over the pooled channels.
+        """
+        return PooledMultiCallable(
+            self,
+            [getattr(channel, method_type)(**kwargs) for channel in self.channels],
+        )
+
+
+class PooledMultiCallable:
+    """
+    Multicallable picking the channel of each call from a ChannelPool. Supports the
+    call, future and with_call interfaces of the multicallables it wraps.
+    """
+
+    def __init__(self, pool: ChannelPool, multicallables: List[Any]):
+        self._pool = pool
+        self._multicallables = multicallables
+
+    def _call(self, interface: Optional[str], args, kwargs):
+        index = self._pool.pick()
+        target = self._multicallables[index]
+        if interface is not None:
+            target = getattr(target, interface)
+        if not self._pool.tracks_in_flight:
+            return target(*args, **kwargs)
+
+        self._pool.acquire(index)
+        try:
+            result = target(*args, **kwargs)
+        except BaseException:
+            self._pool.release(index)
+            raise
+        add_done_callback = getattr(result, "add_done_callback", None)
+        if add_done_callback is None:
+            # blocking calls are complete once they return
+            self._pool.release(index)
+        else:
+            add_done_callback(lambda _: self._pool.release(index))
+        return result
+
+    def __call__(self, *args, **kwargs):
+        return self._call(None, args, kwargs)
+
+    def future(self, *args, **kwargs):
+        return self._call("future", args, kwargs)
+
+    def with_call(self, *args, **kwargs):
+        return self._call("with_call", args, kwargs)
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import json
+import sys
+from typing import List, Optional, Tuple
+
+import grpc
+
+from .aio import AsyncClient
+from .bench import RequestSource, format_report, run_bench
+from .replay import replay
+
+
+def _method(value: str) -> Tuple[str, str]:
+    service, _, method = value.rpartition("/")
+    if not service or not method:
+        raise argparse.ArgumentTypeError(f"expected service/method, got {value}")
+    return service, method
+
+
+def _metadata(value: str) -> Tuple[str, str]:
+    key, sep, item = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected key=value, got {value}")
+    return key, item
+
+
+def _add_bench_parser(subparsers):
+    parser = subparsers.add_parser(
+        "bench",
+        help="load test a method",
+        description="Call a method repeatedly through the async client and report "
+        "latencies, throughput, status codes and client CPU.",
+    )
+    parser.add_argument("endpoint", help="host:port of the server")
+    parser.add_argument(
+        "method", type=_method, help="full service name and method, e.g. pkg.Svc/Call"
+    )
+    data = parser.add_mutually_exclusive_group(required=True)
+    data.add_argument(
+        "-d",
+        "--data",
+        help="JSON request template, {{.RequestNumber}} and {{.TimestampUnix}} "
+        "are replaced on every call",
+    )
+    data.add_argument(
+        "-D", "--data-file", help="JSONL file of requests, cycled through in order"
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=1, help="calls in flight at a time"
+    )
+    parser.add_argument("--rps", type=float, help="maximum calls started per second")
+    parser.add_argument(
+        "-z", "--duration", type=float, help="seconds to run for, 10 without --total"
+    )
+    parser.add_argument("-n", "--total", type=int, help="number of calls to make")
+    parser.add_argument("-t", "--timeout", type=float, help="seconds per call")
+    parser.add_argument(
+        "-m",
+        "--metadata",
+        type=_metadata,
+        action="append",
+        help="key=value metadata of every call, repeatable",
+    )
+    parser.add_argument("--ssl", action="store_true", help="use a secure channel")
+    parser.add_argument(
+        "--format", choices=("summary", "json"), default="summary", dest="output"
+    )
+    parser.set_defaults(run=_bench)
+
+
+def _bench(args) -> int:
+    if args.data is not None:
+        requests = RequestSource([args.data])
+    else:
+        requests = RequestSource.from_jsonl(args.data_file)
+    duration = args.duration
+    if duration is None and args.total is None:
+        duration = 10.0
+    service, method = args.method
+    report = asyncio.run(
+        run_bench(
+            args.endpoint,
+            service,
+            method,
+            requests,
+            concurrency=args.concurrency,
+            rps=args.rps,
+            duration=duration,
+            total=args.total,
+            timeout=args.timeout,
+            metadata=args.metadata,
+            ssl=args.ssl,
+        )
+    )
+    if args.output == "json":
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        print(format_report(report))
+    return 0 if report.status_codes.keys() <= {"OK"} else 1
+
+
+def _add_replay_parser(subparsers):
+    parser = subparsers.add_parser(
+        "replay",
+        help="replay a JSONL file of requests",
+        description="Call a method once per line of a JSONL file through the async "
+        "client and write each response or error as a line of a JSONL file.",
+    )
+    parser.add_argument("endpoint", help="host:port of the server")
+    parser.add_argument(
+        "method", type=_method, help="full service name and method, e.g. pkg.Svc/Call"
+    )
+    parser.add_argument("input", help="JSONL file of requests")
+    parser.add_argument("output", help="JSONL file of results")
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=64, help="calls in flight at a time"
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="write results as calls complete instead of in the order of requests",
+    )
+    parser.add_argument(
+        "--checkpoint", help="file saving the progress, resumed from if it exists"
+    )
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=1000, help="results between saves"
+    )
+    parser.add_argument("-t", "--timeout", type=float, help="seconds per call")
+    parser.add_argument(
+        "-m",
+        "--metadata",
+        type=_metadata,
+        action="append",
+        help="key=value metadata of every call, repeatable",
+    )
+    parser.add_argument("--ssl", action="store_true", help="use a secure channel")
+    parser.set_defaults(run=_replay)
+
+
+async def _run_replay(args):
+    service, method = args.method
+    kwargs = {}
+    if args.timeout is not None:
+        kwargs["timeout"] = args.timeout
+    if args.metadata:
+        kwargs["metadata"] = args.metadata
+    async with AsyncClient(args.endpoint, ssl=args.ssl) as client:
+        return await replay(
+            client,
+            service,
+            method,
+            args.input,
+            args.output,
+            max_in_flight=args.concurrency,
+            ordered=not args.unordered,
+            checkpoint_path=args.checkpoint,
+            checkpoint_every=args.checkpoint_every,
+            **kwargs,
+        )
+
+
+def _replay(args) -> int:
+    stats = asyncio.run(_run_replay(args))
+    print(
+        f"replayed {stats.records} records in {stats.elapsed:.2f}s, "
+        f"{stats.errors} errors, {stats.skipped} skipped"
+    )
+    return 0
+
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m grpc_requests")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    _add_bench_parser(subparsers)
+    _add_replay_parser(subparsers)
+    args = parser.parse_args(argv)
+    try:
+        return args.run(args)
+    except ValueError as err:
+        parser.exit(2, f"{parser.prog}: error: {err}\n")
+    except grpc.RpcError as err:
+        parser.exit(1, f"{parser.prog}: error: {err.code().name} {err.details()}\n")
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -1,11 +1,19 @@
+import concurrent.futures
 import logging
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
 from enum import Enum
-from functools import partial
 from typing import (
     Any,
+    Callable,
     Dict,
+    Hashable,
     Iterable,
+    Iterator,
     List,
+    Mapping,
     NamedTuple,
     Optional,
     Tuple,
@@ -16,10 +24,29 @@ import grpc
 from google.protobuf import descriptor_pb2, message_factory
 from google.protobuf import descriptor_pool as _descriptor_pool
 from google.protobuf.descriptor import MethodDescriptor, ServiceDescriptor
-from google.protobuf.descriptor_pb2 import ServiceDescriptorProto
-from google.protobuf.json_format import MessageToDict, ParseDict
+from google.protobuf.descriptor_pb2 import MethodDescriptorProto
+from google.protobuf.json_format import MessageToDict, ParseDict, ParseError
 from grpc_reflection.v1alpha import reflection_pb2, reflection_pb2_grpc
 
+from .channel_pool import ROUND_ROBIN, ChannelPool, pool_channel_options
+from .client_cache import ClientCache
+from .codec import MessageDecoder, MessageEncoder, MessageView
+from .descriptor_cache import DescriptorCache, collect_file_descriptors
+from .metrics import (
+    InstrumentedMultiCallable,
+    InstrumentedParsers,
+    Metrics,
+)
+from .schema_registry import MethodSchema, ServiceSchema, schema_registry
+from .singleflight import SingleFlight, call_key
+from .tracing import (
+    TracedMultiCallable,
+    TracedParsers,
+    REFLECTION_ATTRIBUTES,
+    Tracer,
+    rpc_attributes,
+)
+from .upload import BufferedUpload, UploadResult
 from .utils import describe_descriptor, load_data
 
 import importlib.metadata
@@ -65,6 +92,52 @@ def reflection_request(channel, requests):
         logger.exception(err)
 
 
+class ReflectionSession:
+    """
+    Keeps a single ServerReflectionInfo stream open so that many reflection
+    lookups can be pipelined over it instead of opening a stream per lookup.
+    Responses are returned in the order their requests were sent.
+    """
+
+    def __init__(self, reflection_stub):
+        self._requests: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._responses = reflection_stub.ServerReflectionInfo(self._request_iterator())
+        self._closed = False
+
+    def _request_iterator(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            yield request
+
+    def request(self, *requests):
+        """
+        Send all requests before reading any response, and return the responses in order.
+        """
+        if self._closed:
+            raise ValueError("reflection session is closed")
+        for request in requests:
+            self._requests.put(request)
+        try:
+            return [next(self._responses) for _ in requests]
+        except StopIteration as err:
+            raise ValueError(
+                "reflection stream ended before all responses were received"
+            ) from err
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._requests.put(None)
+        try:
+            for _ in self._responses:
+                pass
+        except grpc.RpcError as err:
+            logger.debug("reflection session closed with error", exc_info=err)
+
+
 PathLikeString = str
 
 
@@ -85,54 +158,96 @@ class BaseClient:
         compression=None,
         credentials: Optional[CredentialsInfo] = None,
         interceptors=None,
+        channel_pool_size: int = 1,
+        channel_pool_strategy: str = ROUND_ROBIN,
         **kwargs,
     ):
         self.endpoint = endpoint
         self._desc_pool = descriptor_pool or _descriptor_pool.Default()
         self.compression = compression
         self.channel_options = channel_options
-        if ssl:
+        self._ssl = ssl
+        self._credentials = credentials
+        self._interceptors = interceptors
+        if channel_pool_size < 1:
+            raise ValueError("channel_pool_size must be at least 1")
+        self._channel_pool: Optional[ChannelPool] = None
+        if channel_pool_size == 1:
+            self._channel = self._create_channel(self.channel_options)
+        else:
+            self._channel_pool = ChannelPool(
+                [
+                    self._create_channel(pool_channel_options(self.channel_options, i))
+                    for i in range(channel_pool_size)
+                ],
+                channel_pool_strategy,
+            )
+            self._channel = self._channel_pool.channels[0]
+
+    def _create_channel(self, channel_options):
+        if self._ssl:
             _credentials = {}
-            if credentials:
+            if self._credentials:
                 _credentials = {
                     k: load_data(v) if isinstance(v, str) else v
-                    for k, v in credentials.items()
+                    for k, v in self._credentials.items()
                 }
 
-            self._channel = grpc.secure_channel(
-                endpoint,
+            channel = grpc.secure_channel(
+                self.endpoint,
                 grpc.ssl_channel_credentials(**_credentials),
-                options=self.channel_options,
+                options=channel_options,
                 compression=self.compression,
             )
         else:
-            self._channel = grpc.insecure_channel(
-                endpoint, options=self.channel_options, compression=self.compression
+            channel = grpc.insecure_channel(
+                self.endpoint, options=channel_options, compression=self.compression
             )
 
-        if interceptors:
-            self._channel = grpc.intercept_channel(self._channel, *interceptors)
+        if self._interceptors:
+            channel = grpc.intercept_channel(channel, *self._interceptors)
+        return channel
 
     @property
     def channel(self):
         return self._channel
 
+    @property
+    def channels(self):
+        if self._channel_pool is None:
+            return [self._channel]
+        return self._channel_pool.channels
+
+    def _make_handler(self, method_type: str, **kwargs):
+        """
+        Create the multicallable of a method, spreading its calls over the channel
+        pool if the client has one.
+
+        :param method_type: Name of the channel method creating the multicallable,
+            e.g. unary_unary.
+        :param kwargs: Arguments of the channel method.
+        """
+        if self._channel_pool is None:
+            return getattr(self._channel, method_type)(**kwargs)
+        return self._channel_pool.multicallable(method_type, **kwargs)
+
     @classmethod
     def get_by_endpoint(cls, endpoint, **kwargs):
-        global _cached_clients
-        if endpoint not in _cached_clients:
-            _cached_clients[endpoint] = cls(endpoint, **kwargs)
-        return _cached_clients[endpoint]
+        return client_cache.get(cls, endpoint, **kwargs)
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         try:
-            self._channel._close()
+            self.close()
         except Exception as e:  # pylint: disable=bare-except
             logger.warning("can not close channel", exc_info=e)
         return False
 
     def __del__(self):
-        if self._channel:
+        if getattr(self, "_channel", None):
             try:
                 del self._channel
             except Exception as e:  # pylint: disable=bare-except
@@ -167,6 +282,40 @@ class MessageParsers(MessageParsersProtocol):
             yield self.parse_response(resp)
 
 
+class CompiledMessageParsers(MessageParsers):
+    """
+    MessageParsers variant that builds a dedicated encoder the first time each input
+    type is seen, and a dedicated decoder the first time each output type is seen,
+    instead of walking the descriptors through ParseDict and MessageToDict on every
+    message. Produces the same messages and dictionaries as MessageParsers.
+    """
+
+    def __init__(self):
+        self._encoder = MessageEncoder()
+        self._decoder = MessageDecoder()
+
+    def parse_request_data(self, request_data, input_type):
+        _data = request_data or {}
+        if isinstance(_data, dict):
+            return self._encoder.encode(_data, input_type)
+        return _data
+
+    def parse_response(self, response):
+        return self._decoder.decode(response)
+
+
+class MessageViewParsers(CompiledMessageParsers):
+    """
+    CompiledMessageParsers variant returning responses as read-only MessageView
+    mappings, which convert each field only when it is accessed. Views compare equal
+    to the dictionaries of CompiledMessageParsers, and their to_dict method converts
+    the whole message.
+    """
+
+    def parse_response(self, response) -> MessageView:
+        return self._decoder.view(response)
+
+
 class CustomArgumentParsers(MessageParsersProtocol):
     _message_to_dict_kwargs: Optional[Dict[str, Any]]
     _parse_dict_kwargs: Optional[Dict[str, Any]]
@@ -237,6 +386,45 @@ class MethodMetaData(NamedTuple):
             return self.parsers.parse_stream_responses
 
 
+# lazy mode registering each method on its first use rather than each service
+LAZY_METHODS = "method"
+
+
+class LazyMethodsMeta(Mapping):
+    """
+    Methods meta of a service registered with lazy="method". The meta of a method,
+    with its message classes and handler, is only built the first time it is
+    looked up, so the cost of a service scales with the methods actually used.
+    """
+
+    def __init__(self, method_names: Iterable[str], build: Callable[[str], Any]):
+        self._method_names = tuple(method_names)
+        self._names = frozenset(self._method_names)
+        self._build = build
+        self._built: Dict[str, Any] = {}
+
+    def __getitem__(self, method_name: str):
+        method_meta = self._built.get(method_name)
+        if method_meta is None:
+            if method_name not in self._names:
+                raise KeyError(method_name)
+            method_meta = self._built.setdefault(method_name, self._build(method_name))
+        return method_meta
+
+    def __contains__(self, method_name) -> bool:
+        return method_name in self._names
+
+    def __iter__(self):
+        return iter(self._method_names)
+
+    def __len__(self) -> int:
+        return len(self._method_names)
+
+    @property
+    def built_method_names(self) -> Tuple[str, ...]:
+        return tuple(self._built)
+
+
 MethodTypeMatch: Dict[Tuple[bool, bool], MethodType] = {
     (False, False): MethodType.UNARY_UNARY,
     (True, False): MethodType.STREAM_UNARY,
@@ -245,6 +433,66 @@ MethodTypeMatch: Dict[Tuple[bool, bool], MethodType] = {
 }
 
 
+# errors encoding a single request, e.g. a dict that does not match its message
+_ENCODING_ERRORS = (ParseError, ValueError, TypeError)
+
+
+def _chunk_encoder(parsers, input_type) -> Callable[[List], List]:
+    """
+    Encodes a chunk of requests with one compiled encoder of the input type, which
+    produces the messages MessageParsers would. Parsers customizing how requests are
+    parsed, or instrumenting it, still parse each request on its own.
+    """
+    parse_request_data = type(parsers).parse_request_data
+    if parse_request_data is CompiledMessageParsers.parse_request_data:
+        encoder = parsers._encoder
+    elif parse_request_data is MessageParsers.parse_request_data:
+        encoder = MessageEncoder()
+    else:
+        return lambda chunk: [
+            parsers.parse_request_data(record, input_type) for record in chunk
+        ]
+    return lambda chunk: encoder.encode_chunk(chunk, input_type)
+
+
+def _ordered_results(send, collect, requests: Iterable, max_in_flight: int):
+    in_flight: deque = deque()
+    try:
+        for request in requests:
+            if len(in_flight) >= max_in_flight:
+                yield collect(in_flight.popleft())
+            in_flight.append(send(request))
+        while in_flight:
+            yield collect(in_flight.popleft())
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def _completed_results(send, collect, requests: Iterable, max_in_flight: int):
+    completed: queue.SimpleQueue = queue.SimpleQueue()
+    in_flight: Dict[int, grpc.Future] = {}
+    try:
+        for index, request in enumerate(requests):
+            if len(in_flight) >= max_in_flight:
+                done = completed.get()
+                yield done, collect(in_flight.pop(done))
+            future = send(request)
+            in_flight[index] = future
+            future.add_done_callback(lambda _, index=index: completed.put(index))
+        while in_flight:
+            done = completed.get()
+            yield done, collect(in_flight.pop(done))
+    finally:
+        for future in in_flight.values():
+            future.cancel()
+
+
+def serialize_bytes(data) -> bytes:
+    """Identity request serializer of pre-serialized messages, e.g. bytes or memoryview."""
+    return data if type(data) is bytes else bytes(data)
+
+
 class BaseGrpcClient(BaseClient):
     def __init__(
         self,
@@ -256,6 +504,10 @@ class BaseGrpcClient(BaseClient):
         compression=None,
         skip_check_method_available=False,
         message_parsers: Optional[MessageParsersProtocol] = None,
+        metrics: Optional[Metrics] = None,
+        tracer: Optional[Tracer] = None,
+        idempotent_methods: Optional[Iterable[str]] = None,
+        single_flight_metadata: Optional[Iterable[str]] = None,
         **kwargs,
     ):
         super().__init__(
@@ -271,17 +523,53 @@ class BaseGrpcClient(BaseClient):
         self.has_server_registered = False
         self._skip_check_method_available = skip_check_method_available
         self._message_parsers = message_parsers if message_parsers else MessageParsers()
-        self._service_methods_meta: Dict[str, Dict[str, MethodMetaData]] = {}
+        self._metrics = metrics
+        self._tracer = tracer
+        # unary calls of these "service/method" names share identical calls in flight
+        self._idempotent_methods = frozenset(idempotent_methods or ())
+        self._single_flight_metadata = (
+            None
+            if single_flight_metadata is None
+            else frozenset(single_flight_metadata)
+        )
+        self._single_flight = SingleFlight() if self._idempotent_methods else None
+        self._service_methods_meta: Dict[str, Mapping[str, MethodMetaData]] = {}
+        self._bytes_handlers: Dict[Tuple[str, str], Any] = {}
 
     def _get_service_names(self):
         raise NotImplementedError()
 
+    def _span(self, name: str, attributes: Dict[str, Any]):
+        if self._tracer is None:
+            return nullcontext()
+        return self._tracer.span(name, attributes)
+
+    def _is_single_flight(self, name: str, method_meta: MethodMetaData) -> bool:
+        return (
+            method_meta.method_type == MethodType.UNARY_UNARY
+            and name in self._idempotent_methods
+        )
+
+    def _single_flight_key(
+        self, name: str, method_meta: MethodMetaData, request, raw_output, kwargs
+    ) -> Optional[Hashable]:
+        if not self._is_single_flight(name, method_meta):
+            return None
+        return call_key(name, request, raw_output, kwargs, self._single_flight_metadata)
+
     def check_method_available(
         self, service, method, method_type: Optional[MethodType] = None
     ):
         if self._skip_check_method_available:
             return True
-        if not self.has_server_registered:
+        if self._lazy:
+            # resolves the requested service only, others are resolved on first use
+            if (
+                service not in self._service_methods_meta
+                and service in self.service_names
+            ):
+                self.register_service(service)
+        elif not self.has_server_registered:
             self.register_all_service()
         logger.debug(service)
         methods_meta = self._service_methods_meta.get(service)
@@ -301,61 +589,123 @@ class BaseGrpcClient(BaseClient):
             )
         return True
 
+    def _build_method_schema(self, method_desc: MethodDescriptor) -> MethodSchema:
+        method_proto = MethodDescriptorProto()
+        method_desc.CopyToProto(method_proto)
+
+        if get_message_class_supported:
+            input_type = GetMessageClass(method_desc.input_type)
+            output_type = GetMessageClass(method_desc.output_type)
+        else:
+            msg_factory = message_factory.MessageFactory(self._desc_pool)
+            input_type = msg_factory.GetPrototype(method_desc.input_type)
+            output_type = msg_factory.GetPrototype(method_desc.output_type)
+
+        return MethodSchema(
+            name=method_desc.name,
+            input_type=input_type,
+            output_type=output_type,
+            client_streaming=method_proto.client_streaming,
+            server_streaming=method_proto.server_streaming,
+            descriptor=method_desc,
+        )
+
+    def _build_service_schema(
+        self, service_descriptor: ServiceDescriptor, fingerprint: str
+    ) -> ServiceSchema:
+        return ServiceSchema(
+            service_descriptor.full_name,
+            fingerprint,
+            tuple(
+                self._build_method_schema(method_desc)
+                for method_desc in service_descriptor.methods
+            ),
+        )
+
+    def _make_method_meta(self, service_name: str, method: MethodSchema):
+        method_type = MethodTypeMatch[
+            (method.client_streaming, method.server_streaming)
+        ]
+        handler = self._make_handler(
+            method_type.value,
+            method=self._make_method_full_name(service_name, method.name),
+            request_serializer=method.input_type.SerializeToString,
+            response_deserializer=method.output_type.FromString,
+        )
+        parsers = self._message_parsers
+        if self._metrics is not None:
+            recorder = self._metrics.recorder(service_name, method.name)
+            handler = InstrumentedMultiCallable(
+                handler, recorder, method.server_streaming
+            )
+            parsers = InstrumentedParsers(parsers, recorder)
+        if self._tracer is not None:
+            attributes = rpc_attributes(service_name, method.name)
+            handler = TracedMultiCallable(
+                handler,
+                self._tracer,
+                f"{service_name}/{method.name}",
+                attributes,
+                method.server_streaming,
+            )
+            parsers = TracedParsers(parsers, self._tracer, attributes)
+        return MethodMetaData(
+            method_type=method_type,
+            input_type=method.input_type,
+            output_type=method.output_type,
+            handler=handler,
+            descriptor=method.descriptor,
+            parsers=parsers,
+        )
+
     def _register_methods(
         self, service_descriptor: ServiceDescriptor
-    ) -> Dict[str, MethodMetaData]:
-        svc_desc_proto = ServiceDescriptorProto()
-        service_descriptor.CopyToProto(svc_desc_proto)
-        service_full_name = service_descriptor.full_name
-        metadata: Dict[str, MethodMetaData] = {}
-        for method_proto in svc_desc_proto.method:
-            method_name = method_proto.name
-            method_desc: MethodDescriptor = service_descriptor.methods_by_name[
-                method_name
-            ]
-
-            if get_message_class_supported:
-                input_type = GetMessageClass(method_desc.input_type)
-                output_type = GetMessageClass(method_desc.output_type)
-            else:
-                msg_factory = message_factory.MessageFactory(self._desc_pool)
-                input_type = msg_factory.GetPrototype(method_desc.input_type)
-                output_type = msg_factory.GetPrototype(method_desc.output_type)
-
-            method_type = MethodTypeMatch[
-                (method_proto.client_streaming, method_proto.server_streaming)
-            ]
-
-            method_register_func = getattr(self.channel, method_type.value)
-            handler = method_register_func(
-                method=self._make_method_full_name(service_full_name, method_name),
-                request_serializer=input_type.SerializeToString,
-                response_deserializer=output_type.FromString,
+    ) -> Mapping[str, MethodMetaData]:
+        service_name = service_descriptor.full_name
+        if self._lazy == LAZY_METHODS:
+            return LazyMethodsMeta(
+                [method_desc.name for method_desc in service_descriptor.methods],
+                lambda name: self._make_method_meta(
+                    service_name,
+                    self._build_method_schema(service_descriptor.methods_by_name[name]),
+                ),
             )
-            metadata[method_name] = MethodMetaData(
-                method_type=method_type,
-                input_type=input_type,
-                output_type=output_type,
-                handler=handler,
-                descriptor=method_desc,
-                parsers=self._message_parsers,
+
+        # message classes are shared by all clients of the same schema, descriptors
+        # come from the pool of this client
+        schema = schema_registry.get_or_create(
+            service_descriptor, self._build_service_schema
+        )
+        methods_by_name = service_descriptor.methods_by_name
+        return {
+            method.name: self._make_method_meta(
+                service_name,
+                method._replace(descriptor=methods_by_name[method.name]),
             )
-        return metadata
+            for method in schema.methods
+        }
 
     def register_service(self, service_name):
         logger.debug(f"start {service_name} registration")
-        try:
-            svc_desc = self.get_service_descriptor(service_name)
-            self._service_methods_meta[service_name] = self._register_methods(svc_desc)
-        except KeyError:
-            logger.debug(
-                f"{service_name} not found in descriptor pool, methods will not be registered"
-            )
+        with self._span(
+            "grpc_requests.register_service", {"rpc.service": service_name}
+        ):
+            try:
+                svc_desc = self.get_service_descriptor(service_name)
+                self._service_methods_meta[service_name] = self._register_methods(
+                    svc_desc
+                )
+            except KeyError:
+                logger.debug(
+                    f"{service_name} not found in descriptor pool, methods will not be registered"
+                )
         logger.debug(f"end {service_name} registration")
 
     def register_all_service(self):
         for service in self.service_names:
-            self.register_service(service)
+            # keep the methods meta of services already registered lazily
+            if service not in self._service_methods_meta:
+                self.register_service(service)
         self.has_server_registered = True
 
     @property
@@ -386,7 +736,22 @@ class BaseGrpcClient(BaseClient):
         method_meta = self.get_method_meta(service, method)
 
         _request = method_meta.request_parser(request, method_meta.input_type)
-        result = method_meta.handler(_request, **kwargs)
+        if self._single_flight is not None:
+            name = f"{service}/{method}"
+            key = self._single_flight_key(
+                name, method_meta, _request, raw_output, kwargs
+            )
+            if key is not None:
+                return self._single_flight.do(
+                    key,
+                    lambda: self._call(method_meta, _request, raw_output, kwargs),
+                    kwargs.get("timeout"),
+                )
+        return self._call(method_meta, _request, raw_output, kwargs)
+
+    @staticmethod
+    def _call(method_meta: MethodMetaData, request, raw_output, kwargs):
+        result = method_meta.handler(request, **kwargs)
 
         if raw_output:
             return result
@@ -397,6 +762,153 @@ class BaseGrpcClient(BaseClient):
         self.check_method_available(service, method)
         return self._request(service, method, request, raw_output, **kwargs)
 
+    def request_many(
+        self,
+        service: str,
+        method: str,
+        requests: Iterable,
+        max_in_flight: int = 64,
+        ordered: bool = True,
+        raw_output: bool = False,
+        return_exceptions: bool = False,
+        **kwargs,
+    ) -> Iterator:
+        """
+        Make one request per item of requests to a method with a unary response,
+        keeping up to max_in_flight of them in flight on the channel at once.
+
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :param requests: Iterable of requests, each as accepted by request. It is
+            consumed lazily, as requests complete.
+        :param max_in_flight: Maximum number of requests awaiting a response.
+        :param ordered: If True, results are yielded in the order of requests.
+            Otherwise (index, result) tuples are yielded as requests complete.
+        :param raw_output: If True, responses are not parsed.
+        :param return_exceptions: If True, a failed request yields its grpc.RpcError,
+            or the error encoding it, instead of raising it.
+        :param kwargs: Keyword arguments passed to every call, e.g. timeout or metadata.
+        :return: Iterator of results. Requests still in flight are cancelled when it
+            is closed.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.check_method_available(service, method)
+        method_meta = self.get_method_meta(service, method)
+        if not method_meta.method_type.is_unary_response:
+            raise ValueError(
+                f"{method} is {method_meta.method_type.value}, request_many needs a unary response"
+            )
+
+        future_call = method_meta.handler.future
+        input_type = method_meta.input_type
+        parse_request = method_meta.request_parser
+        parse_response = method_meta.response_parser
+
+        def send(request):
+            try:
+                return future_call(parse_request(request, input_type), **kwargs)
+            except _ENCODING_ERRORS as err:
+                if not return_exceptions:
+                    raise
+                # the request is not sent, its result is the error
+                failed: concurrent.futures.Future = concurrent.futures.Future()
+                failed.set_exception(err)
+                return failed
+
+        def collect(future):
+            try:
+                response = future.result()
+            except (grpc.RpcError, *_ENCODING_ERRORS) as err:
+                if return_exceptions:
+                    return err
+                raise
+            return response if raw_output else parse_response(response)
+
+        if ordered:
+            return _ordered_results(send, collect, requests, max_in_flight)
+        return _completed_results(send, collect, requests, max_in_flight)
+
+    def stream_upload(
+        self,
+        service: str,
+        method: str,
+        records: Iterable,
+        chunk_size: int = 256,
+        buffer_chunks: int = 4,
+        raw_output: bool = False,
+        **kwargs,
+    ) -> UploadResult:
+        """
+        Stream a large number of records to a stream_unary method. Records are encoded
+        a chunk at a time in a background thread, ahead of the messages being written,
+        which amortizes the per message overhead of a request stream. A chunk is
+        encoded with one compiled encoder of the input type, unless the client's
+        message parsers customize request parsing or metrics or tracing instrument
+        it, in which case each record is parsed on its own.
+
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :param records: Iterable of requests, each as accepted by request. It is
+            consumed from the encoding thread.
+        :param chunk_size: Number of records encoded at once.
+        :param buffer_chunks: Maximum number of encoded chunks waiting to be written.
+        :param raw_output: If True, the response is not parsed.
+        :param kwargs: Keyword arguments of the call, e.g. timeout or metadata.
+        :return: The response and the stats of the upload.
+        """
+        self.check_method_available(service, method, MethodType.STREAM_UNARY)
+        method_meta = self.get_method_meta(service, method)
+        encode_chunk = _chunk_encoder(method_meta.parsers, method_meta.input_type)
+        upload = BufferedUpload(encode_chunk, chunk_size, buffer_chunks)
+        try:
+            response = method_meta.handler(upload.requests(records), **kwargs)
+        except grpc.RpcError as err:
+            if upload.error is not None:
+                raise upload.error from err
+            raise
+        finally:
+            # grpc stops pulling requests from a terminated call without closing them
+            upload.close()
+        if not raw_output:
+            response = method_meta.response_parser(response)
+        return UploadResult(response, upload.stats())
+
+    def get_bytes_handler(self, service: str, method: str):
+        """
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :return: Multicallable of the method sending pre-serialized requests and
+            returning the response bytes, without any protobuf parsing.
+        """
+        key = (service, method)
+        handler = self._bytes_handlers.get(key)
+        if handler is None:
+            self.check_method_available(service, method)
+            method_meta = self.get_method_meta(service, method)
+            handler = self._make_handler(
+                method_meta.method_type.value,
+                method=self._make_method_full_name(service, method),
+                request_serializer=serialize_bytes,
+                response_deserializer=None,
+            )
+            self._bytes_handlers[key] = handler
+        return handler
+
+    def request_bytes(self, service: str, method: str, request, **kwargs):
+        """
+        Forward wire format messages to a method untouched.
+
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :param request: Serialized request as bytes or memoryview, or an iterable of
+            them for client streaming methods.
+        :param kwargs: Keyword arguments of the call, e.g. timeout or metadata.
+        :return: The serialized response, or an iterator of them for server
+            streaming methods.
+        """
+        return self.get_bytes_handler(service, method)(request, **kwargs)
+
     def unary_unary(self, service, method, request=None, raw_output=False, **kwargs):
         self.check_method_available(service, method, MethodType.UNARY_UNARY)
         return self._request(service, method, request, raw_output, **kwargs)
@@ -441,6 +953,60 @@ class BaseGrpcClient(BaseClient):
         # add lazy mode & exception
         return self._service_methods_meta[service][method]
 
+    def bind_method(
+        self, service: str, method: str, method_type: Optional[MethodType] = None
+    ) -> Callable[..., Any]:
+        """
+        Resolve a method once into a callable with its parsers and handler already
+        chosen. The callable takes the same request, raw_output and keyword arguments
+        as request, without repeating the availability check and lookups on each call.
+
+        :param service: The full name of the service.
+        :param method: The name of the method.
+        :param method_type: If given, the method must be of this type.
+        :return: Callable making requests to the method.
+        """
+        self.check_method_available(service, method, method_type)
+        methods_meta = self.get_methods_meta(service)
+        try:
+            method_meta = methods_meta[method]
+        except KeyError as err:
+            raise ValueError(f"{service} doesn't support {method} method") from err
+
+        handler = method_meta.handler
+        input_type = method_meta.input_type
+        parse_request = method_meta.request_parser
+        parse_response = method_meta.response_parser
+
+        def call(request=None, raw_output=False, **kwargs):
+            result = handler(parse_request(request, input_type), **kwargs)
+            if raw_output:
+                return result
+            return parse_response(result)
+
+        name = f"{service}/{method}"
+        if self._single_flight is None or not self._is_single_flight(name, method_meta):
+            return call
+        return self._bind_single_flight(name, method_meta, self._single_flight)
+
+    def _bind_single_flight(
+        self, name: str, method_meta: MethodMetaData, single_flight: SingleFlight
+    ) -> Callable[..., Any]:
+        def call(request=None, raw_output=False, **kwargs):
+            message = method_meta.request_parser(request, method_meta.input_type)
+            key = call_key(
+                name, message, raw_output, kwargs, self._single_flight_metadata
+            )
+            if key is None:
+                return self._call(method_meta, message, raw_output, kwargs)
+            return single_flight.do(
+                key,
+                lambda: self._call(method_meta, message, raw_output, kwargs),
+                kwargs.get("timeout"),
+            )
+
+        return call
+
     def make_handler_argument(self, service: str, method: str):
         data_type = self.get_method_meta(service, method)
         return {
@@ -467,6 +1033,7 @@ class ReflectionClient(BaseGrpcClient):
         lazy=False,
         ssl=False,
         compression=None,
+        descriptor_cache: Optional[DescriptorCache] = None,
         **kwargs,
     ):
         super().__init__(
@@ -479,6 +1046,10 @@ class ReflectionClient(BaseGrpcClient):
             **kwargs,
         )
         self.reflection_stub = reflection_pb2_grpc.ServerReflectionStub(self.channel)
+        # sessions are per thread, a stream must not interleave lookups of two threads
+        self._reflection_sessions = threading.local()
+        self._descriptor_cache = descriptor_cache
+        self._descriptor_cache_loaded: Optional[bool] = None
         if not self._lazy:
             self.register_all_service()
 
@@ -486,8 +1057,48 @@ class ReflectionClient(BaseGrpcClient):
         responses = self.reflection_stub.ServerReflectionInfo((r for r in requests))
         return responses
 
+    @property
+    def _reflection_session(self) -> Optional[ReflectionSession]:
+        return getattr(self._reflection_sessions, "session", None)
+
+    @_reflection_session.setter
+    def _reflection_session(self, session: Optional[ReflectionSession]):
+        self._reflection_sessions.session = session
+
+    @contextmanager
+    def reflection_session(self):
+        """
+        Pipeline every reflection lookup made by this thread within the context over
+        one ServerReflectionInfo stream. Nested sessions reuse the outer stream, other
+        threads open their own.
+        """
+        if self._reflection_session is not None:
+            yield self._reflection_session
+            return
+        session = ReflectionSession(self.reflection_stub)
+        self._reflection_session = session
+        try:
+            yield session
+        finally:
+            self._reflection_session = None
+            session.close()
+
+    def _reflection_requests(self, requests):
+        with self._span("grpc_requests.reflection", REFLECTION_ATTRIBUTES):
+            if self._reflection_session is not None:
+                return self._reflection_session.request(*requests)
+            results = list(self._reflection_request(*requests))
+        if len(results) != len(requests):
+            raise ValueError(
+                f"expected {len(requests)} reflection responses, got {len(results)}"
+            )
+        return results
+
     def _reflection_single_request(self, request):
-        results = list(self._reflection_request(request))
+        with self._span("grpc_requests.reflection", REFLECTION_ATTRIBUTES):
+            if self._reflection_session is not None:
+                return self._reflection_session.request(request)[0]
+            results = list(self._reflection_request(request))
         if len(results) != 1:
             raise ValueError("response has more than one result")
         return results[0]
@@ -531,8 +1142,12 @@ class ReflectionClient(BaseGrpcClient):
         registration, this is not guaranteed in the reflection specification.
         :param file_descriptors: List of FileDescriptorProto to register
         """
-        for file_descriptor in file_descriptors:
-            self._register_file_descriptor(file_descriptor, file_descriptors)
+        with self._span(
+            "grpc_requests.register_file_descriptors",
+            {"grpc_requests.files": len(file_descriptors)},
+        ):
+            for file_descriptor in file_descriptors:
+                self._register_file_descriptor(file_descriptor, file_descriptors)
 
     def _register_file_descriptor(self, file_descriptor, file_descriptors):
         if not self._is_descriptor_registered(file_descriptor.name):
@@ -575,11 +1190,122 @@ class ReflectionClient(BaseGrpcClient):
         except KeyError:
             return False
 
+    def _register_cached_descriptors(self) -> bool:
+        """
+        Register the descriptors of the descriptor cache into the pool, once per client.
+        :return: True if a valid cache entry was registered.
+        """
+        if self._descriptor_cache is None:
+            return False
+        if self._descriptor_cache_loaded is None:
+            service_names = (
+                self.service_names if self._descriptor_cache.validate_services else None
+            )
+            entry = self._descriptor_cache.load(self.endpoint, service_names)
+            self._descriptor_cache_loaded = entry is not None
+            if entry is not None:
+                logger.debug(f"loading {self.endpoint} descriptors from cache")
+                if self._service_names is None:
+                    self._service_names = list(entry.service_names)
+                self.register_file_descriptors(entry.file_descriptors)
+        return self._descriptor_cache_loaded
+
+    def _save_cached_descriptors(self):
+        files = [
+            self.get_service_descriptor(service_name).file
+            for service_name in self.service_names
+            if self._is_service_registered(service_name)
+        ]
+        self._descriptor_cache.save(  # type: ignore[union-attr]
+            self.endpoint, self.service_names, collect_file_descriptors(files)
+        )
+
+    def _fetch_service_file_descriptors(
+        self, service_names
+    ) -> List[descriptor_pb2.FileDescriptorProto]:
+        """
+        Fetch the files defining the given services and every dependency missing from the pool.
+        Lookups are batched per level of the import graph, so each batch is a single pipelined
+        exchange when a reflection session is active.
+        """
+        fetched: Dict[str, descriptor_pb2.FileDescriptorProto] = {}
+
+        def collect(responses):
+            for response in responses:
+                for proto in response.file_descriptor_response.file_descriptor_proto:
+                    file_descriptor = descriptor_pb2.FileDescriptorProto.FromString(
+                        proto
+                    )
+                    fetched.setdefault(file_descriptor.name, file_descriptor)
+
+        collect(
+            self._reflection_requests(
+                [
+                    reflection_pb2.ServerReflectionRequest(
+                        file_containing_symbol=service_name
+                    )
+                    for service_name in service_names
+                ]
+            )
+        )
+        requested = set()
+        while True:
+            missing = {
+                dependency
+                for file_descriptor in fetched.values()
+                for dependency in file_descriptor.dependency
+                if dependency not in fetched
+                and dependency not in requested
+                and not self._is_descriptor_registered(dependency)
+            }
+            if not missing:
+                break
+            requested.update(missing)
+            collect(
+                self._reflection_requests(
+                    [
+                        reflection_pb2.ServerReflectionRequest(file_by_filename=name)
+                        for name in sorted(missing)
+                    ]
+                )
+            )
+        return list(fetched.values())
+
+    def _register_services_descriptors(self, service_names):
+        missing = [
+            service_name
+            for service_name in service_names
+            if not self._is_service_registered(service_name)
+        ]
+        if missing:
+            logger.debug(f"fetching descriptors of {len(missing)} services")
+            with self._span(
+                "grpc_requests.resolve_services", {"grpc_requests.services": missing}
+            ):
+                self.register_file_descriptors(
+                    self._fetch_service_file_descriptors(missing)
+                )
+
+    def register_all_service(self):
+        # a warm start from the cache opens no reflection stream at all
+        cached = self._register_cached_descriptors()
+        if not cached or not all(
+            self._is_service_registered(service_name)
+            for service_name in self.service_names
+        ):
+            with self.reflection_session():
+                self._register_services_descriptors(self.service_names)
+        super(ReflectionClient, self).register_all_service()
+        if self._descriptor_cache is not None and not cached:
+            self._save_cached_descriptors()
+
     def register_service(self, service_name):
+        if not self._is_service_registered(service_name):
+            self._register_cached_descriptors()
         if not self._is_service_registered(service_name):
             logger.debug(f"start {service_name} registration")
-            file_descriptors = self.get_file_descriptors_by_symbol(service_name)
-            self.register_file_descriptors(file_descriptors)
+            with self.reflection_session():
+                self._register_services_descriptors([service_name])
             logger.debug(f"{service_name} registration complete")
         super(ReflectionClient, self).register_service(service_name)
 
@@ -617,7 +1343,7 @@ class StubClient(BaseGrpcClient):
 
 class ServiceClient:
     _method_names: Tuple[str, ...]
-    _methods_meta: Dict[str, MethodMetaData]
+    _methods_meta: Mapping[str, MethodMetaData]
     client: BaseGrpcClient
     name: str
 
@@ -629,8 +1355,18 @@ class ServiceClient:
         self._register_methods()
 
     def _register_methods(self):
+        if isinstance(self._methods_meta, LazyMethodsMeta):
+            # methods are bound on first access by __getattr__
+            return
         for method in self._method_names:
-            setattr(self, method, partial(self.client.request, self.name, method))
+            setattr(self, method, self.client.bind_method(self.name, method))
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self._methods_meta:
+            raise AttributeError(name)
+        bound = self.client.bind_method(self.name, name)
+        setattr(self, name, bound)
+        return bound
 
     @property
     def method_names(self):
@@ -643,25 +1379,22 @@ class ServiceClient:
 
 Client = ReflectionClient
 
-_cached_clients: Dict[str, Union[StubClient, ReflectionClient]] = {}
+# Clients shared by get_by_endpoint, keyed by client class and connection settings
+client_cache = ClientCache()
 
 
 def get_by_endpoint(endpoint: str, service_descriptors=None, **kwargs) -> Client:
-    global _cached_clients
-    if endpoint not in _cached_clients:
-        if service_descriptors:
-            _cached_clients[endpoint] = StubClient(
-                endpoint, service_descriptors=service_descriptors, **kwargs
-            )
-        else:
-            _cached_clients[endpoint] = ReflectionClient(endpoint, **kwargs)
-    return _cached_clients[endpoint]  # type: ignore[return-value]
+    if service_descriptors:
+        return client_cache.get(  # type: ignore[return-value]
+            StubClient, endpoint, service_descriptors=service_descriptors, **kwargs
+        )
+    return client_cache.get(ReflectionClient, endpoint, **kwargs)
 
 
 def reset_cached_client(endpoint=None):
-    global _cached_clients
-    if endpoint:
-        if endpoint in _cached_clients:
-            del _cached_clients[endpoint]
-    else:
-        _cached_clients = {}
+    """
+    Drop cached clients without closing them.
+
+    :param endpoint: If given, only the clients of this endpoint are dropped.
+    """
+    client_cache.clear(endpoint)
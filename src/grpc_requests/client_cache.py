@@ -0,0 +1,218 @@
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+
+class _Entry(NamedTuple):
+    endpoint: str
+    client: Future
+    created_at: float
+
+
+@lru_cache(maxsize=None)
+def _signature(client_class) -> inspect.Signature:
+    return inspect.signature(client_class)
+
+
+def _freeze(value) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(
+            sorted(
+                ((key, _freeze(item)) for key, item in value.items()),
+                key=lambda pair: str(pair[0]),
+            )
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def make_cache_key(client_class, endpoint: str, kwargs: Dict[str, Any]) -> Hashable:
+    """
+    Key of a client in a ClientCache. Arguments are bound to the signature of the
+    client class with its defaults applied, so passing a default value explicitly
+    gives the same key as leaving it out.
+
+    :param client_class: The class the client is created with.
+    :param endpoint: The endpoint of the client.
+    :param kwargs: The keyword arguments the client is created with.
+    """
+    try:
+        bound = _signature(client_class).bind(endpoint, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+    except TypeError:
+        arguments = {"endpoint": endpoint, **kwargs}
+    return client_class, _freeze(arguments)
+
+
+def _close_client(client):
+    client.close()
+
+
+class ClientCache:
+    """
+    Thread safe cache of clients keyed by their class and connection settings.
+
+    Concurrent requests for a client that is not cached yet wait for a single
+    construction. Clients are evicted once the cache holds more than max_size of
+    them, least recently used first, or when they are older than ttl seconds. Every
+    get evicts and closes all the expired clients, not only the one it looks up.
+
+    :param max_size: Maximum number of cached clients. None means no limit.
+    :param ttl: Maximum age in seconds of a cached client. None means clients never expire.
+    :param close: Called with each evicted client. Defaults to calling its close method.
+        None leaves evicted clients open.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = 128,
+        ttl: Optional[float] = None,
+        close: Optional[Callable[[Any], Any]] = _close_client,
+    ):
+        if max_size is not None and max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._close = close
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        # keys in the order their entries were created, so the oldest come first
+        self._created: Dict[Hashable, None] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, client_class, endpoint: str, **kwargs):
+        """
+        Get the cached client for the given settings, creating it on a miss.
+
+        :param client_class: The class to create the client with.
+        :param endpoint: The endpoint of the client.
+        :param kwargs: Keyword arguments of the client class.
+        :return: The client.
+        """
+        key = make_cache_key(client_class, endpoint, kwargs)
+        with self._lock:
+            evicted = self._evict_expired()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                create = False
+            else:
+                self._misses += 1
+                entry = _Entry(endpoint, Future(), time.monotonic())
+                self._entries[key] = entry
+                self._created[key] = None
+                evicted += self._evict_over_size()
+                create = True
+        self._close_evicted(evicted)
+
+        if not create:
+            return entry.client.result()
+        try:
+            client = client_class(endpoint, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+            entry.client.set_exception(e)
+            raise
+        entry.client.set_result(client)
+        return client
+
+    def _remove(self, key) -> _Entry:
+        del self._created[key]
+        return self._entries.pop(key)
+
+    def _evict_expired(self) -> List[_Entry]:
+        if self.ttl is None:
+            return []
+        expired = []
+        now = time.monotonic()
+        for key in self._created:
+            entry = self._entries[key]
+            if now - entry.created_at <= self.ttl:
+                break
+            # clients still being created are never evicted
+            if entry.client.done():
+                expired.append(key)
+        for key in expired:
+            logger.debug(
+                f"client cache entry for {self._entries[key].endpoint} expired"
+            )
+        self._evictions += len(expired)
+        return [self._remove(key) for key in expired]
+
+    def _evict_over_size(self) -> List[_Entry]:
+        if self.max_size is None or len(self._entries) <= self.max_size:
+            return []
+        evicted = []
+        # clients still being created are never evicted
+        for key, entry in list(self._entries.items()):
+            if len(self._entries) <= self.max_size:
+                break
+            if entry.client.done():
+                evicted.append(self._remove(key))
+        self._evictions += len(evicted)
+        return evicted
+
+    def _close_evicted(self, evicted: List[_Entry]):
+        if self._close is None:
+            return
+        for entry in evicted:
+            if entry.client.exception() is not None:
+                continue
+            try:
+                self._close(entry.client.result())
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning(f"can not close client of {entry.endpoint}", exc_info=e)
+
+    def clear(self, endpoint: Optional[str] = None):
+        """
+        Remove clients from the cache without closing them.
+
+        :param endpoint: If given, only the clients of this endpoint are removed.
+        """
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+                self._created.clear()
+                return
+            for key, entry in list(self._entries.items()):
+                if entry.endpoint == endpoint:
+                    self._remove(key)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,675 @@
+import base64
+import math
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.internal.type_checkers import ToShortestFloat
+from google.protobuf.json_format import MessageToDict, ParseDict
+
+# ParseDict refuses to nest messages deeper than this
+MAX_RECURSION_DEPTH = 100
+
+_FLOAT_MAX = float.fromhex("0x1.fffffep+127")
+_FLOAT_MIN = -_FLOAT_MAX
+
+# Messages json_format converts from or to a non-object JSON representation
+_WELL_KNOWN_TYPES = {
+    "google.protobuf.Any",
+    "google.protobuf.Duration",
+    "google.protobuf.FieldMask",
+    "google.protobuf.ListValue",
+    "google.protobuf.Struct",
+    "google.protobuf.Timestamp",
+    "google.protobuf.Value",
+}
+_WRAPPERS_FILE = "google/protobuf/wrappers.proto"
+
+_INT_TYPES = {
+    FieldDescriptor.CPPTYPE_INT32,
+    FieldDescriptor.CPPTYPE_INT64,
+    FieldDescriptor.CPPTYPE_UINT32,
+    FieldDescriptor.CPPTYPE_UINT64,
+}
+_INT64_TYPES = {FieldDescriptor.CPPTYPE_INT64, FieldDescriptor.CPPTYPE_UINT64}
+_FLOAT_TYPES = {FieldDescriptor.CPPTYPE_FLOAT, FieldDescriptor.CPPTYPE_DOUBLE}
+# Scalar types MessageToDict returns unchanged
+_IDENTITY_TYPES = {
+    FieldDescriptor.TYPE_INT32,
+    FieldDescriptor.TYPE_SINT32,
+    FieldDescriptor.TYPE_SFIXED32,
+    FieldDescriptor.TYPE_UINT32,
+    FieldDescriptor.TYPE_FIXED32,
+    FieldDescriptor.TYPE_BOOL,
+    FieldDescriptor.TYPE_STRING,
+}
+
+
+class _Unsupported(Exception):
+    """
+    Raised by compiled codecs for input they cannot handle exactly like json_format.
+    The caller falls back to json_format, which either handles it or raises the usual error.
+    """
+
+
+def is_well_known_type(message_descriptor: Descriptor) -> bool:
+    return (
+        message_descriptor.full_name in _WELL_KNOWN_TYPES
+        or message_descriptor.file.name == _WRAPPERS_FILE
+    )
+
+
+def is_repeated(field) -> bool:
+    # FieldDescriptor.label was removed in recent protobuf releases
+    repeated = getattr(field, "is_repeated", None)
+    if repeated is None:
+        return field.label == FieldDescriptor.LABEL_REPEATED
+    return repeated
+
+
+def is_map_entry(field) -> bool:
+    return (
+        field.type == FieldDescriptor.TYPE_MESSAGE
+        and field.message_type.has_options
+        and field.message_type.GetOptions().map_entry
+    )
+
+
+def _convert_int(value):
+    if type(value) is not int:
+        raise _Unsupported()
+    return value
+
+
+def _convert_bool(value):
+    if type(value) is not bool:
+        raise _Unsupported()
+    return value
+
+
+def _convert_str(value):
+    if type(value) is not str:
+        raise _Unsupported()
+    return value
+
+
+def _convert_bytes(value):
+    if type(value) is str:
+        value = value.encode("utf-8")
+    elif type(value) is not bytes:
+        raise _Unsupported()
+    return base64.urlsafe_b64decode(value + b"=" * (4 - len(value) % 4))
+
+
+def _convert_double(value):
+    if type(value) is float:
+        if math.isnan(value) or math.isinf(value):
+            raise _Unsupported()
+        return value
+    if type(value) is int:
+        return float(value)
+    raise _Unsupported()
+
+
+def _convert_float(value):
+    if type(value) is float:
+        if not _FLOAT_MIN <= value <= _FLOAT_MAX:
+            raise _Unsupported()
+        return value
+    if type(value) is int:
+        return float(value)
+    raise _Unsupported()
+
+
+def _enum_converter(field) -> Callable[[Any], int]:
+    numbers_by_name = {value.name: value.number for value in field.enum_type.values}
+    numbers = set(numbers_by_name.values())
+
+    def convert(value):
+        if type(value) is str:
+            number = numbers_by_name.get(value)
+            if number is None:
+                raise _Unsupported()
+            return number
+        if type(value) is int and value in numbers:
+            return value
+        raise _Unsupported()
+
+    return convert
+
+
+def _map_key_converter(field) -> Callable[[Any], Any]:
+    if field.cpp_type in _INT_TYPES:
+
+        def convert(key):
+            if type(key) is int:
+                return key
+            if type(key) is not str or " " in key:
+                raise _Unsupported()
+            return int(key)
+
+        return convert
+    if field.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+
+        def convert(key):
+            if key == "true":
+                return True
+            if key == "false":
+                return False
+            raise _Unsupported()
+
+        return convert
+    return _convert_str
+
+
+def _special_float(value):
+    """JSON string of an infinite or NaN float, None for finite values."""
+    if value != value:
+        return "NaN"
+    if value == math.inf:
+        return "Infinity"
+    if value == -math.inf:
+        return "-Infinity"
+    return None
+
+
+def _output_double(value):
+    special = _special_float(value)
+    return value if special is None else special
+
+
+def _output_float(value):
+    special = _special_float(value)
+    return ToShortestFloat(value) if special is None else special
+
+
+def _identity(value):
+    return value
+
+
+def _output_bytes(value):
+    return base64.b64encode(value).decode("utf-8")
+
+
+def _output_map_key(key):
+    if type(key) is bool:
+        return "true" if key else "false"
+    return str(key)
+
+
+def _enum_name_getter(field) -> Callable[[int], Any]:
+    if field.enum_type.full_name == "google.protobuf.NullValue":
+        return lambda value: None
+    # Values with options may carry a custom JSON name, leave those to MessageToDict
+    names_by_number = {
+        value.number: value.name
+        for value in field.enum_type.values
+        if not value.has_options
+    }
+    is_closed = field.enum_type.is_closed
+
+    def get_name(value):
+        name = names_by_number.get(value)
+        if name is None:
+            if is_closed or value in field.enum_type.values_by_number:
+                raise _Unsupported()
+            return value
+        return name
+
+    return get_name
+
+
+class MessageEncoder:
+    """
+    Converts dictionaries to protobuf messages with the same result as
+    json_format.ParseDict.
+
+    The first time a message type is encoded, its descriptor is walked once to build
+    a dedicated encoder holding the per field setters and converters. Input the
+    compiled encoders do not handle exactly like ParseDict, such as lowerCamelCase
+    field names or numbers given as strings, is passed to ParseDict instead.
+    """
+
+    def __init__(self):
+        self._encoders: Dict[Descriptor, Callable[[dict, Any, int], None]] = {}
+
+    def encode(self, data: dict, message_class):
+        """
+        :param data: dict representation of the message
+        :param message_class: protobuf message class to create
+        :return: message_class instance
+        """
+        message = message_class()
+        try:
+            self._get_encoder(message.DESCRIPTOR)(data, message, 1)
+        except Exception:  # pylint: disable=broad-except
+            return ParseDict(data, message_class())
+        return message
+
+    def encode_chunk(self, chunk: Iterable, message_class) -> List:
+        """
+        Encode many requests of the same message type, as MessageParsers would one at
+        a time, looking the encoder of the type up once.
+
+        :param chunk: dict representations of messages, or messages left as they are
+        :param message_class: protobuf message class to create
+        :return: list of message_class instances
+        """
+        encoder = self._get_encoder(message_class.DESCRIPTOR)
+        messages = []
+        for data in chunk:
+            data = data or {}
+            if isinstance(data, dict):
+                message = message_class()
+                try:
+                    encoder(data, message, 1)
+                except Exception:  # pylint: disable=broad-except
+                    message = ParseDict(data, message_class())
+                data = message
+            messages.append(data)
+        return messages
+
+    def _get_encoder(self, message_descriptor: Descriptor):
+        encoder = self._encoders.get(message_descriptor)
+        if encoder is None:
+            encoder = self._compile(message_descriptor)
+        return encoder
+
+    def _compile(self, message_descriptor: Descriptor):
+        fields: Dict[str, Tuple[Callable, Any, bool]] = {}
+
+        def encode(data, message, depth):
+            if depth > MAX_RECURSION_DEPTH:
+                raise _Unsupported()
+            oneofs = None
+            for key, value in data.items():
+                setter, oneof, nullable = fields[key]
+                if value is None:
+                    if nullable:
+                        raise _Unsupported()
+                    continue
+                if oneof is not None:
+                    if oneofs is None:
+                        oneofs = set()
+                    elif oneof in oneofs:
+                        raise _Unsupported()
+                    oneofs.add(oneof)
+                setter(message, value, depth)
+
+        # Registered before the fields are compiled, so recursive types find it
+        self._encoders[message_descriptor] = encode
+        fields.update(self._compile_fields(message_descriptor))
+        return encode
+
+    def _compile_fields(self, message_descriptor):
+        fields = {}
+        json_names = {field.json_name for field in message_descriptor.fields}
+        for field in message_descriptor.fields:
+            if field.name != field.json_name and field.name in json_names:
+                # ParseDict would resolve this name to another field by its json_name
+                continue
+            oneof = field.containing_oneof
+            fields[field.name] = (
+                self._field_setter(field),
+                oneof.name if oneof is not None else None,
+                self._is_nullable(field),
+            )
+        return fields
+
+    @staticmethod
+    def _is_nullable(field) -> bool:
+        """Fields ParseDict sets to a null value instead of clearing on None."""
+        if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+            return field.message_type.full_name == "google.protobuf.Value"
+        if field.cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+            return field.enum_type.full_name == "google.protobuf.NullValue"
+        return False
+
+    def _scalar_converter(self, field) -> Callable[[Any], Any]:
+        cpp_type = field.cpp_type
+        if cpp_type in _INT_TYPES:
+            return _convert_int
+        if cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+            return _convert_double
+        if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+            return _convert_float
+        if cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+            return _convert_bool
+        if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+            return _enum_converter(field)
+        if field.type == FieldDescriptor.TYPE_BYTES:
+            return _convert_bytes
+        return _convert_str
+
+    def _message_value_encoder(self, message_descriptor):
+        """Encoder of a message value, whatever its JSON representation."""
+        if is_well_known_type(message_descriptor):
+
+            def encode_well_known(value, message, depth):
+                ParseDict(value, message)
+
+            return encode_well_known
+
+        def encode_message(value, message, depth):
+            if type(value) is not dict:
+                raise _Unsupported()
+            self._get_encoder(message_descriptor)(value, message, depth + 1)
+
+        return encode_message
+
+    def _field_setter(self, field):
+        if is_map_entry(field):
+            return self._map_setter(field)
+        if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+            return self._message_setter(field)
+        return self._scalar_setter(field)
+
+    def _map_setter(self, field):
+        name = field.name
+        convert_key = _map_key_converter(field.message_type.fields_by_name["key"])
+        value_field = field.message_type.fields_by_name["value"]
+        if value_field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+            encode_value = self._message_value_encoder(value_field.message_type)
+
+            def set_message_map(message, value, depth):
+                if type(value) is not dict:
+                    raise _Unsupported()
+                container = getattr(message, name)
+                for key, item in value.items():
+                    encode_value(item, container[convert_key(key)], depth)
+
+            return set_message_map
+
+        convert_value = self._scalar_converter(value_field)
+
+        def set_scalar_map(message, value, depth):
+            if type(value) is not dict:
+                raise _Unsupported()
+            container = getattr(message, name)
+            for key, item in value.items():
+                container[convert_key(key)] = convert_value(item)
+
+        return set_scalar_map
+
+    def _message_setter(self, field):
+        name = field.name
+        encode_value = self._message_value_encoder(field.message_type)
+        if is_repeated(field):
+
+            def set_repeated_message(message, value, depth):
+                if type(value) is not list and type(value) is not tuple:
+                    raise _Unsupported()
+                container = getattr(message, name)
+                for item in value:
+                    encode_value(item, container.add(), depth)
+
+            return set_repeated_message
+
+        def set_message(message, value, depth):
+            sub_message = getattr(message, name)
+            sub_message.SetInParent()
+            encode_value(value, sub_message, depth)
+
+        return set_message
+
+    def _scalar_setter(self, field):
+        name = field.name
+        convert = self._scalar_converter(field)
+        if is_repeated(field):
+
+            def set_repeated_scalar(message, value, depth):
+                if type(value) is not list and type(value) is not tuple:
+                    raise _Unsupported()
+                getattr(message, name).extend([convert(item) for item in value])
+
+            return set_repeated_scalar
+
+        def set_scalar(message, value, depth):
+            setattr(message, name, convert(value))
+
+        return set_scalar
+
+
+class MessageDecoder:
+    """
+    Converts protobuf messages to dictionaries with the same result as
+    json_format.MessageToDict with preserving_proto_field_name=True.
+
+    The first time a message type is decoded, its descriptor is walked once to build
+    a dedicated decoder mapping each field to its output name and converter. Messages
+    the compiled decoders cannot convert exactly like MessageToDict, such as ones with
+    extensions set, are passed to MessageToDict instead.
+    """
+
+    def __init__(self):
+        self._decoders: Dict[Descriptor, Callable[[Any], dict]] = {}
+        self._view_fields: Dict[Descriptor, Dict[Any, Tuple[str, Callable]]] = {}
+
+    def decode(self, message) -> dict:
+        """
+        :param message: protobuf message
+        :return: dict representation of the message
+        """
+        try:
+            return self._get_decoder(message.DESCRIPTOR)(message)
+        except Exception:  # pylint: disable=broad-except
+            return MessageToDict(message, preserving_proto_field_name=True)
+
+    def view(self, message):
+        """
+        :param message: protobuf message
+        :return: MessageView of the message. Well known types with a non-object JSON
+            representation are decoded right away.
+        """
+        if is_well_known_type(message.DESCRIPTOR):
+            return self.decode(message)
+        return MessageView(message, self)
+
+    def _get_view_fields(self, message_descriptor: Descriptor):
+        fields = self._view_fields.get(message_descriptor)
+        if fields is None:
+            fields = {
+                field: (field.name, self._view_converter(field))
+                for field in message_descriptor.fields
+            }
+            self._view_fields[message_descriptor] = fields
+        return fields
+
+    def _view_converter(self, field):
+        """Like _field_converter, but nested messages become views."""
+        if field.cpp_type != FieldDescriptor.CPPTYPE_MESSAGE:
+            return self._field_converter(field)
+        if is_map_entry(field):
+            value_field = field.message_type.fields_by_name["value"]
+            if value_field.cpp_type != FieldDescriptor.CPPTYPE_MESSAGE:
+                return self._map_converter(field)
+            view_value = self._message_viewer(value_field.message_type)
+
+            def view_map(value):
+                return {
+                    _output_map_key(key): view_value(item)
+                    for key, item in value.items()
+                }
+
+            return view_map
+
+        view = self._message_viewer(field.message_type)
+        if not is_repeated(field):
+            return view
+
+        def view_repeated(value):
+            return [view(item) for item in value]
+
+        return view_repeated
+
+    def _message_viewer(self, message_descriptor: Descriptor):
+        if is_well_known_type(message_descriptor):
+            return self._get_decoder(message_descriptor)
+
+        def view(message):
+            return MessageView(message, self)
+
+        return view
+
+    def _get_decoder(self, message_descriptor: Descriptor):
+        decoder = self._decoders.get(message_descriptor)
+        if decoder is None:
+            decoder = self._compile(message_descriptor)
+        return decoder
+
+    def _compile(self, message_descriptor: Descriptor):
+        if is_well_known_type(message_descriptor):
+
+            def decode_well_known(message):
+                return MessageToDict(message, preserving_proto_field_name=True)
+
+            self._decoders[message_descriptor] = decode_well_known
+            return decode_well_known
+
+        fields: Dict[Any, Tuple[str, Callable[[Any], Any]]] = {}
+
+        def decode(message):
+            result = {}
+            for field, value in message.ListFields():
+                name, convert = fields[field]
+                result[name] = convert(value)
+            return result
+
+        # Registered before the fields are compiled, so recursive types find it
+        self._decoders[message_descriptor] = decode
+        for field in message_descriptor.fields:
+            fields[field] = (field.name, self._field_converter(field))
+        return decode
+
+    def _field_converter(self, field):
+        if is_map_entry(field):
+            return self._map_converter(field)
+        convert = self._value_converter(field)
+        if not is_repeated(field):
+            return convert
+        if field.type in _IDENTITY_TYPES:
+            return list
+
+        def convert_repeated(value):
+            return [convert(item) for item in value]
+
+        return convert_repeated
+
+    def _map_converter(self, field):
+        value_field = field.message_type.fields_by_name["value"]
+        convert_value = self._value_converter(value_field)
+        if value_field.type in _IDENTITY_TYPES:
+
+            def convert_scalar_map(value):
+                return {_output_map_key(key): item for key, item in value.items()}
+
+            return convert_scalar_map
+
+        def convert_map(value):
+            return {
+                _output_map_key(key): convert_value(item) for key, item in value.items()
+            }
+
+        return convert_map
+
+    def _value_converter(self, field) -> Callable[[Any], Any]:
+        cpp_type = field.cpp_type
+        if cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+            message_descriptor = field.message_type
+
+            def convert_message(value):
+                return self._get_decoder(message_descriptor)(value)
+
+            return convert_message
+        if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+            return _enum_name_getter(field)
+        if cpp_type in _INT64_TYPES:
+            return str
+        if cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+            return _output_double
+        if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+            return _output_float
+        if field.type == FieldDescriptor.TYPE_BYTES:
+            return _output_bytes
+        return _identity
+
+
+class MessageView(Mapping[str, Any]):
+    """
+    Read-only mapping over a protobuf message, equal to the dictionary
+    MessageDecoder.decode returns for it. Fields are converted when first accessed
+    and then cached, nested messages are views themselves, so reading a few fields
+    of a large message does not convert the rest of it.
+
+    :param message: The message viewed. It must not be modified while viewed.
+    :param decoder: The decoder converting the fields.
+    """
+
+    __slots__ = ("_message", "_decoder", "_fields", "_values")
+
+    def __init__(self, message, decoder: MessageDecoder):
+        self._message = message
+        self._decoder = decoder
+        self._fields: Optional[Dict[str, Tuple[Callable, Any]]] = None
+        self._values: Dict[str, Any] = {}
+
+    @property
+    def message(self):
+        return self._message
+
+    def _listed_fields(self) -> Dict[str, Tuple[Callable, Any]]:
+        if self._fields is None:
+            view_fields = self._decoder._get_view_fields(self._message.DESCRIPTOR)
+            try:
+                self._fields = {
+                    view_fields[field][0]: (view_fields[field][1], value)
+                    for field, value in self._message.ListFields()
+                }
+            except KeyError:
+                # extensions are only named by MessageToDict
+                self._use_message_to_dict()
+        return self._fields  # type: ignore[return-value]
+
+    def _use_message_to_dict(self):
+        converted = MessageToDict(self._message, preserving_proto_field_name=True)
+        self._fields = {name: (_identity, value) for name, value in converted.items()}
+        self._values = converted
+
+    def __getitem__(self, name: str):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        convert, value = self._listed_fields()[name]
+        try:
+            converted = convert(value)
+        except Exception:  # pylint: disable=broad-except
+            self._use_message_to_dict()
+            return self._values[name]
+        self._values[name] = converted
+        return converted
+
+    def __contains__(self, name) -> bool:
+        return name in self._listed_fields()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._listed_fields())
+
+    def __len__(self) -> int:
+        return len(self._listed_fields())
+
+    def to_dict(self) -> dict:
+        """:return: The whole message converted to a dictionary."""
+        return self._decoder.decode(self._message)
+
+    def __repr__(self) -> str:
+        return f"MessageView({self.to_dict()!r})"
@@ -0,0 +1,202 @@
+import logging
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+
+from .codec import is_repeated
+
+try:
+    import numpy as np  # type: ignore[import-not-found]
+except ImportError as err:
+    raise ImportError(
+        "grpc_requests.columnar requires numpy, install it with grpc_requests[numpy]"
+    ) from err
+
+logger = logging.getLogger(__name__)
+
+_DTYPES = {
+    FieldDescriptor.CPPTYPE_INT32: np.int32,
+    FieldDescriptor.CPPTYPE_INT64: np.int64,
+    FieldDescriptor.CPPTYPE_UINT32: np.uint32,
+    FieldDescriptor.CPPTYPE_UINT64: np.uint64,
+    FieldDescriptor.CPPTYPE_FLOAT: np.float32,
+    FieldDescriptor.CPPTYPE_DOUBLE: np.float64,
+    FieldDescriptor.CPPTYPE_BOOL: np.bool_,
+    FieldDescriptor.CPPTYPE_ENUM: np.int32,
+}
+
+
+class RaggedColumn(NamedTuple):
+    """
+    Column of a repeated field. The values of message i are
+    values[offsets[i]:offsets[i + 1]].
+    """
+
+    values: Any
+    offsets: Any
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def row(self, index: int):
+        return self.values[self.offsets[index] : self.offsets[index + 1]]
+
+
+Column = Union[Any, RaggedColumn]
+
+
+class _ScalarBuffer:
+    def __init__(self, name: str, dtype, capacity: int):
+        self.name = name
+        self.data = np.empty(capacity, dtype=dtype)
+
+    def append(self, row: int, message):
+        self.data[row] = getattr(message, self.name)
+
+    def column(self, rows: int):
+        return self.data[:rows]
+
+
+class _RepeatedBuffer:
+    def __init__(self, name: str, dtype, capacity: int):
+        self.name = name
+        self.data = np.empty(capacity, dtype=dtype)
+        self.offsets = np.empty(capacity + 1, dtype=np.int64)
+        self.offsets[0] = 0
+        self.size = 0
+
+    def append(self, row: int, message):
+        values = getattr(message, self.name)
+        start = self.size
+        end = start + len(values)
+        if end > len(self.data):
+            self._grow(end)
+        self.data[start:end] = values
+        self.size = end
+        self.offsets[row + 1] = end
+
+    def _grow(self, needed: int):
+        capacity = max(needed, 2 * len(self.data))
+        data = np.empty(capacity, dtype=self.data.dtype)
+        data[: self.size] = self.data[: self.size]
+        self.data = data
+
+    def column(self, rows: int) -> RaggedColumn:
+        return RaggedColumn(self.data[: self.size], self.offsets[: rows + 1])
+
+
+class ColumnarDecoder:
+    """
+    Collects numeric fields of a stream of messages into NumPy arrays.
+
+    Messages are read in batches of batch_size, each batch being yielded as a dict
+    mapping field names to columns. Scalar fields become arrays with one value per
+    message, repeated fields become a RaggedColumn of all their values and the
+    offsets of each message. Arrays are preallocated for a batch, and the values of
+    repeated fields are grown as needed, so no per message objects are created.
+
+    Decode the responses of a client with raw_output=True:
+
+        decoder = ColumnarDecoder(["average"])
+        responses = client.request(service, method, request, raw_output=True)
+        for block in decoder.decode(responses):
+            print(block["average"].mean())
+
+    :param fields: Names of the numeric or bool fields to collect.
+    :param batch_size: Maximum number of messages per block.
+    """
+
+    def __init__(self, fields: Sequence[str], batch_size: int = 4096):
+        if not fields:
+            raise ValueError("at least one field must be collected")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.fields = list(fields)
+        self.batch_size = batch_size
+        self._message_descriptor: Optional[Descriptor] = None
+        self._field_kinds: List[tuple] = []
+
+    def _resolve(self, message_descriptor: Descriptor):
+        if self._message_descriptor is message_descriptor:
+            return
+        field_kinds = []
+        for name in self.fields:
+            field = message_descriptor.fields_by_name.get(name)
+            if field is None:
+                raise ValueError(f"{message_descriptor.full_name} has no field {name}")
+            dtype = _DTYPES.get(field.cpp_type)
+            if dtype is None:
+                raise ValueError(f"{name} is not a numeric field")
+            buffer_class = _RepeatedBuffer if is_repeated(field) else _ScalarBuffer
+            field_kinds.append((name, buffer_class, dtype))
+        logger.debug(f"columnar decoding of {message_descriptor.full_name}")
+        self._message_descriptor = message_descriptor
+        self._field_kinds = field_kinds
+
+    def _new_buffers(self):
+        return [
+            buffer_class(name, dtype, self.batch_size)
+            for name, buffer_class, dtype in self._field_kinds
+        ]
+
+    @staticmethod
+    def _block(buffers, rows: int) -> Dict[str, Column]:
+        return {buffer.name: buffer.column(rows) for buffer in buffers}
+
+    def _add(self, buffers, rows: int, message):
+        if buffers is None:
+            self._resolve(message.DESCRIPTOR)
+            buffers = self._new_buffers()
+        for buffer in buffers:
+            buffer.append(rows, message)
+        return buffers
+
+    def decode(self, messages: Iterable) -> Iterator[Dict[str, Column]]:
+        """
+        :param messages: Iterable of messages, e.g. the raw responses of a server
+            streaming method.
+        :return: Iterator of column blocks.
+        """
+        buffers = None
+        rows = 0
+        for message in messages:
+            buffers = self._add(buffers, rows, message)
+            rows += 1
+            if rows == self.batch_size:
+                yield self._block(buffers, rows)
+                buffers = None
+                rows = 0
+        if rows:
+            yield self._block(buffers, rows)
+
+    async def decode_async(
+        self, messages: AsyncIterable
+    ) -> AsyncIterator[Dict[str, Column]]:
+        """
+        :param messages: Async iterable of messages, e.g. the raw responses of a
+            server streaming method of an async client.
+        :return: Async iterator of column blocks.
+        """
+        buffers = None
+        rows = 0
+        async for message in messages:
+            buffers = self._add(buffers, rows, message)
+            rows += 1
+            if rows == self.batch_size:
+                yield self._block(buffers, rows)
+                buffers = None
+                rows = 0
+        if rows:
+            yield self._block(buffers, rows)
@@ -0,0 +1,160 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from google.protobuf import descriptor_pb2
+from google.protobuf.descriptor import FileDescriptor
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+
+
+class CachedDescriptors(NamedTuple):
+    endpoint: str
+    service_names: Tuple[str, ...]
+    file_descriptors: List[descriptor_pb2.FileDescriptorProto]
+    created_at: float
+
+
+class DescriptorCache:
+    """
+    Persists the FileDescriptorProtos a reflection client fetched for an endpoint,
+    so later clients can load them into their DescriptorPool without reflection.
+
+    :param directory: Directory the cache files are written to. Created if missing.
+    :param ttl: Maximum age in seconds of a cache entry. None means entries never expire.
+    :param validate_services: If True, a cache entry is only used when the service list
+        recorded with it matches the one returned by a list_services reflection call.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        ttl: Optional[float] = None,
+        validate_services: bool = True,
+    ):
+        self.directory = Path(directory).expanduser()
+        self.ttl = ttl
+        self.validate_services = validate_services
+
+    def _path(self, endpoint: str) -> Path:
+        digest = hashlib.sha256(endpoint.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def load(
+        self, endpoint: str, service_names: Optional[Sequence[str]] = None
+    ) -> Optional[CachedDescriptors]:
+        """
+        Load the cache entry of an endpoint.
+
+        :param endpoint: The endpoint the descriptors were fetched from.
+        :param service_names: The services currently listed by the server. When given,
+            an entry recorded with a different service list is treated as stale.
+        :return: The cached descriptors, or None if there is no valid entry.
+        """
+        path = self._path(endpoint)
+        try:
+            with open(path, "r", encoding="utf8") as f:
+                data = json.load(f)
+            if data["version"] != CACHE_FORMAT_VERSION or data["endpoint"] != endpoint:
+                return None
+            file_descriptor_set = descriptor_pb2.FileDescriptorSet.FromString(
+                base64.b64decode(data["file_descriptor_set"])
+            )
+            entry = CachedDescriptors(
+                endpoint=endpoint,
+                service_names=tuple(data["service_names"]),
+                file_descriptors=list(file_descriptor_set.file),
+                created_at=float(data["created_at"]),
+            )
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"ignoring unreadable descriptor cache {path}", exc_info=e)
+            return None
+
+        if self.ttl is not None and time.time() - entry.created_at > self.ttl:
+            logger.debug(f"descriptor cache for {endpoint} expired")
+            return None
+        if service_names is not None and sorted(service_names) != sorted(
+            entry.service_names
+        ):
+            logger.debug(f"descriptor cache for {endpoint} has a stale service list")
+            return None
+        return entry
+
+    def save(
+        self,
+        endpoint: str,
+        service_names: Sequence[str],
+        file_descriptors: Sequence[descriptor_pb2.FileDescriptorProto],
+    ):
+        """
+        Write the cache entry of an endpoint, replacing any previous one.
+
+        :param endpoint: The endpoint the descriptors were fetched from.
+        :param service_names: The services listed by the server.
+        :param file_descriptors: FileDescriptorProtos covering the services and all their dependencies.
+        """
+        file_descriptor_set = descriptor_pb2.FileDescriptorSet(file=file_descriptors)
+        data = {
+            "version": CACHE_FORMAT_VERSION,
+            "endpoint": endpoint,
+            "service_names": list(service_names),
+            "created_at": time.time(),
+            "file_descriptor_set": base64.b64encode(
+                file_descriptor_set.SerializeToString()
+            ).decode("ascii"),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(endpoint)
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def invalidate(self, endpoint: str):
+        with suppress(FileNotFoundError):
+            self._path(endpoint).unlink()
+
+
+def collect_file_descriptors(
+    file_descriptors: Sequence[FileDescriptor],
+) -> List[descriptor_pb2.FileDescriptorProto]:
+    """
+    Collect the given files and their transitive dependencies as FileDescriptorProtos,
+    ordered so every file comes after the files it depends on.
+
+    :param file_descriptors: FileDescriptors to collect, e.g. the files of registered services.
+    :return: List of FileDescriptorProto
+    """
+    collected: List[descriptor_pb2.FileDescriptorProto] = []
+    seen = set()
+
+    def visit(file_descriptor: FileDescriptor):
+        if file_descriptor.name in seen:
+            return
+        seen.add(file_descriptor.name)
+        for dependency in file_descriptor.dependencies:
+            visit(dependency)
+        proto = descriptor_pb2.FileDescriptorProto()
+        file_descriptor.CopyToProto(proto)
+        collected.append(proto)
+
+    for file_descriptor in file_descriptors:
+        visit(file_descriptor)
+    return collected
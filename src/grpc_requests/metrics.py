@@ -0,0 +1,543 @@
+import copy
+import inspect
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, AsyncIterable, Dict, List, Optional, Sequence, Tuple
+
+import grpc
+
+# Upper bounds of the latency histograms, in seconds
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Upper bounds of the payload size histograms, in bytes
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_PHASES = ("encode_seconds", "transport_seconds", "decode_seconds")
+_SIZES = ("request_bytes", "response_bytes")
+_OK = grpc.StatusCode.OK
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def merged(self, other: "_Histogram") -> "_Histogram":
+        merged = _Histogram(self.bounds)
+        merged.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        merged.sum = self.sum + other.sum
+        return merged
+
+
+class _MethodShard:
+    """Measurements of one method made by one thread."""
+
+    __slots__ = (
+        "encode_seconds",
+        "transport_seconds",
+        "decode_seconds",
+        "request_bytes",
+        "response_bytes",
+        "request_messages",
+        "response_messages",
+        "status",
+    )
+
+    def __init__(self, latency_buckets: Sequence[float], size_buckets: Sequence[int]):
+        self.encode_seconds = _Histogram(latency_buckets)
+        self.transport_seconds = _Histogram(latency_buckets)
+        self.decode_seconds = _Histogram(latency_buckets)
+        self.request_bytes = _Histogram(size_buckets)
+        self.response_bytes = _Histogram(size_buckets)
+        self.request_messages = 0
+        self.response_messages = 0
+        self.status: Dict[str, int] = {}
+
+    def merged(self, other: "_MethodShard") -> "_MethodShard":
+        """:return: A new shard holding the measurements of both shards."""
+        merged = copy.copy(self)
+        for name in _PHASES + _SIZES:
+            setattr(merged, name, getattr(self, name).merged(getattr(other, name)))
+        merged.request_messages = self.request_messages + other.request_messages
+        merged.response_messages = self.response_messages + other.response_messages
+        merged.status = dict(self.status)
+        for code, count in other.status.items():
+            merged.status[code] = merged.status.get(code, 0) + count
+        return merged
+
+
+class _ThreadToken:
+    """Only referenced by a thread-local, so it is freed when its thread ends."""
+
+    __slots__ = ("__weakref__",)
+
+
+def _retire(metrics_ref: "weakref.ref[Metrics]", shard_id: int):
+    metrics = metrics_ref()
+    if metrics is not None:
+        metrics._retire(shard_id)
+
+
+def _merge_histograms(histograms: List[_Histogram]) -> Dict[str, Any]:
+    bounds = histograms[0].bounds
+    counts = [sum(column) for column in zip(*(h.counts for h in histograms))]
+    cumulative = 0
+    buckets = []
+    for bound, count in zip((*bounds, float("inf")), counts):
+        cumulative += count
+        buckets.append((bound, cumulative))
+    return {
+        "count": cumulative,
+        "sum": sum(h.sum for h in histograms),
+        "buckets": buckets,
+    }
+
+
+class Metrics:
+    """
+    Per method latency, payload size, message and status code metrics of the calls
+    made by the clients it is given to with their metrics argument.
+
+    Every thread records into its own shard, so recording takes no lock. Shards are
+    merged when a snapshot is taken, and the shard of a thread that ended is folded
+    into retired totals, so short-lived threads do not accumulate shards.
+
+    :param latency_buckets: Upper bounds in seconds of the encode, transport and
+        decode histograms.
+    :param size_buckets: Upper bounds in bytes of the payload size histograms.
+    """
+
+    def __init__(
+        self,
+        latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+        size_buckets: Sequence[int] = SIZE_BUCKETS,
+    ):
+        self.latency_buckets = tuple(latency_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self._local = threading.local()
+        # shards of live threads by id, and the merged shards of ended threads
+        self._shards: Dict[int, Dict[Tuple[str, str], _MethodShard]] = {}
+        self._retired: Dict[Tuple[str, str], _MethodShard] = {}
+        self._lock = threading.Lock()
+
+    def _shard(self, key: Tuple[str, str]) -> _MethodShard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            token = self._local.token = _ThreadToken()
+            with self._lock:
+                self._shards[id(shard)] = shard
+            weakref.finalize(token, _retire, weakref.ref(self), id(shard))
+        method_shard = shard.get(key)
+        if method_shard is None:
+            method_shard = shard[key] = _MethodShard(
+                self.latency_buckets, self.size_buckets
+            )
+        return method_shard
+
+    def _retire(self, shard_id: int):
+        with self._lock:
+            shard = self._shards.pop(shard_id)
+            # replaced rather than updated, as snapshots read it without the lock
+            retired = dict(self._retired)
+            for key, method_shard in shard.items():
+                current = retired.get(key)
+                retired[key] = (
+                    method_shard if current is None else current.merged(method_shard)
+                )
+            self._retired = retired
+
+    def recorder(self, service: str, method: str) -> "MethodRecorder":
+        return MethodRecorder(self, (service, method))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: Metrics of each method called so far, keyed by service/method.
+            Histograms are dicts of count, sum and cumulative (upper bound, count)
+            buckets, the last bound being infinity.
+        """
+        with self._lock:
+            shards = [*self._shards.values(), self._retired]
+        by_method: Dict[Tuple[str, str], List[_MethodShard]] = {}
+        for shard in shards:
+            for key, method_shard in list(shard.items()):
+                by_method.setdefault(key, []).append(method_shard)
+
+        snapshot = {}
+        for (service, method), method_shards in sorted(by_method.items()):
+            status: Dict[str, int] = {}
+            for method_shard in method_shards:
+                for code, count in list(method_shard.status.items()):
+                    status[code] = status.get(code, 0) + count
+            metrics: Dict[str, Any] = {
+                name: _merge_histograms([getattr(s, name) for s in method_shards])
+                for name in _PHASES + _SIZES
+            }
+            metrics["request_messages"] = sum(s.request_messages for s in method_shards)
+            metrics["response_messages"] = sum(
+                s.response_messages for s in method_shards
+            )
+            metrics["status"] = status
+            snapshot[f"{service}/{method}"] = metrics
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards.values():
+                shard.clear()
+            self._retired = {}
+
+
+class MethodRecorder:
+    """Records the measurements of one method into the shard of the calling thread."""
+
+    __slots__ = ("_metrics", "_key")
+
+    def __init__(self, metrics: Metrics, key: Tuple[str, str]):
+        self._metrics = metrics
+        self._key = key
+
+    def encoded(self, seconds: float, message):
+        shard = self._metrics._shard(self._key)
+        shard.encode_seconds.observe(seconds)
+        shard.request_messages += 1
+        byte_size = getattr(message, "ByteSize", None)
+        if byte_size is not None:
+            shard.request_bytes.observe(byte_size())
+
+    def decoded(self, seconds: float):
+        self._metrics._shard(self._key).decode_seconds.observe(seconds)
+
+    def received(self, message):
+        shard = self._metrics._shard(self._key)
+        shard.response_messages += 1
+        byte_size = getattr(message, "ByteSize", None)
+        if byte_size is not None:
+            shard.response_bytes.observe(byte_size())
+
+    def finished(self, seconds: float, code: Optional[grpc.StatusCode]):
+        shard = self._metrics._shard(self._key)
+        shard.transport_seconds.observe(seconds)
+        name = code.name if code is not None else "UNKNOWN"
+        shard.status[name] = shard.status.get(name, 0) + 1
+
+
+async def _iterate(requests):
+    if isinstance(requests, AsyncIterable):
+        async for request in requests:
+            yield request
+    else:
+        for request in requests:
+            yield request
+
+
+class InstrumentedParsers:
+    """Sync message parsers recording the encode and decode time of each message."""
+
+    def __init__(self, parsers, recorder: MethodRecorder):
+        self._parsers = parsers
+        self._recorder = recorder
+
+    def parse_request_data(self, request_data, input_type):
+        start = time.perf_counter()
+        request = self._parsers.parse_request_data(request_data, input_type)
+        self._recorder.encoded(time.perf_counter() - start, request)
+        return request
+
+    def parse_stream_requests(self, stream_requests_data, input_type):
+        return (
+            self.parse_request_data(request_data, input_type)
+            for request_data in stream_requests_data
+        )
+
+    def parse_response(self, response):
+        start = time.perf_counter()
+        result = self._parsers.parse_response(response)
+        self._recorder.decoded(time.perf_counter() - start)
+        return result
+
+    def parse_stream_responses(self, responses):
+        for response in responses:
+            yield self.parse_response(response)
+
+
+class AsyncInstrumentedParsers:
+    """Async message parsers recording the encode and decode time of each message."""
+
+    def __init__(self, parsers, recorder: MethodRecorder):
+        self._parsers = parsers
+        self._recorder = recorder
+        # keeps the parse_request_data of the wrapped parsers sync or async
+        self._await_request = inspect.iscoroutinefunction(parsers.parse_request_data)
+        if self._await_request:
+            self.parse_request_data = self._parse_request_data_async
+        else:
+            self.parse_request_data = self._parse_request_data
+
+    def _parse_request_data(self, request_data, input_type):
+        start = time.perf_counter()
+        request = self._parsers.parse_request_data(request_data, input_type)
+        self._recorder.encoded(time.perf_counter() - start, request)
+        return request
+
+    async def _parse_request_data_async(self, request_data, input_type):
+        start = time.perf_counter()
+        request = await self._parsers.parse_request_data(request_data, input_type)
+        self._recorder.encoded(time.perf_counter() - start, request)
+        return request
+
+    def parse_stream_requests(self, stream_requests_data, input_type):
+        if not self._await_request and not isinstance(
+            stream_requests_data, AsyncIterable
+        ):
+            return (
+                self._parse_request_data(request_data, input_type)
+                for request_data in stream_requests_data
+            )
+        return self._parse_async_stream_requests(stream_requests_data, input_type)
+
+    async def _parse_async_stream_requests(self, stream_requests_data, input_type):
+        async for request_data in _iterate(stream_requests_data):
+            request = self.parse_request_data(request_data, input_type)
+            if inspect.isawaitable(request):
+                request = await request
+            yield request
+
+    async def parse_response(self, response):
+        start = time.perf_counter()
+        result = await self._parsers.parse_response(response)
+        self._recorder.decoded(time.perf_counter() - start)
+        return result
+
+    async def parse_stream_responses(self, responses):
+        async for response in responses:
+            yield await self.parse_response(response)
+
+
+class _TimedResponses:
+    """
+    Response stream of a sync call, recording the time spent waiting for messages as
+    transport time once the stream ends.
+    """
+
+    def __init__(self, call, recorder: MethodRecorder, waited: float):
+        self._call = call
+        self._recorder = recorder
+        self._waited = waited
+        self._finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            response = next(self._call)
+        except StopIteration:
+            self._finish(start, _OK)
+            raise
+        except grpc.RpcError as err:
+            self._finish(start, err.code())
+            raise
+        self._waited += time.perf_counter() - start
+        self._recorder.received(response)
+        return response
+
+    def _finish(self, start: float, code):
+        if not self._finished:
+            self._finished = True
+            self._recorder.finished(self._waited + time.perf_counter() - start, code)
+
+    def __getattr__(self, name):
+        return getattr(self._call, name)
+
+
+class InstrumentedMultiCallable:
+    """
+    Multicallable of a sync client recording the transport time, the responses and
+    the status code of its calls.
+    """
+
+    def __init__(self, multicallable, recorder: MethodRecorder, stream_response: bool):
+        self._multicallable = multicallable
+        self._recorder = recorder
+        self._stream_response = stream_response
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = self._multicallable(*args, **kwargs)
+        except grpc.RpcError as err:
+            self._recorder.finished(time.perf_counter() - start, err.code())
+            raise
+        if self._stream_response:
+            return _TimedResponses(result, self._recorder, time.perf_counter() - start)
+        self._recorder.received(result)
+        self._recorder.finished(time.perf_counter() - start, _OK)
+        return result
+
+    def with_call(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result, call = self._multicallable.with_call(*args, **kwargs)
+        except grpc.RpcError as err:
+            self._recorder.finished(time.perf_counter() - start, err.code())
+            raise
+        self._recorder.received(result)
+        self._recorder.finished(time.perf_counter() - start, _OK)
+        return result, call
+
+    def future(self, *args, **kwargs):
+        start = time.perf_counter()
+        future = self._multicallable.future(*args, **kwargs)
+
+        def done(call):
+            code = call.code()
+            if code == _OK:
+                self._recorder.received(call.result())
+            self._recorder.finished(time.perf_counter() - start, code)
+
+        future.add_done_callback(done)
+        return future
+
+
+class _TimedAsyncCall:
+    """
+    Call of an async client recording its transport time, responses and status code
+    once awaited or iterated to the end. Other attributes are those of the call.
+    """
+
+    def __init__(self, call, recorder: MethodRecorder):
+        self._call = call
+        self._recorder = recorder
+        self._started = time.perf_counter()
+
+    def __await__(self):
+        return self._result().__await__()
+
+    async def _result(self):
+        try:
+            response = await self._call
+        except grpc.RpcError as err:
+            self._recorder.finished(time.perf_counter() - self._started, err.code())
+            raise
+        self._recorder.received(response)
+        self._recorder.finished(time.perf_counter() - self._started, _OK)
+        return response
+
+    async def __aiter__(self):
+        waited = 0.0
+        start = time.perf_counter()
+        iterator = self._call.__aiter__()
+        code = _OK
+        try:
+            while True:
+                try:
+                    response = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                waited += time.perf_counter() - start
+                self._recorder.received(response)
+                yield response
+                start = time.perf_counter()
+        except grpc.RpcError as err:
+            code = err.code()
+            raise
+        finally:
+            self._recorder.finished(waited + time.perf_counter() - start, code)
+
+    def __getattr__(self, name):
+        return getattr(self._call, name)
+
+
+class AsyncInstrumentedMultiCallable:
+    """
+    Multicallable of an async client recording the transport time, the responses and
+    the status code of its calls.
+    """
+
+    def __init__(self, multicallable, recorder: MethodRecorder):
+        self._multicallable = multicallable
+        self._recorder = recorder
+
+    def __call__(self, *args, **kwargs):
+        return _TimedAsyncCall(self._multicallable(*args, **kwargs), self._recorder)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: str, **extra) -> str:
+    service, _, method = key.rpartition("/")
+    labels = {"service": service, "method": method, **extra}
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+        + "}"
+    )
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def to_prometheus_text(
+    snapshot: Dict[str, Dict[str, Any]], prefix: str = "grpc_requests"
+) -> str:
+    """
+    :param snapshot: A snapshot of Metrics.
+    :param prefix: Prefix of the metric names.
+    :return: The snapshot in the Prometheus text exposition format.
+    """
+    lines = []
+    for name in _PHASES + _SIZES:
+        metric = f"{prefix}_{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for key, metrics in snapshot.items():
+            histogram = metrics[name]
+            for bound, count in histogram["buckets"]:
+                labels = _labels(key, le=_format_bound(bound))
+                lines.append(f"{metric}_bucket{labels} {count}")
+            lines.append(f"{metric}_sum{_labels(key)} {histogram['sum']!r}")
+            lines.append(f"{metric}_count{_labels(key)} {histogram['count']}")
+    for name in ("request_messages", "response_messages"):
+        metric = f"{prefix}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(
+            f"{metric}{_labels(key)} {metrics[name]}"
+            for key, metrics in snapshot.items()
+        )
+    metric = f"{prefix}_calls_total"
+    lines.append(f"# TYPE {metric} counter")
+    for key, metrics in snapshot.items():
+        lines.extend(
+            f"{metric}{_labels(key, code=code)} {count}"
+            for code, count in sorted(metrics["status"].items())
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import time
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import grpc
+from google.protobuf.json_format import ParseError
+
+from .aio import _completed_results, _ordered_results
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayStats(NamedTuple):
+    """
+    :param records: Number of records replayed by this run.
+    :param errors: Number of them written as errors.
+    :param skipped: Number of records skipped because a previous run replayed them.
+    :param elapsed: Seconds the run took.
+    """
+
+    records: int
+    errors: int
+    skipped: int
+    elapsed: float
+
+
+class Checkpoint(NamedTuple):
+    """
+    Progress of a replay, from which an interrupted replay resumes.
+
+    :param next_line: Every record before this line was replayed.
+    :param done: Lines after next_line already replayed, when results are written
+        as they complete.
+    :param output_offset: Size of the output holding the results of these lines.
+    """
+
+    next_line: int
+    done: Tuple[int, ...]
+    output_offset: int
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls(data["next_line"], tuple(data["done"]), data["output_offset"])
+
+    def save(self, path: str):
+        # written aside then renamed, so a crash never leaves a partial checkpoint
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._asdict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+class _Progress:
+    """Lines replayed so far, folded into a watermark as gaps close."""
+
+    def __init__(self, checkpoint: Optional[Checkpoint]):
+        self.next_line = checkpoint.next_line if checkpoint else 0
+        self.done: Set[int] = set(checkpoint.done) if checkpoint else set()
+
+    def is_done(self, line: int) -> bool:
+        return line < self.next_line or line in self.done
+
+    def add(self, line: int):
+        self.done.add(line)
+
+    def checkpoint(self, output_offset: int, lines: Iterator[int]) -> Checkpoint:
+        """
+        :param lines: Lines still waiting for their results, in increasing order.
+        """
+        pending = next(lines, None)
+        if pending is None:
+            self.next_line = max(self.done, default=self.next_line - 1) + 1
+        else:
+            self.next_line = pending
+        self.done = {line for line in self.done if line > self.next_line}
+        return Checkpoint(self.next_line, tuple(sorted(self.done)), output_offset)
+
+
+def _records(
+    path: str, progress: _Progress, pending: Dict[int, None], skipped: List[int]
+) -> Iterator[Tuple[int, str]]:
+    with open(path) as f:
+        for line, text in enumerate(f):
+            if not text.strip():
+                continue
+            if progress.is_done(line):
+                skipped[0] += 1
+                continue
+            pending[line] = None
+            yield line, text
+
+
+class _Output:
+    """Output of a replay, saved along with the progress of the replay."""
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        checkpoint: Optional[Checkpoint],
+        checkpoint_path: Optional[str],
+        pending: Dict[int, None],
+    ):
+        self._file = file
+        self._checkpoint_path = checkpoint_path
+        self._pending = pending
+        self.progress = _Progress(checkpoint)
+        if checkpoint is not None:
+            # drops the results written after the checkpoint, they are replayed again
+            file.truncate(checkpoint.output_offset)
+            file.seek(checkpoint.output_offset)
+
+    def write(self, line: int, outcome: Dict[str, Any]):
+        del self._pending[line]
+        self._file.write(json.dumps({"line": line, **outcome}).encode() + b"\n")
+        if self._checkpoint_path:
+            self.progress.add(line)
+
+    def save(self):
+        if not self._checkpoint_path:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        checkpoint = self.progress.checkpoint(self._file.tell(), iter(self._pending))
+        checkpoint.save(self._checkpoint_path)
+
+
+def _check_output(
+    output_path: str, checkpoint: Checkpoint, checkpoint_path: Optional[str]
+):
+    try:
+        size = os.path.getsize(output_path)
+    except FileNotFoundError:
+        size = None
+    if size is None or size < checkpoint.output_offset:
+        raise ValueError(
+            f"{output_path} does not hold the results saved by checkpoint "
+            f"{checkpoint_path}, remove the checkpoint to replay from the start"
+        )
+
+
+def _error(err: BaseException) -> Dict[str, Any]:
+    if isinstance(err, grpc.RpcError):
+        return {"code": err.code().name, "details": err.details()}
+    return {"code": type(err).__name__, "details": str(err)}
+
+
+async def replay(
+    client,
+    service: str,
+    method: str,
+    input_path: str,
+    output_path: str,
+    max_in_flight: int = 64,
+    ordered: bool = True,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_every: int = 1000,
+    **kwargs,
+) -> ReplayStats:
+    """
+    Replay a JSONL file of requests to a method with a unary response, with up to
+    max_in_flight calls in flight. Requests are read and results written one line at
+    a time, so memory does not grow with the size of the file. Each output line is
+    {"line": n, "response": ...} or {"line": n, "error": {"code": ..., "details": ...}},
+    n being the line of the request in the input, counted from 0.
+
+    With a checkpoint_path, progress is saved every checkpoint_every results and at
+    the end. A replay started with an existing checkpoint skips the records it covers
+    and appends to the output it left behind, which must still hold the results the
+    checkpoint covers.
+
+    :param client: The async client making the calls.
+    :param service: The full name of the service.
+    :param method: The name of the method.
+    :param input_path: JSONL file with one request per line.
+    :param output_path: JSONL file the results are written to.
+    :param max_in_flight: Maximum number of calls awaiting a response.
+    :param ordered: If True, results are written in the order of requests, otherwise
+        as calls complete.
+    :param checkpoint_path: File the progress is saved to.
+    :param checkpoint_every: Number of results between checkpoints.
+    :param kwargs: Keyword arguments passed to every call, e.g. timeout or metadata.
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+    if checkpoint_every < 1:
+        raise ValueError("checkpoint_every must be at least 1")
+    await client.check_method_available(service, method)
+    method_meta = await client.get_method_meta(service, method)
+    if not method_meta.method_type.is_unary_response:
+        raise ValueError(
+            f"{method} is {method_meta.method_type.value}, replay needs a unary response"
+        )
+    bound = await client.bind_method(service, method)
+
+    checkpoint = Checkpoint.load(checkpoint_path) if checkpoint_path else None
+    if checkpoint is not None:
+        _check_output(output_path, checkpoint, checkpoint_path)
+        logger.debug(f"resuming {input_path} from line {checkpoint.next_line}")
+    # lines read and not written yet, in increasing order as dicts keep insertion order
+    pending: Dict[int, None] = {}
+    skipped = [0]
+
+    async def call(record: Tuple[int, str]):
+        line, text = record
+        try:
+            return line, {"response": await bound(json.loads(text), **kwargs)}
+        except (grpc.RpcError, ParseError, ValueError, TypeError) as err:
+            # invalid JSON or requests not matching the message are written as errors
+            return line, {"error": _error(err)}
+
+    started = time.perf_counter()
+    replayed = errors = 0
+    with open(output_path, "wb" if checkpoint is None else "r+b") as file:
+        output = _Output(file, checkpoint, checkpoint_path, pending)
+        records = _records(input_path, output.progress, pending, skipped)
+        if ordered:
+            results = _ordered_results(call, records, max_in_flight, False)
+        else:
+            results = _completed_results(call, records, max_in_flight, False)
+        async for result in results:
+            line, outcome = result if ordered else result[1]
+            output.write(line, outcome)
+            errors += "error" in outcome
+            replayed += 1
+            if replayed % checkpoint_every == 0:
+                output.save()
+        output.save()
+
+    return ReplayStats(
+        records=replayed,
+        errors=errors,
+        skipped=skipped[0],
+        elapsed=time.perf_counter() - started,
+    )
@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf.descriptor import (
+    FileDescriptor,
+    MethodDescriptor,
+    ServiceDescriptor,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MethodSchema(NamedTuple):
+    name: str
+    input_type: Any
+    output_type: Any
+    client_streaming: bool
+    server_streaming: bool
+    descriptor: MethodDescriptor
+
+
+class ServiceSchema(NamedTuple):
+    full_name: str
+    fingerprint: str
+    methods: Tuple[MethodSchema, ...]
+
+
+def file_fingerprint(file_descriptor: FileDescriptor) -> str:
+    """
+    Digest of a file and all the files it transitively imports. Files defined
+    identically in different descriptor pools have the same fingerprint.
+    """
+    # nothing is kept across calls, so descriptors and their pools are never held on to
+    return _file_fingerprint(file_descriptor, {})
+
+
+def _file_fingerprint(
+    file_descriptor: FileDescriptor, fingerprints: Dict[str, str]
+) -> str:
+    # files imported along several paths are digested once
+    fingerprint = fingerprints.get(file_descriptor.name)
+    if fingerprint is not None:
+        return fingerprint
+    digest = hashlib.sha256(file_descriptor.serialized_pb)
+    for dependency in file_descriptor.dependencies:
+        digest.update(_file_fingerprint(dependency, fingerprints).encode("ascii"))
+    fingerprint = fingerprints[file_descriptor.name] = digest.hexdigest()
+    return fingerprint
+
+
+class SchemaRegistry:
+    """
+    Process wide registry of resolved service schemas, keyed by service full name and
+    the fingerprint of the files defining the service.
+
+    Clients of services with a known schema reuse its message classes instead of
+    materializing them again, and only create their own channel bound handlers.
+    Schemas resolved in the default descriptor pool are only shared with clients using
+    the default pool, so those always get the generated message classes.
+
+    :param maxsize: Number of schemas kept, the least recently used are dropped
+        along with the descriptor pools they hold on to.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self._maxsize = maxsize
+        self._schemas: "OrderedDict[Tuple[str, str, bool], ServiceSchema]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get_or_create(
+        self,
+        service_descriptor: ServiceDescriptor,
+        build: Callable[[ServiceDescriptor, str], ServiceSchema],
+    ) -> ServiceSchema:
+        """
+        :param service_descriptor: Descriptor of the service.
+        :param build: Called with the service descriptor and its fingerprint to create
+            the schema of an unknown service.
+        :return: The schema of the service.
+        """
+        fingerprint = file_fingerprint(service_descriptor.file)
+        in_default_pool = service_descriptor.file.pool is _descriptor_pool.Default()
+        key = (service_descriptor.full_name, fingerprint, in_default_pool)
+        with self._lock:
+            schema = self._schemas.get(key)
+            if schema is not None:
+                self._schemas.move_to_end(key)
+                return schema
+        logger.debug(f"resolving schema of {service_descriptor.full_name}")
+        schema = build(service_descriptor, fingerprint)
+        with self._lock:
+            # keep the first schema if another thread resolved the same one meanwhile
+            schema = self._schemas.setdefault(key, schema)
+            while len(self._schemas) > self._maxsize:
+                self._schemas.popitem(last=False)
+            return schema
+
+    def clear(self):
+        with self._lock:
+            self._schemas.clear()
+
+    def __len__(self) -> int:
+        return len(self._schemas)
+
+
+schema_registry = SchemaRegistry()
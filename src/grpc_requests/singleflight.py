@@ -0,0 +1,180 @@
+import asyncio
+import concurrent.futures
+import math
+import threading
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Hashable,
+    NamedTuple,
+    Optional,
+)
+
+import grpc
+
+# keyword arguments of a call that may differ between the calls sharing it
+_SHARED_KWARGS = frozenset(("metadata", "timeout"))
+
+
+def call_key(
+    method: str,
+    request,
+    raw_output: bool,
+    kwargs: Dict[str, Any],
+    metadata_keys: Optional[FrozenSet[str]] = None,
+) -> Optional[Hashable]:
+    """
+    Key of a unary call, equal for calls that may share one response: same method,
+    same deterministically serialized request and same metadata.
+
+    :param method: The full name of the method.
+    :param request: The request message.
+    :param raw_output: Whether the response is returned unparsed.
+    :param kwargs: Keyword arguments of the call. Calls with arguments other than
+        metadata and timeout are never shared, and have no key.
+    :param metadata_keys: Metadata keys the key is made of, e.g. authorization.
+        None means all of them.
+    :return: The key, or None if the call must not be shared.
+    """
+    if not _SHARED_KWARGS.issuperset(kwargs):
+        return None
+    metadata = tuple(
+        sorted(
+            (key, value)
+            for key, value in kwargs.get("metadata") or ()
+            if metadata_keys is None or key in metadata_keys
+        )
+    )
+    return method, request.SerializeToString(deterministic=True), metadata, raw_output
+
+
+class DeadlineExceeded(grpc.RpcError):
+    """
+    Raised to a call whose timeout expired while it waited for the identical call it
+    shares, like the error of a call reaching its own deadline.
+    """
+
+    def code(self) -> grpc.StatusCode:
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+
+    def details(self) -> str:
+        return "Deadline Exceeded"
+
+    def __str__(self) -> str:
+        return self.details()
+
+
+def _deadline(timeout: Optional[float]) -> float:
+    return math.inf if timeout is None else time.monotonic() + timeout
+
+
+def _remaining(deadline: float) -> Optional[float]:
+    return None if deadline == math.inf else max(0.0, deadline - time.monotonic())
+
+
+class _Flight(NamedTuple):
+    """
+    :param future: Result of the call, a concurrent.futures.Future of a sync call or
+        the asyncio task of an async call.
+    :param deadline: Monotonic time the call times out at, inf without timeout.
+    """
+
+    future: Any
+    deadline: float
+
+
+class SingleFlight:
+    """
+    Calls of a sync client in flight by key. A call made while another one with the
+    same key is in flight waits for it and shares its result or error instead.
+
+    A call only waits for a call with a deadline no earlier than its own, and stops
+    waiting at its own deadline, so sharing never changes when a call times out.
+    A call with a later deadline makes its own request, which later calls then share.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Flight] = {}
+        self.coalesced = 0
+
+    def do(
+        self, key: Hashable, call: Callable[[], Any], timeout: Optional[float] = None
+    ):
+        """
+        :param key: Key of the call, see call_key.
+        :param call: Makes the call, with the given timeout.
+        :param timeout: Timeout of the call in seconds, None for no deadline.
+        """
+        deadline = _deadline(timeout)
+        with self._lock:
+            waiting = self._calls.get(key)
+            if waiting is None or waiting.deadline < deadline:
+                waiting = None
+                flight = _Flight(concurrent.futures.Future(), deadline)
+                self._calls[key] = flight
+            else:
+                self.coalesced += 1
+        if waiting is not None:
+            try:
+                return waiting.future.result(_remaining(deadline))
+            except concurrent.futures.TimeoutError:
+                raise DeadlineExceeded() from None
+        try:
+            result = call()
+        except BaseException as err:
+            self._finish(key, flight)
+            flight.future.set_exception(err)
+            raise
+        self._finish(key, flight)
+        flight.future.set_result(result)
+        return result
+
+    def _finish(self, key: Hashable, flight: _Flight):
+        # later calls start a new flight, the waiting ones get this result
+        with self._lock:
+            if self._calls.get(key) is flight:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    Calls of an async client in flight by key. A call made while another one with
+    the same key is in flight awaits it and shares its result or error instead. The
+    shared call is shielded so a cancelled caller does not cancel it for the others.
+    Deadlines are handled as by SingleFlight.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Flight] = {}
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable],
+        timeout: Optional[float] = None,
+    ):
+        deadline = _deadline(timeout)
+        flight = self._calls.get(key)
+        if flight is None or flight.deadline < deadline:
+            flight = _Flight(asyncio.ensure_future(call()), deadline)
+            self._calls[key] = flight
+            flight.future.add_done_callback(lambda _: self._finish(key, flight))
+            # the call times out on its own deadline
+            return await asyncio.shield(flight.future)
+        self.coalesced += 1
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(flight.future), _remaining(deadline)
+            )
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded() from None
+
+    def _finish(self, key: Hashable, flight: _Flight):
+        if self._calls.get(key) is flight:
+            del self._calls[key]
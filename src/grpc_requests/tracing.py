@@ -0,0 +1,343 @@
+import inspect
+from contextlib import contextmanager
+from typing import Any, AsyncIterable, Dict, Optional, Sequence, Tuple
+
+import grpc
+
+Metadata = Sequence[Tuple[str, Any]]
+
+
+class Tracer:
+    """
+    Tracing hooks of a client, given to it with its tracer argument. This base class
+    traces nothing; subclasses forward the spans to a tracing library, like
+    OpenTelemetryTracer does.
+    """
+
+    def start_rpc(self, name: str, attributes: Dict[str, Any]):
+        """
+        Start the span of a call, ended with end_rpc once the call completes.
+
+        :return: The span, passed back to inject and end_rpc.
+        """
+        return None
+
+    def end_rpc(self, span, error: Optional[BaseException] = None):
+        """
+        :param span: The span returned by start_rpc.
+        :param error: The error the call failed with, if it failed.
+        """
+
+    def inject(self, span, metadata: Optional[Metadata]) -> Optional[Metadata]:
+        """
+        :param span: The span of the call.
+        :param metadata: The metadata of the call.
+        :return: The metadata of the call carrying the trace context of the span.
+        """
+        return metadata
+
+    @contextmanager
+    def span(self, name: str, attributes: Dict[str, Any]):
+        """Span of work done by the client, current for the work nested in it."""
+        yield
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Tracer recording spans with the OpenTelemetry API, and injecting the trace
+    context of calls into their metadata with the globally configured propagator.
+
+    :param tracer_provider: Provider of the tracer. Defaults to the global one.
+    """
+
+    def __init__(self, tracer_provider=None):
+        try:
+            from opentelemetry import propagate, trace
+        except ImportError as err:
+            raise ImportError(
+                "OpenTelemetryTracer requires opentelemetry-api, "
+                "install it with grpc_requests[opentelemetry]"
+            ) from err
+        self._propagate = propagate
+        self._trace = trace
+        self._tracer = trace.get_tracer(
+            "grpc_requests", tracer_provider=tracer_provider
+        )
+
+    def start_rpc(self, name: str, attributes: Dict[str, Any]):
+        return self._tracer.start_span(
+            name, kind=self._trace.SpanKind.CLIENT, attributes=attributes
+        )
+
+    def end_rpc(self, span, error: Optional[BaseException] = None):
+        if error is not None:
+            if isinstance(error, grpc.RpcError) and hasattr(error, "code"):
+                span.set_attribute("rpc.grpc.status_code", error.code().value[0])
+            span.record_exception(error)
+            span.set_status(
+                self._trace.Status(self._trace.StatusCode.ERROR, str(error))
+            )
+        else:
+            span.set_attribute("rpc.grpc.status_code", grpc.StatusCode.OK.value[0])
+        span.end()
+
+    def inject(self, span, metadata: Optional[Metadata]) -> Optional[Metadata]:
+        carrier: Dict[str, str] = {}
+        self._propagate.inject(carrier, context=self._trace.set_span_in_context(span))
+        if not carrier:
+            return metadata
+        return [*(metadata or ()), *carrier.items()]
+
+    @contextmanager
+    def span(self, name: str, attributes: Dict[str, Any]):
+        with self._tracer.start_as_current_span(name, attributes=attributes) as span:
+            yield span
+
+
+def rpc_attributes(service: str, method: str) -> Dict[str, Any]:
+    return {"rpc.system": "grpc", "rpc.service": service, "rpc.method": method}
+
+
+REFLECTION_ATTRIBUTES = rpc_attributes(
+    "grpc.reflection.v1alpha.ServerReflection", "ServerReflectionInfo"
+)
+
+
+class TracedParsers:
+    """Sync message parsers tracing the encoding and decoding of each message."""
+
+    def __init__(self, parsers, tracer: Tracer, attributes: Dict[str, Any]):
+        self._parsers = parsers
+        self._tracer = tracer
+        self._attributes = attributes
+
+    def parse_request_data(self, request_data, input_type):
+        with self._tracer.span("grpc_requests.encode", self._attributes):
+            return self._parsers.parse_request_data(request_data, input_type)
+
+    def parse_stream_requests(self, stream_requests_data, input_type):
+        return (
+            self.parse_request_data(request_data, input_type)
+            for request_data in stream_requests_data
+        )
+
+    def parse_response(self, response):
+        with self._tracer.span("grpc_requests.decode", self._attributes):
+            return self._parsers.parse_response(response)
+
+    def parse_stream_responses(self, responses):
+        for response in responses:
+            yield self.parse_response(response)
+
+
+async def _iterate(requests):
+    if isinstance(requests, AsyncIterable):
+        async for request in requests:
+            yield request
+    else:
+        for request in requests:
+            yield request
+
+
+class AsyncTracedParsers:
+    """Async message parsers tracing the encoding and decoding of each message."""
+
+    def __init__(self, parsers, tracer: Tracer, attributes: Dict[str, Any]):
+        self._parsers = parsers
+        self._tracer = tracer
+        self._attributes = attributes
+        # keeps the parse_request_data of the wrapped parsers sync or async
+        self._await_request = inspect.iscoroutinefunction(parsers.parse_request_data)
+        if self._await_request:
+            self.parse_request_data = self._parse_request_data_async
+        else:
+            self.parse_request_data = self._parse_request_data
+
+    def _parse_request_data(self, request_data, input_type):
+        with self._tracer.span("grpc_requests.encode", self._attributes):
+            return self._parsers.parse_request_data(request_data, input_type)
+
+    async def _parse_request_data_async(self, request_data, input_type):
+        with self._tracer.span("grpc_requests.encode", self._attributes):
+            return await self._parsers.parse_request_data(request_data, input_type)
+
+    def parse_stream_requests(self, stream_requests_data, input_type):
+        if not self._await_request and not isinstance(
+            stream_requests_data, AsyncIterable
+        ):
+            return (
+                self._parse_request_data(request_data, input_type)
+                for request_data in stream_requests_data
+            )
+        return self._parse_async_stream_requests(stream_requests_data, input_type)
+
+    async def _parse_async_stream_requests(self, stream_requests_data, input_type):
+        async for request_data in _iterate(stream_requests_data):
+            request = self.parse_request_data(request_data, input_type)
+            if inspect.isawaitable(request):
+                request = await request
+            yield request
+
+    async def parse_response(self, response):
+        with self._tracer.span("grpc_requests.decode", self._attributes):
+            return await self._parsers.parse_response(response)
+
+    async def parse_stream_responses(self, responses):
+        async for response in responses:
+            yield await self.parse_response(response)
+
+
+class _TracedResponses:
+    """Response stream of a sync call, ending the span of the call with the stream."""
+
+    def __init__(self, call, tracer: Tracer, span):
+        self._call = call
+        self._tracer = tracer
+        self._span = span
+        self._ended = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._call)
+        except StopIteration:
+            self._end(None)
+            raise
+        except grpc.RpcError as err:
+            self._end(err)
+            raise
+
+    def _end(self, error: Optional[BaseException]):
+        if not self._ended:
+            self._ended = True
+            self._tracer.end_rpc(self._span, error)
+
+    def __getattr__(self, name):
+        return getattr(self._call, name)
+
+
+class TracedMultiCallable:
+    """
+    Multicallable of a sync client tracing its calls, and injecting their trace
+    context into their metadata.
+    """
+
+    def __init__(
+        self,
+        multicallable,
+        tracer: Tracer,
+        name: str,
+        attributes: Dict[str, Any],
+        stream_response: bool,
+    ):
+        self._multicallable = multicallable
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._stream_response = stream_response
+
+    def _start(self, kwargs):
+        span = self._tracer.start_rpc(self._name, self._attributes)
+        kwargs["metadata"] = self._tracer.inject(span, kwargs.get("metadata"))
+        return span
+
+    def _call(self, target, args, kwargs):
+        span = self._start(kwargs)
+        try:
+            result = target(*args, **kwargs)
+        except BaseException as err:
+            self._tracer.end_rpc(span, err)
+            raise
+        if self._stream_response and target is self._multicallable:
+            return _TracedResponses(result, self._tracer, span)
+        self._tracer.end_rpc(span)
+        return result
+
+    def __call__(self, *args, **kwargs):
+        return self._call(self._multicallable, args, kwargs)
+
+    def with_call(self, *args, **kwargs):
+        return self._call(self._multicallable.with_call, args, kwargs)
+
+    def future(self, *args, **kwargs):
+        span = self._start(kwargs)
+        try:
+            future = self._multicallable.future(*args, **kwargs)
+        except BaseException as err:
+            self._tracer.end_rpc(span, err)
+            raise
+
+        def done(call):
+            # exception() raises on cancelled calls, e.g. those request_many cancels
+            if call.cancelled():
+                self._tracer.end_rpc(span, grpc.FutureCancelledError())
+            else:
+                self._tracer.end_rpc(span, call.exception())
+
+        future.add_done_callback(done)
+        return future
+
+
+class _TracedAsyncCall:
+    """
+    Call of an async client ending the span of the call once it is awaited or
+    iterated to the end. Other attributes are those of the call.
+    """
+
+    def __init__(self, call, tracer: Tracer, span):
+        self._call = call
+        self._tracer = tracer
+        self._span = span
+
+    def __await__(self):
+        return self._result().__await__()
+
+    async def _result(self):
+        try:
+            response = await self._call
+        except BaseException as err:
+            self._tracer.end_rpc(self._span, err)
+            raise
+        self._tracer.end_rpc(self._span)
+        return response
+
+    async def __aiter__(self):
+        error: Optional[BaseException] = None
+        try:
+            async for response in self._call:
+                yield response
+        except Exception as err:
+            error = err
+            raise
+        finally:
+            self._tracer.end_rpc(self._span, error)
+
+    def __getattr__(self, name):
+        return getattr(self._call, name)
+
+
+class AsyncTracedMultiCallable:
+    """
+    Multicallable of an async client tracing its calls, and injecting their trace
+    context into their metadata.
+    """
+
+    def __init__(
+        self, multicallable, tracer: Tracer, name: str, attributes: Dict[str, Any]
+    ):
+        self._multicallable = multicallable
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+
+    def __call__(self, *args, **kwargs):
+        span = self._tracer.start_rpc(self._name, self._attributes)
+        kwargs["metadata"] = self._tracer.inject(span, kwargs.get("metadata"))
+        try:
+            call = self._multicallable(*args, **kwargs)
+        except BaseException as err:
+            self._tracer.end_rpc(span, err)
+            raise
+        return _TracedAsyncCall(call, self._tracer, span)
@@ -0,0 +1,273 @@
+import asyncio
+import inspect
+import logging
+import queue
+import threading
+import time
+from itertools import islice
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+logger = logging.getLogger(__name__)
+
+# signals the writer that all chunks were produced
+_END = object()
+
+
+class UploadStats(NamedTuple):
+    """
+    :param messages: Number of messages written.
+    :param chunks: Number of chunks the messages were encoded in.
+    :param elapsed: Seconds from the start of the upload to the response.
+    :param encode_seconds: Seconds spent encoding records into messages.
+    :param producer_blocked_seconds: Seconds the encoder waited for room in a full
+        write buffer, because the transport could not keep up.
+    :param writer_starved_seconds: Seconds the writer waited on an empty write buffer,
+        because encoding could not keep up.
+    """
+
+    messages: int
+    chunks: int
+    elapsed: float
+    encode_seconds: float
+    producer_blocked_seconds: float
+    writer_starved_seconds: float
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+
+class UploadResult(NamedTuple):
+    response: Any
+    stats: UploadStats
+
+
+class _Counters:
+    def __init__(self):
+        self.messages = 0
+        self.chunks = 0
+        self.encode_seconds = 0.0
+        self.producer_blocked_seconds = 0.0
+        self.writer_starved_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def stats(self) -> UploadStats:
+        return UploadStats(
+            messages=self.messages,
+            chunks=self.chunks,
+            elapsed=time.perf_counter() - self.started,
+            encode_seconds=self.encode_seconds,
+            producer_blocked_seconds=self.producer_blocked_seconds,
+            writer_starved_seconds=self.writer_starved_seconds,
+        )
+
+
+class _Failed(NamedTuple):
+    error: BaseException
+
+
+def _check_sizes(chunk_size: int, buffer_chunks: int):
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if buffer_chunks < 1:
+        raise ValueError("buffer_chunks must be at least 1")
+
+
+def _chunks(records: Iterable, chunk_size: int) -> Iterator[List]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _async_chunks(
+    records: Union[Iterable, AsyncIterable], chunk_size: int
+) -> AsyncIterator[List]:
+    if not isinstance(records, AsyncIterable):
+        for chunk in _chunks(records, chunk_size):
+            yield chunk
+        return
+    chunk = []
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BufferedUpload:
+    """
+    Request iterator of a sync client stream. A background thread encodes the records
+    a chunk at a time into a write buffer of at most buffer_chunks chunks, which grpc
+    consumes while the next chunks are being encoded. The thread stops once the
+    iterator is closed or exhausted, or once close is called, e.g. when the call
+    terminates without consuming all requests.
+
+    :param encode_chunk: Converts a list of records into a list of request messages.
+    :param chunk_size: Number of records encoded at once.
+    :param buffer_chunks: Maximum number of encoded chunks waiting to be written.
+    """
+
+    def __init__(
+        self,
+        encode_chunk: Callable[[List], List],
+        chunk_size: int = 256,
+        buffer_chunks: int = 4,
+    ):
+        _check_sizes(chunk_size, buffer_chunks)
+        self._encode_chunk = encode_chunk
+        self.chunk_size = chunk_size
+        self.buffer_chunks = buffer_chunks
+        self.error: Optional[BaseException] = None
+        self._counters = _Counters()
+        self._closed = threading.Event()
+
+    def stats(self) -> UploadStats:
+        return self._counters.stats()
+
+    def close(self):
+        """Stop encoding and end the request iterator."""
+        self._closed.set()
+
+    def _put(self, buffer: queue.Queue, item) -> bool:
+        start = time.perf_counter()
+        while not self._closed.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            self._counters.producer_blocked_seconds += time.perf_counter() - start
+            return True
+        return False
+
+    def _produce(self, records: Iterable, buffer: queue.Queue):
+        counters = self._counters
+        try:
+            for chunk in _chunks(records, self.chunk_size):
+                start = time.perf_counter()
+                encoded = self._encode_chunk(chunk)
+                counters.encode_seconds += time.perf_counter() - start
+                if not self._put(buffer, encoded):
+                    return
+        except Exception as e:  # pylint: disable=broad-except
+            self._put(buffer, _Failed(e))
+            return
+        self._put(buffer, _END)
+
+    def requests(self, records: Iterable) -> Iterator:
+        """
+        :param records: Iterable of records, consumed by the encoding thread.
+        :return: Iterator of request messages.
+        """
+        buffer: queue.Queue = queue.Queue(self.buffer_chunks)
+        counters = self._counters
+        counters.started = time.perf_counter()
+        producer = threading.Thread(
+            target=self._produce,
+            args=(records, buffer),
+            name="grpc_requests-upload",
+            daemon=True,
+        )
+        producer.start()
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = buffer.get(timeout=0.1)
+                except queue.Empty:
+                    if self._closed.is_set():
+                        return
+                    continue
+                finally:
+                    counters.writer_starved_seconds += time.perf_counter() - start
+                if chunk is _END:
+                    return
+                if isinstance(chunk, _Failed):
+                    # raising makes grpc cancel the call instead of completing it
+                    self.error = chunk.error
+                    raise chunk.error
+                counters.chunks += 1
+                counters.messages += len(chunk)
+                yield from chunk
+        finally:
+            self._closed.set()
+
+
+async def write_upload(
+    call,
+    encode_chunk: Callable[[List], Any],
+    records: Union[Iterable, AsyncIterable],
+    chunk_size: int = 256,
+    buffer_chunks: int = 4,
+) -> UploadStats:
+    """
+    Write the records to an aio client streaming call. An encoding task converts them
+    a chunk at a time into a write buffer of at most buffer_chunks chunks, while the
+    messages of the previous chunks are written with call.write.
+
+    :param call: The call, created without a request iterator.
+    :param encode_chunk: Converts a list of records into a list of request messages,
+        or an awaitable of it.
+    :param records: Iterable or async iterable of records.
+    :param chunk_size: Number of records encoded at once.
+    :param buffer_chunks: Maximum number of encoded chunks waiting to be written.
+    :return: Stats of the upload. Writing is done once it returns, the response is
+        still to be awaited from the call.
+    """
+    _check_sizes(chunk_size, buffer_chunks)
+    counters = _Counters()
+    buffer: asyncio.Queue = asyncio.Queue(buffer_chunks)
+
+    async def put(item):
+        start = time.perf_counter()
+        await buffer.put(item)
+        counters.producer_blocked_seconds += time.perf_counter() - start
+
+    async def produce():
+        try:
+            async for chunk in _async_chunks(records, chunk_size):
+                start = time.perf_counter()
+                encoded = encode_chunk(chunk)
+                if inspect.isawaitable(encoded):
+                    encoded = await encoded
+                counters.encode_seconds += time.perf_counter() - start
+                await put(encoded)
+        except Exception as e:  # pylint: disable=broad-except
+            await put(_Failed(e))
+            return
+        await put(_END)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            start = time.perf_counter()
+            chunk = await buffer.get()
+            counters.writer_starved_seconds += time.perf_counter() - start
+            if chunk is _END:
+                break
+            if isinstance(chunk, _Failed):
+                call.cancel()
+                raise chunk.error
+            counters.chunks += 1
+            counters.messages += len(chunk)
+            for message in chunk:
+                await call.write(message)
+        await call.done_writing()
+    finally:
+        producer.cancel()
+    return counters.stats()
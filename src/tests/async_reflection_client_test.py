@@ -1,19 +1,32 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import importlib.metadata
 
+import grpc
 import grpc.aio
 import pytest
 from grpc_reflection.v1alpha import reflection_pb2
 
 from google.protobuf import descriptor_pb2, descriptor_pool
 from google.protobuf.json_format import ParseError
-from grpc_requests.aio import AsyncClient, CustomArgumentParsers, MethodType
+from grpc_requests.aio import (
+    AsyncClient,
+    CustomArgumentParsers,
+    CompiledMessageParsers as AsyncCompiledMessageParsers,
+    ExecutorMessageParsers,
+    MethodType,
+    StubAsyncClient,
+)
+from grpc_requests.client import CompiledMessageParsers, LazyMethodsMeta
 from tests.common import AsyncMetadataClientInterceptor
+from tests.test_servers.client_tester import client_tester_pb2
 from tests.test_servers.dependencies import (
     dependencies_pb2,
     dependency1_pb2,
     dependency2_pb2,
 )
+from tests.test_servers.helloworld.helloworld_pb2 import HelloReply, HelloRequest
 
 from grpc_requests.aio import MethodMetaData
 
@@ -114,6 +127,26 @@ async def test_unary_stream():
         assert response == {"message": f"Hello, {name}!"}
 
 
+@pytest.mark.asyncio
+async def test_unary_stream_raw_output():
+    client = AsyncClient(
+        "localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    responses = await client.unary_stream(
+        "helloworld.Greeter", "SayHelloGroup", {"name": "a b"}, raw_output=True
+    )
+    assert [response.message async for response in responses] == [
+        "Hello, a!",
+        "Hello, b!",
+    ]
+    say_hello_group = await client.bind_method("helloworld.Greeter", "SayHelloGroup")
+    responses = await say_hello_group({"name": "a b"}, raw_output=True)
+    assert [response.message async for response in responses] == [
+        "Hello, a!",
+        "Hello, b!",
+    ]
+
+
 @pytest.mark.asyncio
 async def test_stream_unary():
     client = AsyncClient(
@@ -148,6 +181,59 @@ async def test_stream_stream():
         assert response == {"message": f"Hello {name}"}
 
 
+async def _names(name_list):
+    for name in name_list:
+        await asyncio.sleep(0)
+        yield {"name": name}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "message_parsers",
+    [None, AsyncCompiledMessageParsers(), ExecutorMessageParsers()],
+)
+async def test_stream_unary_async_iterable(message_parsers):
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        message_parsers=message_parsers,
+    )
+    greeter_service = await client.service("helloworld.Greeter")
+    name_list = ["sinsky", "viridianforge", "jack", "harry"]
+    response = await greeter_service.HelloEveryone(_names(name_list))
+    assert response == {"message": "Hello, sinsky viridianforge jack harry!"}
+
+
+@pytest.mark.asyncio
+async def test_stream_stream_async_iterable_is_consumed_lazily():
+    client = AsyncClient(
+        "localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def requests():
+        while True:
+            request = await queue.get()
+            if request is None:
+                return
+            yield request
+
+    # each request is only produced once the response to the previous one arrived
+    await queue.put({"name": "a"})
+    responses = await client.stream_stream(
+        "helloworld.Greeter", "SayHelloOneByOne", requests()
+    )
+    received = []
+
+    async def receive():
+        async for response in responses:
+            received.append(response)
+            await queue.put({"name": "b"} if len(received) == 1 else None)
+
+    await asyncio.wait_for(receive(), timeout=10)
+    assert received == [{"message": "Hello a"}, {"message": "Hello b"}]
+
+
 @pytest.mark.asyncio
 async def test_reflection_service_client():
     client = AsyncClient(
@@ -429,3 +515,270 @@ async def test_can_get_methods_meta_when_using_non_lazy_client():
     assert server_reflection_info.input_type == reflection_pb2.ServerReflectionRequest
     assert server_reflection_info.output_type == reflection_pb2.ServerReflectionResponse
     assert server_reflection_info.method_type == MethodType.STREAM_STREAM
+
+
+def test_registration_concurrency_must_be_positive():
+    with pytest.raises(ValueError):
+        AsyncClient("localhost:50051", registration_concurrency=0)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_registration_deduplicates_lookups():
+    client = AsyncClient(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        registration_concurrency=2,
+    )
+    lookups = []
+    reflection_single_request = client._reflection_single_request
+
+    async def counting_single_request(request):
+        lookups.append(request.WhichOneof("message_request"))
+        return await reflection_single_request(request)
+
+    client._reflection_single_request = counting_single_request
+
+    proto = descriptor_pb2.FileDescriptorProto()
+    dependencies_pb2.DESCRIPTOR.CopyToProto(proto)
+    # Both registrations need dependency1.proto, which must only be fetched once
+    await asyncio.gather(
+        client.register_file_descriptors([proto]),
+        client.register_file_descriptors([proto]),
+    )
+    assert lookups == ["file_by_filename"]
+
+    await client.register_all_service()
+    assert client.has_server_registered
+    response = await client.request(
+        "dependencies.Greeter", "SayHello", {"name": "sinsky"}
+    )
+    assert response == {"message": "Hello, sinsky!"}
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_executor_parsers_offload_large_messages():
+    executor = _CountingExecutor()
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        message_parsers=ExecutorMessageParsers(executor=executor, threshold=0),
+    )
+    greeter_service = await client.service("helloworld.Greeter")
+    response = await greeter_service.SayHello({"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    # one request and one response
+    assert executor.submitted == 2
+
+    name_list = ["sinsky", "viridianforge"]
+    responses = [
+        x
+        async for x in await greeter_service.SayHelloOneByOne(
+            [{"name": name} for name in name_list]
+        )
+    ]
+    assert responses == [{"message": f"Hello {name}"} for name in name_list]
+    assert executor.submitted == 6
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_executor_parsers_keep_small_messages_inline():
+    executor = _CountingExecutor()
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        message_parsers=ExecutorMessageParsers(
+            parsers=CompiledMessageParsers(), executor=executor
+        ),
+    )
+    greeter_service = await client.service("helloworld.Greeter")
+    response = await greeter_service.SayHello({"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    assert executor.submitted == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_bind_method():
+    client = AsyncClient(
+        "localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    say_hello = await client.bind_method(
+        "helloworld.Greeter", "SayHello", MethodType.UNARY_UNARY
+    )
+    assert await say_hello({"name": "sinsky"}) == {"message": "Hello, sinsky!"}
+
+    say_hello_group = await client.bind_method("helloworld.Greeter", "SayHelloGroup")
+    responses = [x async for x in await say_hello_group({"name": "a b"})]
+    assert responses == [{"message": "Hello, a!"}, {"message": "Hello, b!"}]
+
+    with pytest.raises(ValueError):
+        await client.bind_method("helloworld.Greeter", "SayGoodbye")
+
+
+@pytest.mark.asyncio
+async def test_request_bytes():
+    client = AsyncClient(
+        "localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    request = HelloRequest(name="sinsky").SerializeToString()
+    response = await client.request_bytes("helloworld.Greeter", "SayHello", request)
+    assert isinstance(response, bytes)
+    assert HelloReply.FromString(response).message == "Hello, sinsky!"
+
+    responses = await client.request_bytes(
+        "helloworld.Greeter",
+        "SayHelloGroup",
+        HelloRequest(name="a b").SerializeToString(),
+    )
+    assert [HelloReply.FromString(r).message async for r in responses] == [
+        "Hello, a!",
+        "Hello, b!",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_lazy_method_registration():
+    client = AsyncClient(
+        "localhost:50051",
+        lazy="method",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+    )
+    greeter_service = await client.service("helloworld.Greeter")
+    methods_meta = await client.get_methods_meta("helloworld.Greeter")
+    assert isinstance(methods_meta, LazyMethodsMeta)
+    assert methods_meta.built_method_names == ()
+
+    assert await greeter_service.SayHello({"name": "sinsky"}) == {
+        "message": "Hello, sinsky!"
+    }
+    assert await greeter_service.SayHello({"name": "sinsky"}) == {
+        "message": "Hello, sinsky!"
+    }
+    assert methods_meta.built_method_names == ("SayHello",)
+
+    assert not hasattr(greeter_service, "SayGoodbye")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lazy", [True, "method"])
+async def test_lazy_request_resolves_requested_service_only(lazy):
+    pool = descriptor_pool.DescriptorPool()
+    client = AsyncClient("localhost:50051", lazy=lazy, descriptor_pool=pool)
+    response = await client.request(
+        "helloworld.Greeter", "SayHello", {"name": "sinsky"}
+    )
+    assert response == {"message": "Hello, sinsky!"}
+    assert "grpc.reflection.v1alpha.ServerReflection" in await client.service_names()
+    assert list(client._service_methods_meta) == ["helloworld.Greeter"]
+    with pytest.raises(KeyError):
+        pool.FindFileByName("grpc_reflection/v1alpha/reflection.proto")
+
+
+@pytest.mark.asyncio
+async def test_request_many_ordered():
+    client = AsyncClient(
+        "localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    names = [f"name{i}" for i in range(50)]
+    responses = await client.request_many(
+        "helloworld.Greeter",
+        "SayHello",
+        ({"name": name} for name in names),
+        max_in_flight=8,
+    )
+    assert [x async for x in responses] == [
+        {"message": f"Hello, {name}!"} for name in names
+    ]
+
+
+@pytest.mark.asyncio
+async def test_request_many_unordered_streams_results():
+    client = AsyncClient(
+        "localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+
+    async def endless_requests():
+        index = 0
+        while True:
+            yield {"name": f"name{index}"}
+            index += 1
+
+    responses = await client.request_many(
+        "helloworld.Greeter",
+        "SayHello",
+        endless_requests(),
+        max_in_flight=4,
+        ordered=False,
+    )
+    results = {}
+    async for index, response in responses:
+        results[index] = response
+        if len(results) == 10:
+            break
+    await responses.aclose()
+    for index, response in results.items():
+        assert response == {"message": f"Hello, name{index}!"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered", [True, False])
+async def test_request_many_encoding_errors(ordered):
+    client = AsyncClient(
+        "localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    requests = [{"name": "a"}, {"name": 1}, {"name": "b"}]
+    responses = await client.request_many(
+        "helloworld.Greeter",
+        "SayHello",
+        requests,
+        ordered=ordered,
+        return_exceptions=True,
+    )
+    results = [x async for x in responses]
+    if not ordered:
+        results = [result for _, result in sorted(results, key=lambda r: r[0])]
+    assert results[0] == {"message": "Hello, a!"}
+    assert isinstance(results[1], ParseError)
+    assert results[2] == {"message": "Hello, b!"}
+
+    responses = await client.request_many(
+        "helloworld.Greeter", "SayHello", requests, ordered=ordered
+    )
+    with pytest.raises(ParseError):
+        [x async for x in responses]
+
+
+@pytest.mark.asyncio
+async def test_request_many_errors():
+    # the helloworld server does not implement the client_tester service
+    client = StubAsyncClient(
+        "localhost:50051",
+        [client_tester_pb2.DESCRIPTOR.services_by_name["ClientTester"]],
+    )
+    requests = [{"factor": i} for i in range(3)]
+    responses = await client.request_many(
+        "client_tester.ClientTester",
+        "TestUnaryUnary",
+        requests,
+        return_exceptions=True,
+    )
+    async for response in responses:
+        assert isinstance(response, grpc.RpcError)
+        assert response.code() == grpc.StatusCode.UNIMPLEMENTED
+
+    responses = await client.request_many(
+        "client_tester.ClientTester", "TestUnaryUnary", requests
+    )
+    with pytest.raises(grpc.RpcError):
+        [x async for x in responses]
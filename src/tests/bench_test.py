@@ -0,0 +1,126 @@
+import json
+import logging
+
+import pytest
+from grpc_requests.bench import BenchReport, RequestSource, run_bench
+from grpc_requests.cli import cli
+
+"""
+Test cases for the bench command
+"""
+
+logger = logging.getLogger("name")
+
+
+def test_request_source():
+    source = RequestSource(['{"name": "n{{.RequestNumber}}"}', '{"name": "x"}'])
+    assert source.get(0) == {"name": "n0"}
+    assert source.get(1) == {"name": "x"}
+    assert source.get(2) == {"name": "n2"}
+    with pytest.raises(ValueError):
+        RequestSource([])
+
+
+def test_report():
+    report = BenchReport(
+        calls=4,
+        elapsed=2.0,
+        latencies=[0.125, 0.375, 0.625, 0.875],
+        status_codes={"OK": 4},
+        cpu_seconds=0.1,
+    )
+    assert report.rps == 2.0
+    assert report.percentile(50) == 0.625
+    assert report.percentile(99) == 0.875
+    histogram = report.histogram(buckets=4)
+    assert [count for _, count in histogram] == [1, 1, 1, 1]
+    assert histogram[-1][0] == pytest.approx(0.875)
+
+
+@pytest.mark.asyncio
+async def test_run_bench():
+    report = await run_bench(
+        "localhost:50051",
+        "helloworld.Greeter",
+        "SayHello",
+        RequestSource(['{"name": "n{{.RequestNumber}}"}']),
+        concurrency=4,
+        total=20,
+    )
+    assert report.calls == 20
+    assert report.status_codes == {"OK": 20}
+    assert len(report.latencies) == 20
+    assert report.latencies == sorted(report.latencies)
+
+
+@pytest.mark.asyncio
+async def test_run_bench_rate_and_streams():
+    report = await run_bench(
+        "localhost:50051",
+        "helloworld.Greeter",
+        "SayHelloOneByOne",
+        RequestSource(['[{"name": "a"}, {"name": "b"}]', '{"name": "c"}']),
+        concurrency=4,
+        rps=40,
+        duration=0.25,
+    )
+    assert report.status_codes == {"OK": report.calls}
+    assert 8 <= report.calls <= 10
+
+
+@pytest.mark.asyncio
+async def test_run_bench_counts_status_codes():
+    report = await run_bench(
+        "localhost:50051",
+        "helloworld.Greeter",
+        "SayHelloGroup",
+        RequestSource(['{"name": "a b"}']),
+        total=5,
+        # a deadline already past when the call starts
+        timeout=-1,
+    )
+    assert report.status_codes == {"DEADLINE_EXCEEDED": 5}
+
+
+def test_cli_bench(capsys):
+    code = cli(
+        [
+            "bench",
+            "localhost:50051",
+            "helloworld.Greeter/SayHello",
+            "-d",
+            '{"name": "sinsky"}',
+            "-n",
+            "3",
+            "-m",
+            "x-user=sinsky",
+            "--format",
+            "json",
+        ]
+    )
+    assert code == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["calls"] == 3
+    assert summary["status_codes"] == {"OK": 3}
+    assert set(summary["percentiles"]) == {"10", "25", "50", "75", "90", "95", "99"}
+
+
+def test_cli_bench_errors(capsys):
+    with pytest.raises(SystemExit):
+        cli(["bench", "localhost:50051", "SayHello", "-d", "{}"])
+    with pytest.raises(SystemExit) as exc_info:
+        cli(["bench", "localhost:50051", "helloworld.Greeter/Nope", "-d", "{}"])
+    assert exc_info.value.code == 2
+    assert "Nope" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "data", ['{"nope": 1}', '{"name": "{{.RequestNumber}}", "nope": 1}']
+)
+def test_cli_bench_invalid_request(capsys, data):
+    with pytest.raises(SystemExit) as exc_info:
+        cli(["bench", "localhost:50051", "helloworld.Greeter/SayHello", "-d", data])
+    assert exc_info.value.code == 2
+    err = capsys.readouterr().err
+    assert "request 1 is invalid" in err
+    assert "nope" in err
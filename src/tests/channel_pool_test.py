@@ -0,0 +1,98 @@
+import logging
+
+import pytest
+from google.protobuf import descriptor_pool
+from grpc_requests.aio import AsyncClient
+from grpc_requests.channel_pool import (
+    LEAST_BUSY,
+    POOL_INDEX_OPTION,
+    ChannelPool,
+    pool_channel_options,
+)
+from grpc_requests.client import Client
+
+"""
+Test cases for clients backed by a channel pool
+"""
+
+logger = logging.getLogger("name")
+
+
+def test_pool_channel_options_are_distinct():
+    options = [("grpc.max_receive_message_length", 1024)]
+    assert pool_channel_options(options, 1) == [
+        ("grpc.max_receive_message_length", 1024),
+        (POOL_INDEX_OPTION, 1),
+    ]
+    assert pool_channel_options(None, 0) != pool_channel_options(None, 1)
+
+
+def test_round_robin_pick():
+    pool = ChannelPool(["a", "b", "c"])
+    assert [pool.pick() for _ in range(6)] == [0, 1, 2, 0, 1, 2]
+
+
+def test_least_busy_pick():
+    pool = ChannelPool(["a", "b", "c"], LEAST_BUSY)
+    pool.acquire(0)
+    pool.acquire(1)
+    assert pool.pick() == 2
+    pool.acquire(2)
+    pool.release(1)
+    assert pool.pick() == 1
+
+
+def test_invalid_pool():
+    with pytest.raises(ValueError):
+        ChannelPool([])
+    with pytest.raises(ValueError):
+        ChannelPool(["a"], "random")
+    with pytest.raises(ValueError):
+        Client("localhost:50051", channel_pool_size=0)
+
+
+@pytest.mark.parametrize("strategy", ["round_robin", "least_busy"])
+def test_pooled_client(strategy):
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        channel_pool_size=3,
+        channel_pool_strategy=strategy,
+    )
+    assert len(client.channels) == 3
+    for i in range(6):
+        response = client.request("helloworld.Greeter", "SayHello", {"name": f"{i}"})
+        assert response == {"message": f"Hello, {i}!"}
+    responses = client.request("helloworld.Greeter", "SayHelloGroup", {"name": "a b"})
+    assert list(responses) == [{"message": "Hello, a!"}, {"message": "Hello, b!"}]
+    responses = client.request_many(
+        "helloworld.Greeter", "SayHello", [{"name": "c"}] * 10, max_in_flight=4
+    )
+    assert list(responses) == [{"message": "Hello, c!"}] * 10
+    assert client._channel_pool.in_flight() == [0, 0, 0]
+    client.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("strategy", ["round_robin", "least_busy"])
+async def test_pooled_async_client(strategy):
+    async with AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        channel_pool_size=3,
+        channel_pool_strategy=strategy,
+    ) as client:
+        assert len(client.channels) == 3
+        for i in range(6):
+            response = await client.request(
+                "helloworld.Greeter", "SayHello", {"name": f"{i}"}
+            )
+            assert response == {"message": f"Hello, {i}!"}
+        responses = await client.request(
+            "helloworld.Greeter", "SayHelloGroup", {"name": "a b"}
+        )
+        assert [x async for x in responses] == [
+            {"message": "Hello, a!"},
+            {"message": "Hello, b!"},
+        ]
+        assert client._channel_pool.in_flight() == [0, 0, 0]
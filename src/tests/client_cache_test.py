@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+
+import pytest
+from grpc_requests import client as client_module
+from grpc_requests.client import Client, StubClient, get_by_endpoint
+from grpc_requests.client_cache import ClientCache, make_cache_key
+from test_servers.helloworld.helloworld_pb2 import _GREETER
+
+"""
+Test cases for the client cache behind get_by_endpoint
+"""
+
+logger = logging.getLogger("name")
+
+
+class FakeClient:
+    created = 0
+
+    def __init__(self, endpoint, ssl=False, channel_options=None, delay=0.0):
+        FakeClient.created += 1
+        time.sleep(delay)
+        self.endpoint = endpoint
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FailingClient:
+    attempts = 0
+
+    def __init__(self, endpoint):
+        FailingClient.attempts += 1
+        if FailingClient.attempts == 1:
+            raise ConnectionError("first construction fails")
+
+
+def test_key_applies_defaults():
+    assert make_cache_key(FakeClient, "a:1", {}) == make_cache_key(
+        FakeClient, "a:1", {"ssl": False}
+    )
+    assert make_cache_key(FakeClient, "a:1", {}) != make_cache_key(
+        FakeClient, "a:1", {"ssl": True}
+    )
+    assert make_cache_key(
+        FakeClient, "a:1", {"channel_options": [("a", 1)]}
+    ) != make_cache_key(FakeClient, "a:1", {"channel_options": [("a", 2)]})
+
+
+def test_hits_and_misses():
+    cache = ClientCache()
+    first = cache.get(FakeClient, "a:1")
+    assert cache.get(FakeClient, "a:1", ssl=False) is first
+    assert cache.get(FakeClient, "a:1", ssl=True) is not first
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (1, 2, 0, 2)
+
+
+def test_concurrent_construction_is_single_flight():
+    cache = ClientCache()
+    created = FakeClient.created
+    clients = []
+
+    def get():
+        clients.append(cache.get(FakeClient, "a:1", delay=0.2))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert FakeClient.created == created + 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_lru_eviction_closes_clients():
+    cache = ClientCache(max_size=2)
+    a = cache.get(FakeClient, "a:1")
+    b = cache.get(FakeClient, "b:1")
+    cache.get(FakeClient, "a:1")
+    cache.get(FakeClient, "c:1")
+    assert b.closed
+    assert not a.closed
+    assert cache.stats().evictions == 1
+    assert len(cache) == 2
+
+
+def test_ttl_eviction():
+    cache = ClientCache(ttl=0.05)
+    first = cache.get(FakeClient, "a:1")
+    time.sleep(0.1)
+    second = cache.get(FakeClient, "a:1")
+    assert second is not first
+    assert first.closed
+
+
+def test_ttl_eviction_sweeps_other_clients():
+    cache = ClientCache(ttl=0.3)
+    a = cache.get(FakeClient, "a:1")
+    b = cache.get(FakeClient, "b:1")
+    time.sleep(0.2)
+    c = cache.get(FakeClient, "c:1")
+    # a is used last, but still evicted once it expires
+    cache.get(FakeClient, "a:1")
+    time.sleep(0.2)
+    d = cache.get(FakeClient, "d:1")
+    assert a.closed and b.closed
+    assert not c.closed and not d.closed
+    assert cache.stats().evictions == 2
+    assert len(cache) == 2
+    assert cache.get(FakeClient, "c:1") is c
+
+
+def test_failed_construction_is_retried():
+    cache = ClientCache()
+    with pytest.raises(ConnectionError):
+        cache.get(FailingClient, "a:1")
+    assert isinstance(cache.get(FailingClient, "a:1"), FailingClient)
+
+
+def test_get_by_endpoint_is_settings_aware():
+    client_module.reset_cached_client("localhost:50051")
+    client = get_by_endpoint("localhost:50051")
+    assert get_by_endpoint("localhost:50051") is client
+    assert Client.get_by_endpoint("localhost:50051") is client
+    assert get_by_endpoint("localhost:50051", compression=None) is client
+    assert get_by_endpoint("localhost:50051", channel_pool_size=2) is not client
+    stub_client = get_by_endpoint("localhost:50051", service_descriptors=[_GREETER])
+    assert isinstance(stub_client, StubClient)
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    client_module.reset_cached_client("localhost:50051")
+    assert get_by_endpoint("localhost:50051") is not client
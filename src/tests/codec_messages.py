@@ -0,0 +1,99 @@
+"""
+Message classes covering every field kind json_format handles, built from a
+descriptor at import time so no generated code is needed.
+"""
+
+from google.protobuf import (
+    descriptor_pb2,
+    descriptor_pool,
+    struct_pb2,  # noqa: F401
+    text_format,
+    timestamp_pb2,  # noqa: F401
+    wrappers_pb2,  # noqa: F401
+)
+from google.protobuf.message_factory import GetMessageClass
+
+SAMPLE_PROTO = """
+name: "codec_sample.proto"
+package: "codec_sample"
+syntax: "proto3"
+dependency: "google/protobuf/timestamp.proto"
+dependency: "google/protobuf/struct.proto"
+dependency: "google/protobuf/wrappers.proto"
+enum_type {
+  name: "Color"
+  value { name: "COLOR_UNSPECIFIED" number: 0 }
+  value { name: "RED" number: 1 }
+  value { name: "GREEN" number: 2 }
+}
+message_type {
+  name: "Inner"
+  field { name: "label" number: 1 type: TYPE_STRING label: LABEL_OPTIONAL json_name: "label" }
+  field { name: "values" number: 2 type: TYPE_INT32 label: LABEL_REPEATED json_name: "values" }
+  field { name: "child" number: 3 type: TYPE_MESSAGE type_name: ".codec_sample.Inner" label: LABEL_OPTIONAL json_name: "child" }
+}
+message_type {
+  name: "Sample"
+  field { name: "i32" number: 1 type: TYPE_INT32 label: LABEL_OPTIONAL json_name: "i32" }
+  field { name: "i64" number: 2 type: TYPE_INT64 label: LABEL_OPTIONAL json_name: "i64" }
+  field { name: "u32" number: 3 type: TYPE_UINT32 label: LABEL_OPTIONAL json_name: "u32" }
+  field { name: "u64" number: 4 type: TYPE_UINT64 label: LABEL_OPTIONAL json_name: "u64" }
+  field { name: "s32" number: 5 type: TYPE_SINT32 label: LABEL_OPTIONAL json_name: "s32" }
+  field { name: "f64" number: 6 type: TYPE_FIXED64 label: LABEL_OPTIONAL json_name: "f64" }
+  field { name: "f" number: 7 type: TYPE_FLOAT label: LABEL_OPTIONAL json_name: "f" }
+  field { name: "d" number: 8 type: TYPE_DOUBLE label: LABEL_OPTIONAL json_name: "d" }
+  field { name: "b" number: 9 type: TYPE_BOOL label: LABEL_OPTIONAL json_name: "b" }
+  field { name: "s" number: 10 type: TYPE_STRING label: LABEL_OPTIONAL json_name: "s" }
+  field { name: "raw" number: 11 type: TYPE_BYTES label: LABEL_OPTIONAL json_name: "raw" }
+  field { name: "color" number: 12 type: TYPE_ENUM type_name: ".codec_sample.Color" label: LABEL_OPTIONAL json_name: "color" }
+  field { name: "inner" number: 13 type: TYPE_MESSAGE type_name: ".codec_sample.Inner" label: LABEL_OPTIONAL json_name: "inner" }
+  field { name: "inners" number: 14 type: TYPE_MESSAGE type_name: ".codec_sample.Inner" label: LABEL_REPEATED json_name: "inners" }
+  field { name: "tags" number: 15 type: TYPE_STRING label: LABEL_REPEATED json_name: "tags" }
+  field { name: "samples" number: 16 type: TYPE_DOUBLE label: LABEL_REPEATED json_name: "samples" }
+  field { name: "counts" number: 17 type: TYPE_MESSAGE type_name: ".codec_sample.Sample.CountsEntry" label: LABEL_REPEATED json_name: "counts" }
+  field { name: "by_id" number: 18 type: TYPE_MESSAGE type_name: ".codec_sample.Sample.ByIdEntry" label: LABEL_REPEATED json_name: "byId" }
+  field { name: "flags" number: 19 type: TYPE_MESSAGE type_name: ".codec_sample.Sample.FlagsEntry" label: LABEL_REPEATED json_name: "flags" }
+  field { name: "text" number: 20 type: TYPE_STRING label: LABEL_OPTIONAL oneof_index: 0 json_name: "text" }
+  field { name: "number" number: 21 type: TYPE_INT32 label: LABEL_OPTIONAL oneof_index: 0 json_name: "number" }
+  field { name: "created" number: 22 type: TYPE_MESSAGE type_name: ".google.protobuf.Timestamp" label: LABEL_OPTIONAL json_name: "created" }
+  field { name: "meta" number: 23 type: TYPE_MESSAGE type_name: ".google.protobuf.Struct" label: LABEL_OPTIONAL json_name: "meta" }
+  field { name: "maybe" number: 24 type: TYPE_MESSAGE type_name: ".google.protobuf.Int32Value" label: LABEL_OPTIONAL json_name: "maybe" }
+  field { name: "any_value" number: 25 type: TYPE_MESSAGE type_name: ".google.protobuf.Value" label: LABEL_OPTIONAL json_name: "anyValue" }
+  field { name: "values" number: 26 type: TYPE_MESSAGE type_name: ".google.protobuf.Value" label: LABEL_REPEATED json_name: "values" }
+  field { name: "camel_case" number: 27 type: TYPE_STRING label: LABEL_OPTIONAL json_name: "camelCase" }
+  field { name: "colors" number: 28 type: TYPE_ENUM type_name: ".codec_sample.Color" label: LABEL_REPEATED json_name: "colors" }
+  field { name: "floats" number: 29 type: TYPE_FLOAT label: LABEL_REPEATED json_name: "floats" }
+  field { name: "blobs" number: 30 type: TYPE_BYTES label: LABEL_REPEATED json_name: "blobs" }
+  field { name: "big" number: 31 type: TYPE_SFIXED64 label: LABEL_REPEATED json_name: "big" }
+  nested_type {
+    name: "CountsEntry"
+    field { name: "key" number: 1 type: TYPE_STRING label: LABEL_OPTIONAL json_name: "key" }
+    field { name: "value" number: 2 type: TYPE_INT64 label: LABEL_OPTIONAL json_name: "value" }
+    options { map_entry: true }
+  }
+  nested_type {
+    name: "ByIdEntry"
+    field { name: "key" number: 1 type: TYPE_INT32 label: LABEL_OPTIONAL json_name: "key" }
+    field { name: "value" number: 2 type: TYPE_MESSAGE type_name: ".codec_sample.Inner" label: LABEL_OPTIONAL json_name: "value" }
+    options { map_entry: true }
+  }
+  nested_type {
+    name: "FlagsEntry"
+    field { name: "key" number: 1 type: TYPE_BOOL label: LABEL_OPTIONAL json_name: "key" }
+    field { name: "value" number: 2 type: TYPE_STRING label: LABEL_OPTIONAL json_name: "value" }
+    options { map_entry: true }
+  }
+  oneof_decl { name: "choice" }
+}
+"""
+
+_pool = descriptor_pool.Default()
+try:
+    _file = _pool.FindFileByName("codec_sample.proto")
+except KeyError:
+    _file = _pool.Add(
+        text_format.Parse(SAMPLE_PROTO, descriptor_pb2.FileDescriptorProto())
+    )
+
+Sample = GetMessageClass(_pool.FindMessageTypeByName("codec_sample.Sample"))
+Inner = GetMessageClass(_pool.FindMessageTypeByName("codec_sample.Inner"))
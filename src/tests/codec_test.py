@@ -0,0 +1,215 @@
+import logging
+
+import pytest
+from google.protobuf.json_format import MessageToDict, ParseDict, ParseError
+from grpc_requests import codec
+from grpc_requests.client import CompiledMessageParsers, Client, MessageViewParsers
+from tests.codec_messages import Sample
+
+"""
+Test cases for the compiled message codecs
+"""
+
+logger = logging.getLogger("name")
+
+FAST_PATH_REQUESTS = [
+    {},
+    {
+        "i32": -5,
+        "i64": 2**40,
+        "u32": 7,
+        "u64": 2**63,
+        "s32": -9,
+        "f64": 12,
+        "f": 0.1,
+        "d": 1.5,
+        "b": True,
+        "s": "text",
+        "raw": "aGVsbG8=",
+        "color": "GREEN",
+    },
+    {"f": 3, "d": 2, "color": 1, "raw": b"aGk", "colors": ["RED", 2, "GREEN"]},
+    {"inner": {}, "inners": [{"label": "a"}, {"values": [1, 2], "child": {}}]},
+    {"inner": {"label": "x", "child": {"child": {"values": [3]}}}},
+    {"tags": ["a", "b"], "samples": [1.0, 2, 3.5], "floats": [0.25], "big": [-1]},
+    {"counts": {"a": 1, "b": 2}, "by_id": {"1": {"label": "one"}, 2: {}}},
+    {"flags": {"true": "yes", "false": "no"}},
+    {"text": "chosen"},
+    {"number": 3, "text": None},
+    {"s": None, "inner": None, "camel_case": "snake"},
+    {"blobs": ["YQ==", "Yg"]},
+]
+
+FALLBACK_REQUESTS = [
+    {"i64": "123", "u64": "18446744073709551615", "i32": 4.0},
+    {"d": "NaN", "f": "Infinity", "samples": ["-Infinity"]},
+    {"color": "3"},
+    {"camelCase": "camel", "byId": {"5": {}}},
+    {"created": "2024-01-01T00:00:00Z", "meta": {"a": [1, "b", None]}},
+    {"maybe": 5, "any_value": None, "values": [1, "x", None, {"k": True}]},
+    {"inners": ({"label": "tuple"},)},
+]
+
+INVALID_REQUESTS = [
+    {"unknown": 1},
+    {"i32": True},
+    {"i32": 1.5},
+    {"i32": 2**40},
+    {"u32": -1},
+    {"b": "true"},
+    {"s": 1},
+    {"f": float("nan")},
+    {"f": 1e39},
+    {"d": float("inf")},
+    {"color": "BLUE"},
+    {"text": "a", "number": 1},
+    {"tags": "notalist"},
+    {"tags": ["a", None]},
+    {"inners": [None]},
+    {"flags": {"yes": "no"}},
+    {"by_id": {"x": {}}},
+    {"counts": {"a": "b"}},
+    {"created": "yesterday"},
+]
+
+
+def _special_values_message():
+    message = Sample(d=float("nan"), f=float("-inf"), color=7)
+    message.samples.extend([float("inf"), 0.5, float("nan")])
+    message.floats.extend([0.1, float("inf")])
+    message.colors.extend([1, 9])
+    message.by_id[3].values.append(-1)
+    return message
+
+
+DECODED_RESPONSES = [
+    ParseDict(data, Sample()) for data in FAST_PATH_REQUESTS + FALLBACK_REQUESTS
+] + [_special_values_message()]
+
+
+def _serialized(message):
+    return message.SerializeToString(deterministic=True)
+
+
+@pytest.mark.parametrize("data", FAST_PATH_REQUESTS + FALLBACK_REQUESTS)
+def test_encoder_matches_parse_dict(data):
+    encoded = codec.MessageEncoder().encode(data, Sample)
+    assert _serialized(encoded) == _serialized(ParseDict(data, Sample()))
+
+
+@pytest.mark.parametrize("data", FAST_PATH_REQUESTS)
+def test_encoder_does_not_fall_back(data, monkeypatch):
+    def fail(*args, **kwargs):
+        pytest.fail("compiled encoder fell back to ParseDict")
+
+    monkeypatch.setattr(codec, "ParseDict", fail)
+    codec.MessageEncoder().encode(data, Sample)
+
+
+@pytest.mark.parametrize("data", INVALID_REQUESTS)
+def test_encoder_raises_parse_error(data):
+    with pytest.raises(ParseError):
+        ParseDict(data, Sample())
+    with pytest.raises(ParseError):
+        codec.MessageEncoder().encode(data, Sample)
+
+
+def test_encoder_reuses_compiled_type():
+    encoder = codec.MessageEncoder()
+    encoder.encode({"inner": {"label": "a"}}, Sample)
+    compiled = dict(encoder._encoders)
+    encoder.encode({"inner": {"label": "b"}}, Sample)
+    assert encoder._encoders == compiled
+
+
+@pytest.mark.parametrize("message", DECODED_RESPONSES)
+def test_decoder_matches_message_to_dict(message):
+    expected = MessageToDict(message, preserving_proto_field_name=True)
+    assert codec.MessageDecoder().decode(message) == expected
+
+
+@pytest.mark.parametrize(
+    "message", DECODED_RESPONSES[: len(FAST_PATH_REQUESTS)] + DECODED_RESPONSES[-1:]
+)
+def test_decoder_does_not_fall_back(message, monkeypatch):
+    def fail(*args, **kwargs):
+        pytest.fail("compiled decoder fell back to MessageToDict")
+
+    monkeypatch.setattr(codec, "MessageToDict", fail)
+    codec.MessageDecoder().decode(message)
+
+
+def test_decoder_reuses_compiled_type():
+    decoder = codec.MessageDecoder()
+    decoder.decode(Sample(inner={"label": "a"}))
+    compiled = dict(decoder._decoders)
+    decoder.decode(Sample(inner={"label": "b"}))
+    assert decoder._decoders == compiled
+
+
+@pytest.mark.parametrize("message", DECODED_RESPONSES)
+def test_view_matches_message_to_dict(message):
+    expected = MessageToDict(message, preserving_proto_field_name=True)
+    view = codec.MessageDecoder().view(message)
+    assert view == expected
+    assert view.to_dict() == expected
+    assert sorted(view) == sorted(expected)
+    assert {name: view[name] for name in expected} == expected
+
+
+def test_view_converts_fields_on_access():
+    message = Sample(i64=5, tags=["a"], inners=[{"label": "x"}])
+    view = codec.MessageDecoder().view(message)
+    assert "tags" in view
+    assert "i32" not in view
+    assert view.get("i32") is None
+    assert view._values == {}
+
+    assert view["i64"] == "5"
+    assert view["i64"] is view["i64"]
+    assert list(view._values) == ["i64"]
+
+    inner = view["inners"][0]
+    assert isinstance(inner, codec.MessageView)
+    assert inner["label"] == "x"
+    assert inner.message is message.inners[0]
+    with pytest.raises(KeyError):
+        view["unknown"]
+
+
+def test_view_falls_back_to_message_to_dict(monkeypatch):
+    def fail(value):
+        raise ValueError()
+
+    monkeypatch.setattr(codec, "_output_bytes", fail)
+    message = Sample(raw=b"hello", i32=1)
+    view = codec.MessageDecoder().view(message)
+    assert view["raw"] == "aGVsbG8="
+    assert view == MessageToDict(message, preserving_proto_field_name=True)
+
+
+def test_view_parsers_request():
+    client = Client(
+        "localhost:50052",
+        message_parsers=MessageViewParsers(),
+    )
+    response = client.request(
+        "client_tester.ClientTester",
+        "TestUnaryUnary",
+        {"factor": 2, "readings": [1.5, 2.5], "uuid": 3, "extra_data": ["Zm9v"]},
+    )
+    assert isinstance(response, codec.MessageView)
+    assert response["feedback"] == "Acceptable"
+
+
+def test_compiled_parsers_request():
+    client = Client(
+        "localhost:50052",
+        message_parsers=CompiledMessageParsers(),
+    )
+    response = client.request(
+        "client_tester.ClientTester",
+        "TestUnaryUnary",
+        {"factor": 2, "readings": [1.5, 2.5], "uuid": 3, "extra_data": ["Zm9v"]},
+    )
+    assert response == {"feedback": "Acceptable"}
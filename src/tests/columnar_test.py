@@ -0,0 +1,129 @@
+import logging
+
+import pytest
+from grpc_requests.aio import AsyncClient
+from grpc_requests.client import Client
+from tests.codec_messages import Inner, Sample
+
+np = pytest.importorskip("numpy")
+from grpc_requests.columnar import ColumnarDecoder  # noqa: E402
+
+"""
+Test cases for the columnar NumPy decoding of streamed responses
+"""
+
+logger = logging.getLogger("name")
+
+SERVICE = "client_tester.ClientTester"
+METHOD = "TestUnaryStream"
+READINGS = [1.5, -2.25, 3.0, 4.5, 6.75]
+FIELDS = ["i64", "d", "samples"]
+
+
+def test_scalar_and_repeated_columns():
+    messages = [
+        Sample(i64=1, d=0.5, samples=[1.0, 2.0]),
+        Sample(i64=2, d=1.5),
+        Sample(i64=3, d=2.5, samples=[3.0]),
+    ]
+    decoder = ColumnarDecoder(["i64", "d", "samples"], batch_size=2)
+    blocks = list(decoder.decode(iter(messages)))
+
+    assert [len(block["i64"]) for block in blocks] == [2, 1]
+    assert blocks[0]["i64"].dtype == np.int64
+    assert blocks[0]["i64"].tolist() == [1, 2]
+    assert blocks[1]["d"].tolist() == [2.5]
+
+    samples = blocks[0]["samples"]
+    assert len(samples) == 2
+    assert samples.row(0).tolist() == [1.0, 2.0]
+    assert samples.row(1).tolist() == []
+    assert blocks[1]["samples"].values.tolist() == [3.0]
+
+
+def test_repeated_values_grow_past_batch_size():
+    messages = [Inner(values=list(range(i * 10, i * 10 + 10))) for i in range(3)]
+    block = next(ColumnarDecoder(["values"], batch_size=4).decode(messages))
+    assert block["values"].values.tolist() == list(range(30))
+    assert block["values"].offsets.tolist() == [0, 10, 20, 30]
+
+
+def test_rejects_non_numeric_fields():
+    with pytest.raises(ValueError):
+        list(ColumnarDecoder(["s"]).decode([Sample(s="text")]))
+    with pytest.raises(ValueError):
+        list(ColumnarDecoder(["missing"]).decode([Sample()]))
+
+
+def sample(index, reading):
+    # as many samples as the index of the response
+    return Sample(i64=index + 1, d=reading, samples=[reading] * index)
+
+
+def sample_handler(handler):
+    """Turns each streamed response of the server into a Sample with values."""
+
+    def call(request, **kwargs):
+        responses = handler(request, **kwargs)
+        for index, (reading, _) in enumerate(zip(request.readings, responses)):
+            yield sample(index, reading)
+
+    return call
+
+
+def async_sample_handler(handler):
+    async def call(request, **kwargs):
+        index = 0
+        async for _ in handler(request, **kwargs):
+            yield sample(index, request.readings[index])
+            index += 1
+
+    return call
+
+
+def replace_handler(client, methods_meta, wrap):
+    meta = methods_meta[METHOD]
+    client._service_methods_meta[SERVICE] = {
+        **methods_meta,
+        METHOD: meta._replace(handler=wrap(meta.handler)),
+    }
+
+
+def assert_sample_blocks(blocks):
+    assert [len(block["i64"]) for block in blocks] == [4, 1]
+    assert all(block["i64"].dtype == np.int64 for block in blocks)
+    assert all(block["d"].dtype == np.float64 for block in blocks)
+    assert [block["i64"].tolist() for block in blocks] == [[1, 2, 3, 4], [5]]
+    assert [block["d"].tolist() for block in blocks] == [READINGS[:4], READINGS[4:]]
+
+    first, last = blocks[0]["samples"], blocks[1]["samples"]
+    assert first.values.dtype == last.values.dtype == np.float64
+    assert len(first) == 4
+    assert len(last) == 1
+    assert first.offsets.tolist() == [0, 0, 1, 3, 6]
+    assert [len(first.row(i)) for i in range(4)] == [0, 1, 2, 3]
+    assert first.row(3).tolist() == [READINGS[3]] * 3
+    assert last.values.tolist() == [READINGS[4]] * 4
+
+
+def test_decode_streamed_responses():
+    client = Client("localhost:50052")
+    replace_handler(client, client.get_methods_meta(SERVICE), sample_handler)
+    responses = client.request(SERVICE, METHOD, {"readings": READINGS}, raw_output=True)
+    blocks = list(ColumnarDecoder(FIELDS, batch_size=4).decode(responses))
+    assert_sample_blocks(blocks)
+
+
+@pytest.mark.asyncio
+async def test_decode_async_streamed_responses():
+    client = AsyncClient("localhost:50052")
+    replace_handler(
+        client, await client.get_methods_meta(SERVICE), async_sample_handler
+    )
+    responses = await client.request(
+        SERVICE, METHOD, {"readings": READINGS}, raw_output=True
+    )
+    decoder = ColumnarDecoder(FIELDS, batch_size=4)
+    blocks = [block async for block in decoder.decode_async(responses)]
+    assert_sample_blocks(blocks)
+    await client.channel.close()
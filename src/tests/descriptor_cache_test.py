@@ -0,0 +1,103 @@
+import logging
+
+import pytest
+from google.protobuf import descriptor_pool
+from grpc_requests.aio import AsyncClient
+from grpc_requests.client import Client, ReflectionSession
+from grpc_requests.descriptor_cache import DescriptorCache
+
+"""
+Test cases for the persistent descriptor cache
+"""
+
+logger = logging.getLogger("name")
+
+
+def _fail_reflection(*args, **kwargs):
+    pytest.fail("reflection lookup made despite a valid descriptor cache")
+
+
+def test_cache_saved_on_cold_start(tmp_path):
+    cache = DescriptorCache(tmp_path)
+    Client(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    entry = cache.load("localhost:50053")
+    assert entry is not None
+    assert "dependencies.Greeter" in entry.service_names
+    file_names = [file_descriptor.name for file_descriptor in entry.file_descriptors]
+    # dependencies are stored before the files importing them
+    assert file_names.index("dependency2.proto") < file_names.index("dependency1.proto")
+    assert file_names.index("dependency1.proto") < file_names.index(
+        "dependencies.proto"
+    )
+
+
+def test_warm_start_skips_reflection(tmp_path, monkeypatch):
+    cache = DescriptorCache(tmp_path, validate_services=False)
+    Client(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+
+    monkeypatch.setattr(Client, "_reflection_request", _fail_reflection)
+    monkeypatch.setattr(ReflectionSession, "__init__", _fail_reflection)
+    client = Client(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    response = client.request("dependencies.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+
+
+def test_stale_service_list_refreshes(tmp_path):
+    cache = DescriptorCache(tmp_path)
+    cache.save("localhost:50053", ["dependencies.Removed"], [])
+    client = Client(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    assert client.request("dependencies.Greeter", "SayHello", {"name": "a"}) == {
+        "message": "Hello, a!"
+    }
+    entry = cache.load("localhost:50053")
+    assert "dependencies.Greeter" in entry.service_names
+
+
+def test_expired_entry_is_ignored(tmp_path):
+    cache = DescriptorCache(tmp_path, ttl=-1)
+    cache.save("localhost:50053", ["dependencies.Greeter"], [])
+    assert cache.load("localhost:50053") is None
+
+
+def test_unreadable_entry_is_ignored(tmp_path):
+    cache = DescriptorCache(tmp_path)
+    cache.save("localhost:50053", ["dependencies.Greeter"], [])
+    cache._path("localhost:50053").write_text("not json")
+    assert cache.load("localhost:50053") is None
+
+
+@pytest.mark.asyncio
+async def test_async_warm_start_skips_reflection(tmp_path, monkeypatch):
+    cache = DescriptorCache(tmp_path, validate_services=False)
+    await AsyncClient.create(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+
+    monkeypatch.setattr(AsyncClient, "_reflection_request", _fail_reflection)
+    client = await AsyncClient.create(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    response = await client.request(
+        "dependencies.Greeter", "SayHello", {"name": "sinsky"}
+    )
+    assert response == {"message": "Hello, sinsky!"}
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+
+import grpc
+import pytest
+from google.protobuf import descriptor_pool
+from grpc_requests.aio import AsyncClient, ExecutorMessageParsers
+from grpc_requests.client import Client, StubClient
+from grpc_requests.metrics import Metrics, to_prometheus_text
+from tests.test_servers.client_tester import client_tester_pb2
+
+"""
+Test cases for per method client metrics
+"""
+
+logger = logging.getLogger("name")
+
+SAY_HELLO = "helloworld.Greeter/SayHello"
+
+
+def test_unary_metrics():
+    metrics = Metrics()
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        metrics=metrics,
+    )
+    for _ in range(3):
+        client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    client.request("helloworld.Greeter", "SayHello", {"name": "x"}, raw_output=True)
+
+    snapshot = metrics.snapshot()
+    say_hello = snapshot[SAY_HELLO]
+    assert say_hello["status"] == {"OK": 4}
+    assert say_hello["request_messages"] == 4
+    assert say_hello["response_messages"] == 4
+    assert say_hello["transport_seconds"]["count"] == 4
+    assert say_hello["encode_seconds"]["count"] == 4
+    assert say_hello["decode_seconds"]["count"] == 3
+    assert say_hello["request_bytes"]["sum"] == 3 * 8 + 3
+    buckets = say_hello["transport_seconds"]["buckets"]
+    assert buckets[-1] == (float("inf"), 4)
+    assert [count for _, count in buckets] == sorted(count for _, count in buckets)
+
+
+def test_stream_metrics():
+    metrics = Metrics()
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        metrics=metrics,
+    )
+    say_hello_group = client.bind_method("helloworld.Greeter", "SayHelloGroup")
+    assert len(list(say_hello_group({"name": "a b c"}))) == 3
+    list(client.request_many("helloworld.Greeter", "SayHello", [{}, {}]))
+
+    # futures are recorded by their done callbacks, which may run after result()
+    deadline = time.monotonic() + 5
+    snapshot = metrics.snapshot()
+    while snapshot[SAY_HELLO]["status"].get("OK") != 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+        snapshot = metrics.snapshot()
+    assert snapshot[SAY_HELLO]["status"] == {"OK": 2}
+    group = snapshot["helloworld.Greeter/SayHelloGroup"]
+    assert group["response_messages"] == 3
+    assert group["decode_seconds"]["count"] == 3
+    assert group["status"] == {"OK": 1}
+
+
+def test_status_codes_are_counted():
+    metrics = Metrics()
+    client = StubClient(
+        "localhost:50051",
+        service_descriptors=[
+            client_tester_pb2.DESCRIPTOR.services_by_name["ClientTester"]
+        ],
+        metrics=metrics,
+    )
+    with pytest.raises(grpc.RpcError):
+        client.request("client_tester.ClientTester", "TestUnaryUnary", {})
+    snapshot = metrics.snapshot()
+    assert snapshot["client_tester.ClientTester/TestUnaryUnary"]["status"] == {
+        "UNIMPLEMENTED": 1
+    }
+
+
+def test_threads_record_into_separate_shards():
+    metrics = Metrics()
+    recorder = metrics.recorder("svc", "m")
+
+    def record():
+        for _ in range(1000):
+            recorder.finished(0.001, grpc.StatusCode.OK)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # the shards of ended threads are folded into the retired totals
+    assert metrics._shards == {}
+    assert metrics.snapshot()["svc/m"]["status"] == {"OK": 4000}
+    record()
+    assert len(metrics._shards) == 1
+    snapshot = metrics.snapshot()["svc/m"]
+    assert snapshot["status"] == {"OK": 5000}
+    assert snapshot["transport_seconds"]["count"] == 5000
+    assert snapshot["transport_seconds"]["sum"] == pytest.approx(5.0)
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_prometheus_text():
+    metrics = Metrics(latency_buckets=[0.5], size_buckets=[10])
+    recorder = metrics.recorder("pkg.Service", "Method")
+    recorder.finished(0.25, grpc.StatusCode.OK)
+    recorder.finished(1.0, grpc.StatusCode.UNAVAILABLE)
+    text = to_prometheus_text(metrics.snapshot())
+    labels = 'service="pkg.Service",method="Method"'
+    assert "# TYPE grpc_requests_transport_seconds histogram" in text
+    assert f'grpc_requests_transport_seconds_bucket{{{labels},le="0.5"}} 1' in text
+    assert f'grpc_requests_transport_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"grpc_requests_transport_seconds_count{{{labels}}} 2" in text
+    assert f'grpc_requests_calls_total{{{labels},code="UNAVAILABLE"}} 1' in text
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("message_parsers", [None, ExecutorMessageParsers()])
+async def test_async_metrics(message_parsers):
+    metrics = Metrics()
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        message_parsers=message_parsers,
+        metrics=metrics,
+    )
+    greeter = await client.service("helloworld.Greeter")
+    assert await greeter.SayHello({"name": "sinsky"}) == {"message": "Hello, sinsky!"}
+    responses = [x async for x in await greeter.SayHelloOneByOne([{}, {}])]
+    assert len(responses) == 2
+    await greeter.HelloEveryone([{"name": "a"}, {"name": "b"}])
+
+    snapshot = metrics.snapshot()
+    assert snapshot[SAY_HELLO]["status"] == {"OK": 1}
+    assert snapshot[SAY_HELLO]["decode_seconds"]["count"] == 1
+    one_by_one = snapshot["helloworld.Greeter/SayHelloOneByOne"]
+    assert one_by_one["request_messages"] == 2
+    assert one_by_one["response_messages"] == 2
+    assert one_by_one["status"] == {"OK": 1}
+    assert snapshot["helloworld.Greeter/HelloEveryone"]["request_messages"] == 2
@@ -1,4 +1,6 @@
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import grpc
 import pytest
@@ -6,13 +8,21 @@ import importlib.metadata
 from google.protobuf import descriptor_pb2, descriptor_pool
 from google.protobuf.descriptor import MethodDescriptor
 from google.protobuf.json_format import ParseError
-from grpc_requests.client import Client, CustomArgumentParsers, MethodType
+from grpc_requests.client import (
+    Client,
+    CustomArgumentParsers,
+    LazyMethodsMeta,
+    MethodType,
+    StubClient,
+)
 from tests.common import MetadataClientInterceptor
+from tests.test_servers.client_tester import client_tester_pb2
 from tests.test_servers.dependencies import (
     dependencies_pb2,
     dependency1_pb2,
     dependency2_pb2,
 )
+from tests.test_servers.helloworld.helloworld_pb2 import HelloReply, HelloRequest
 
 """
 Test cases for reflection based client
@@ -379,3 +389,263 @@ def test_stream_stream_empty_custom(helloworld_empty_reflection_client_custom_pa
     assert all(isinstance(response, dict) for response in responses)
     for response, _ in zip(responses, name_list):
         assert response == {"message": ""}
+
+
+class _CountingReflectionStub:
+    def __init__(self, stub):
+        self._stub = stub
+        self.streams = 0
+        self.requests = 0
+
+    def ServerReflectionInfo(self, request_iterator, *args, **kwargs):
+        self.streams += 1
+
+        def counted():
+            for request in request_iterator:
+                self.requests += 1
+                yield request
+
+        return self._stub.ServerReflectionInfo(counted(), *args, **kwargs)
+
+
+def test_register_all_service_uses_single_reflection_stream():
+    client = Client(
+        "localhost:50053",
+        lazy=True,
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+    )
+    stub = _CountingReflectionStub(client.reflection_stub)
+    client.reflection_stub = stub
+    client.register_all_service()
+    assert stub.streams == 1
+    # list_services and one symbol lookup per service, the server sends dependencies along
+    assert stub.requests == 1 + len(client.service_names)
+    response = client.request("dependencies.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+
+
+def test_reflection_session_is_reused_when_nested():
+    client = Client(
+        "localhost:50053",
+        lazy=True,
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+    )
+    stub = _CountingReflectionStub(client.reflection_stub)
+    client.reflection_stub = stub
+    with client.reflection_session() as session:
+        with client.reflection_session() as nested:
+            assert nested is session
+        client.get_file_descriptors_by_name("dependency1.proto")
+        client.get_file_descriptors_by_symbol("dependencies.Greeter")
+    assert stub.streams == 1
+    assert stub.requests == 2
+
+
+def test_reflection_sessions_are_per_thread():
+    client = Client(
+        "localhost:50053",
+        lazy=True,
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+    )
+    barrier = threading.Barrier(2, timeout=5)
+    sessions = []
+
+    def open_session():
+        with client.reflection_session() as session:
+            barrier.wait()
+            sessions.append(session)
+            client.get_file_descriptors_by_symbol("dependencies.Greeter")
+            barrier.wait()
+
+    with ThreadPoolExecutor(2) as executor:
+        for future in [executor.submit(open_session) for _ in range(2)]:
+            future.result()
+    assert sessions[0] is not sessions[1]
+
+
+def test_concurrent_lazy_registration():
+    services = ["dependencies.Greeter", "grpc.reflection.v1alpha.ServerReflection"]
+    for _ in range(20):
+        client = Client(
+            "localhost:50053",
+            lazy=True,
+            descriptor_pool=descriptor_pool.DescriptorPool(),
+        )
+        with ThreadPoolExecutor(4) as executor:
+            futures = [
+                executor.submit(client.register_service, service)
+                for service in services * 2
+            ]
+            for future in futures:
+                future.result()
+        response = client.request(
+            "dependencies.Greeter", "SayHello", {"name": "sinsky"}
+        )
+        assert response == {"message": "Hello, sinsky!"}
+        client.channel.close()
+
+
+def test_bind_method(helloworld_reflection_client):
+    say_hello = helloworld_reflection_client.bind_method(
+        "helloworld.Greeter", "SayHello", MethodType.UNARY_UNARY
+    )
+    assert say_hello({"name": "sinsky"}) == {"message": "Hello, sinsky!"}
+    raw = say_hello({"name": "sinsky"}, raw_output=True)
+    assert raw.message == "Hello, sinsky!"
+
+    say_hello_one_by_one = helloworld_reflection_client.bind_method(
+        "helloworld.Greeter", "SayHelloOneByOne"
+    )
+    responses = say_hello_one_by_one([{"name": "a"}, {"name": "b"}])
+    assert list(responses) == [{"message": "Hello a"}, {"message": "Hello b"}]
+
+
+def test_bind_method_checks_method(helloworld_reflection_client):
+    with pytest.raises(ValueError):
+        helloworld_reflection_client.bind_method("helloworld.Greeter", "SayGoodbye")
+    with pytest.raises(ValueError):
+        helloworld_reflection_client.bind_method(
+            "helloworld.Greeter", "SayHello", MethodType.STREAM_STREAM
+        )
+
+
+def test_request_bytes(helloworld_reflection_client):
+    request = HelloRequest(name="sinsky").SerializeToString()
+    response = helloworld_reflection_client.request_bytes(
+        "helloworld.Greeter", "SayHello", memoryview(request)
+    )
+    assert isinstance(response, bytes)
+    assert HelloReply.FromString(response).message == "Hello, sinsky!"
+
+    responses = helloworld_reflection_client.request_bytes(
+        "helloworld.Greeter",
+        "SayHelloOneByOne",
+        iter([HelloRequest(name=name).SerializeToString() for name in ("a", "b")]),
+    )
+    assert [HelloReply.FromString(r).message for r in responses] == [
+        "Hello a",
+        "Hello b",
+    ]
+    with pytest.raises(ValueError):
+        helloworld_reflection_client.request_bytes(
+            "helloworld.Greeter", "SayGoodbye", request
+        )
+
+
+def test_lazy_method_registration():
+    client = Client(
+        "localhost:50051",
+        lazy="method",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+    )
+    methods_meta = client.get_methods_meta("helloworld.Greeter")
+    assert isinstance(methods_meta, LazyMethodsMeta)
+    assert "SayHelloOneByOne" in methods_meta
+    assert methods_meta.built_method_names == ()
+
+    greeter_service = client.service("helloworld.Greeter")
+    assert greeter_service.SayHello({"name": "sinsky"}) == {"message": "Hello, sinsky!"}
+    assert methods_meta.built_method_names == ("SayHello",)
+    assert methods_meta["SayHello"] is methods_meta["SayHello"]
+    assert len(methods_meta) == len(greeter_service.method_names)
+
+    assert not hasattr(greeter_service, "SayGoodbye")
+    with pytest.raises(ValueError):
+        client.request("helloworld.Greeter", "SayGoodbye", {"name": "sinsky"})
+    assert methods_meta.built_method_names == ("SayHello",)
+
+
+@pytest.mark.parametrize("lazy", [True, "method"])
+def test_lazy_request_resolves_requested_service_only(lazy):
+    pool = descriptor_pool.DescriptorPool()
+    client = Client("localhost:50051", lazy=lazy, descriptor_pool=pool)
+    assert client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"}) == {
+        "message": "Hello, sinsky!"
+    }
+    assert "grpc.reflection.v1alpha.ServerReflection" in client.service_names
+    assert list(client._service_methods_meta) == ["helloworld.Greeter"]
+    with pytest.raises(KeyError):
+        pool.FindFileByName("grpc_reflection/v1alpha/reflection.proto")
+
+
+def test_request_many_ordered(helloworld_reflection_client):
+    names = [f"name{i}" for i in range(50)]
+    responses = helloworld_reflection_client.request_many(
+        "helloworld.Greeter",
+        "SayHello",
+        ({"name": name} for name in names),
+        max_in_flight=8,
+    )
+    assert list(responses) == [{"message": f"Hello, {name}!"} for name in names]
+
+
+def test_request_many_unordered(helloworld_reflection_client):
+    names = [f"name{i}" for i in range(50)]
+    responses = helloworld_reflection_client.request_many(
+        "helloworld.Greeter",
+        "SayHello",
+        [{"name": name} for name in names],
+        max_in_flight=8,
+        ordered=False,
+        raw_output=True,
+    )
+    results = dict(responses)
+    assert sorted(results) == list(range(len(names)))
+    for index, name in enumerate(names):
+        assert results[index].message == f"Hello, {name}!"
+
+
+def test_request_many_errors():
+    # the helloworld server does not implement the client_tester service
+    client = StubClient(
+        "localhost:50051",
+        [client_tester_pb2.DESCRIPTOR.services_by_name["ClientTester"]],
+    )
+    requests = [{"factor": i} for i in range(3)]
+    responses = client.request_many(
+        "client_tester.ClientTester",
+        "TestUnaryUnary",
+        requests,
+        return_exceptions=True,
+    )
+    for response in responses:
+        assert isinstance(response, grpc.RpcError)
+        assert response.code() == grpc.StatusCode.UNIMPLEMENTED
+
+    responses = client.request_many(
+        "client_tester.ClientTester", "TestUnaryUnary", requests
+    )
+    with pytest.raises(grpc.RpcError):
+        list(responses)
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_request_many_encoding_errors(helloworld_reflection_client, ordered):
+    requests = [{"name": "a"}, {"name": 1}, {"name": "b"}]
+    results = list(
+        helloworld_reflection_client.request_many(
+            "helloworld.Greeter",
+            "SayHello",
+            requests,
+            ordered=ordered,
+            return_exceptions=True,
+        )
+    )
+    if not ordered:
+        results = [result for _, result in sorted(results, key=lambda r: r[0])]
+    assert results[0] == {"message": "Hello, a!"}
+    assert isinstance(results[1], ParseError)
+    assert results[2] == {"message": "Hello, b!"}
+
+    responses = helloworld_reflection_client.request_many(
+        "helloworld.Greeter", "SayHello", requests, ordered=ordered
+    )
+    with pytest.raises(ParseError):
+        list(responses)
+
+
+def test_request_many_needs_unary_response(helloworld_reflection_client):
+    with pytest.raises(ValueError):
+        helloworld_reflection_client.request_many(
+            "helloworld.Greeter", "SayHelloGroup", [{"name": "a b"}]
+        )
@@ -0,0 +1,172 @@
+import json
+import logging
+
+import pytest
+from google.protobuf import descriptor_pool
+from grpc_requests.aio import AsyncClient
+from grpc_requests.cli import cli
+from grpc_requests.replay import Checkpoint, _Progress, replay
+
+"""
+Test cases for replaying JSONL files of requests
+"""
+
+logger = logging.getLogger("name")
+
+
+def _write_requests(path, names):
+    with open(path, "a") as f:
+        for name in names:
+            f.write(json.dumps({"name": name}) + "\n")
+
+
+def _read_results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def _client():
+    return AsyncClient(
+        "localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered", [True, False])
+async def test_replay(tmp_path, ordered):
+    requests = tmp_path / "requests.jsonl"
+    _write_requests(requests, [f"n{i}" for i in range(50)])
+    with open(requests, "a") as f:
+        f.write("\n{not json\n")
+        f.write('{"unknown": 1}\n')
+    output = tmp_path / "results.jsonl"
+
+    stats = await replay(
+        _client(),
+        "helloworld.Greeter",
+        "SayHello",
+        str(requests),
+        str(output),
+        max_in_flight=8,
+        ordered=ordered,
+    )
+    assert (stats.records, stats.errors, stats.skipped) == (52, 2, 0)
+    results = _read_results(output)
+    if ordered:
+        assert [result["line"] for result in results] == [*range(50), 51, 52]
+    results.sort(key=lambda result: result["line"])
+    assert results[7] == {"line": 7, "response": {"message": "Hello, n7!"}}
+    assert results[50]["error"]["code"] == "JSONDecodeError"
+    assert results[51]["error"]["code"] == "ParseError"
+
+
+@pytest.mark.asyncio
+async def test_replay_resumes_from_checkpoint(tmp_path):
+    client = _client()
+    requests = tmp_path / "requests.jsonl"
+    output = tmp_path / "results.jsonl"
+    checkpoint = tmp_path / "checkpoint.json"
+    _write_requests(requests, [f"n{i}" for i in range(10)])
+    args = ("helloworld.Greeter", "SayHello", str(requests), str(output))
+
+    stats = await replay(client, *args, checkpoint_path=str(checkpoint))
+    assert stats.records == 10
+    assert Checkpoint.load(str(checkpoint)).next_line == 10
+
+    # results written after the checkpoint by an interrupted run are dropped
+    with open(output, "a") as f:
+        f.write('{"line": 10, "resp')
+    _write_requests(requests, [f"n{i}" for i in range(10, 25)])
+    stats = await replay(
+        client, *args, checkpoint_path=str(checkpoint), checkpoint_every=4
+    )
+    assert (stats.records, stats.skipped) == (15, 10)
+    results = _read_results(output)
+    assert [result["line"] for result in results] == list(range(25))
+    assert results[24]["response"] == {"message": "Hello, n24!"}
+
+    stats = await replay(client, *args, checkpoint_path=str(checkpoint))
+    assert (stats.records, stats.skipped) == (0, 25)
+    assert len(_read_results(output)) == 25
+
+
+@pytest.mark.asyncio
+async def test_replay_needs_the_checkpointed_output(tmp_path):
+    client = _client()
+    requests = tmp_path / "requests.jsonl"
+    output = tmp_path / "results.jsonl"
+    checkpoint = tmp_path / "checkpoint.json"
+    _write_requests(requests, ["a", "b"])
+    args = ("helloworld.Greeter", "SayHello", str(requests), str(output))
+    await replay(client, *args, checkpoint_path=str(checkpoint))
+
+    output.write_text('{"line": 0')
+    with pytest.raises(ValueError, match="does not hold the results"):
+        await replay(client, *args, checkpoint_path=str(checkpoint))
+    output.unlink()
+    with pytest.raises(ValueError, match="does not hold the results"):
+        await replay(client, *args, checkpoint_path=str(checkpoint))
+    assert not output.exists()
+
+
+def test_progress_checkpoint_keeps_gaps():
+    progress = _Progress(None)
+    for line in (0, 1, 3, 4, 6):
+        progress.add(line)
+    checkpoint = progress.checkpoint(100, iter([2, 5]))
+    assert checkpoint == Checkpoint(next_line=2, done=(3, 4, 6), output_offset=100)
+
+    progress = _Progress(checkpoint)
+    assert progress.is_done(1) and progress.is_done(4)
+    assert not progress.is_done(2) and not progress.is_done(7)
+    progress.add(2)
+    progress.add(5)
+    assert progress.checkpoint(200, iter([])).next_line == 7
+
+
+@pytest.mark.asyncio
+async def test_replay_needs_unary_response(tmp_path):
+    with pytest.raises(ValueError):
+        await replay(
+            _client(),
+            "helloworld.Greeter",
+            "SayHelloGroup",
+            str(tmp_path / "requests.jsonl"),
+            str(tmp_path / "results.jsonl"),
+        )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "service, method", [("helloworld.Nope", "SayHello"), ("helloworld.Greeter", "Nope")]
+)
+async def test_replay_needs_an_available_method(tmp_path, service, method):
+    with pytest.raises(ValueError, match="Nope"):
+        await replay(
+            _client(),
+            service,
+            method,
+            str(tmp_path / "requests.jsonl"),
+            str(tmp_path / "results.jsonl"),
+        )
+
+
+def test_cli_replay(tmp_path, capsys):
+    requests = tmp_path / "requests.jsonl"
+    output = tmp_path / "results.jsonl"
+    _write_requests(requests, ["a", "b", "c"])
+    code = cli(
+        [
+            "replay",
+            "localhost:50051",
+            "helloworld.Greeter/SayHello",
+            str(requests),
+            str(output),
+            "--unordered",
+            "--checkpoint",
+            str(tmp_path / "checkpoint.json"),
+        ]
+    )
+    assert code == 0
+    assert "replayed 3 records" in capsys.readouterr().out
+    assert sorted(result["line"] for result in _read_results(output)) == [0, 1, 2]
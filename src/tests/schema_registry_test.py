@@ -0,0 +1,88 @@
+import logging
+
+from google.protobuf import descriptor_pb2, descriptor_pool
+from grpc_requests.client import Client
+from grpc_requests.schema_registry import (
+    SchemaRegistry,
+    ServiceSchema,
+    file_fingerprint,
+)
+from grpc_reflection.v1alpha import reflection_pb2
+from tests.test_servers.helloworld import helloworld_pb2
+
+"""
+Test cases for the schema registry shared by clients
+"""
+
+logger = logging.getLogger("name")
+
+
+def _pool_with_helloworld():
+    pool = descriptor_pool.DescriptorPool()
+    file_proto = descriptor_pb2.FileDescriptorProto()
+    helloworld_pb2.DESCRIPTOR.CopyToProto(file_proto)
+    pool.Add(file_proto)
+    return pool
+
+
+def test_fingerprint_is_pool_independent():
+    copied = _pool_with_helloworld().FindFileByName(helloworld_pb2.DESCRIPTOR.name)
+    assert file_fingerprint(copied) == file_fingerprint(helloworld_pb2.DESCRIPTOR)
+    assert file_fingerprint(descriptor_pb2.DESCRIPTOR) != file_fingerprint(
+        helloworld_pb2.DESCRIPTOR
+    )
+
+
+def test_schema_built_once_per_fingerprint():
+    registry = SchemaRegistry()
+    builds = []
+
+    def build(service_descriptor, fingerprint):
+        builds.append(service_descriptor.full_name)
+        return ServiceSchema(service_descriptor.full_name, fingerprint, ())
+
+    for pool in (_pool_with_helloworld(), _pool_with_helloworld()):
+        service = pool.FindServiceByName("helloworld.Greeter")
+        registry.get_or_create(service, build)
+    assert builds == ["helloworld.Greeter"]
+    # the default pool keeps its own schema
+    registry.get_or_create(helloworld_pb2.DESCRIPTOR.services_by_name["Greeter"], build)
+    assert len(builds) == 2
+    assert len(registry) == 2
+
+
+def test_registry_drops_least_recently_used_schemas():
+    registry = SchemaRegistry(maxsize=2)
+    builds = []
+
+    def build(service_descriptor, fingerprint):
+        builds.append(service_descriptor.full_name)
+        return ServiceSchema(service_descriptor.full_name, fingerprint, ())
+
+    greeter = _pool_with_helloworld().FindServiceByName("helloworld.Greeter")
+    services = [
+        greeter,
+        helloworld_pb2.DESCRIPTOR.services_by_name["Greeter"],
+        reflection_pb2.DESCRIPTOR.services_by_name["ServerReflection"],
+    ]
+    for service in services:
+        registry.get_or_create(service, build)
+    assert len(registry) == 2
+    registry.get_or_create(services[2], build)
+    assert len(builds) == 3
+    registry.get_or_create(greeter, build)
+    assert len(builds) == 4
+
+
+def test_clients_share_message_classes():
+    first = Client("localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool())
+    second = Client("localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool())
+    first_meta = first.get_method_meta("helloworld.Greeter", "SayHello")
+    second_meta = second.get_method_meta("helloworld.Greeter", "SayHello")
+    assert first_meta.input_type is second_meta.input_type
+    assert first_meta.output_type is second_meta.output_type
+    assert first_meta.handler is not second_meta.handler
+    assert first_meta.descriptor.containing_service.file.pool is first._desc_pool
+    assert second_meta.descriptor.containing_service.file.pool is second._desc_pool
+    response = second.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
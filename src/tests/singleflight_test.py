@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+import pytest
+from google.protobuf import descriptor_pool
+from grpc_requests.aio import AsyncClient
+from grpc_requests.client import Client
+from grpc_requests.singleflight import call_key
+from tests.test_servers.helloworld.helloworld_pb2 import HelloRequest
+
+"""
+Test cases for single-flight coalescing of identical unary calls
+"""
+
+logger = logging.getLogger("name")
+
+SERVICE = "helloworld.Greeter"
+SAY_HELLO = f"{SERVICE}/SayHello"
+
+
+def replace_handler(client, methods_meta, method, wrap):
+    meta = methods_meta[method]
+    client._service_methods_meta[SERVICE] = {
+        **methods_meta,
+        method: meta._replace(handler=wrap(meta.handler)),
+    }
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def coalescing_client():
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        idempotent_methods=[SAY_HELLO],
+    )
+    yield client
+    client.channel.close()
+
+
+def blocking_handler(calls, release, error=None):
+    def wrap(handler):
+        def call(request, **kwargs):
+            calls.append(request)
+            release.wait(5)
+            if error is not None:
+                raise error
+            return handler(request, **kwargs)
+
+        return call
+
+    return wrap
+
+
+def test_call_key():
+    request = HelloRequest(name="sinsky")
+    key = call_key(SAY_HELLO, request, False, {"metadata": [("b", "2"), ("a", "1")]})
+    assert key == call_key(
+        SAY_HELLO,
+        HelloRequest(name="sinsky"),
+        False,
+        {"metadata": [("a", "1"), ("b", "2")]},
+    )
+    assert key != call_key(SAY_HELLO, request, False, {"metadata": [("a", "2")]})
+    assert key != call_key(SAY_HELLO, request, True, {"metadata": [("a", "1")]})
+    assert call_key(SAY_HELLO, request, False, {"timeout": 1}) == call_key(
+        SAY_HELLO, request, False, {"timeout": 2}
+    )
+    assert call_key(
+        SAY_HELLO, request, False, {"metadata": [("x-request-id", "1")]}, frozenset()
+    ) == call_key(
+        SAY_HELLO, request, False, {"metadata": [("x-request-id", "2")]}, frozenset()
+    )
+    assert call_key(SAY_HELLO, request, False, {"wait_for_ready": True}) is None
+
+
+@pytest.mark.parametrize("bind", [False, True])
+def test_identical_calls_share_one_rpc(coalescing_client, bind):
+    calls = []
+    release = threading.Event()
+    replace_handler(
+        coalescing_client,
+        coalescing_client.get_methods_meta(SERVICE),
+        "SayHello",
+        blocking_handler(calls, release),
+    )
+    if bind:
+        call = coalescing_client.bind_method(SERVICE, "SayHello")
+    else:
+
+        def call(request):
+            return coalescing_client.request(SERVICE, "SayHello", request)
+
+    with ThreadPoolExecutor(5) as executor:
+        futures = [executor.submit(call, {"name": "sinsky"}) for _ in range(5)]
+        wait_for(lambda: coalescing_client._single_flight.coalesced == 4)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert results[0] == {"message": "Hello, sinsky!"}
+    assert all(result is results[0] for result in results)
+    # the flight is over, the next call makes its own rpc
+    call({"name": "sinsky"})
+    assert len(calls) == 2
+
+
+def test_errors_are_shared(coalescing_client):
+    calls = []
+    release = threading.Event()
+    error = ValueError("unavailable")
+    replace_handler(
+        coalescing_client,
+        coalescing_client.get_methods_meta(SERVICE),
+        "SayHello",
+        blocking_handler(calls, release, error),
+    )
+    with ThreadPoolExecutor(3) as executor:
+        futures = [
+            executor.submit(
+                coalescing_client.request, SERVICE, "SayHello", {"name": "sinsky"}
+            )
+            for _ in range(3)
+        ]
+        wait_for(lambda: coalescing_client._single_flight.coalesced == 2)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    assert len(calls) == 1
+
+
+def test_waiting_calls_keep_their_own_deadline(coalescing_client):
+    calls = []
+    release = threading.Event()
+    replace_handler(
+        coalescing_client,
+        coalescing_client.get_methods_meta(SERVICE),
+        "SayHello",
+        blocking_handler(calls, release),
+    )
+    request = {"name": "sinsky"}
+    with ThreadPoolExecutor(4) as executor:
+        leader = executor.submit(
+            coalescing_client.request, SERVICE, "SayHello", request
+        )
+        wait_for(lambda: len(calls) == 1)
+        # stops waiting for a call without deadline at its own deadline
+        with pytest.raises(grpc.RpcError) as err:
+            coalescing_client.request(SERVICE, "SayHello", request, timeout=0.1)
+        assert err.value.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+        assert coalescing_client._single_flight.coalesced == 1
+
+        # does not wait for a call with an earlier deadline, later calls share its own
+        other = {"name": "other"}
+        shorter = executor.submit(
+            coalescing_client.request, SERVICE, "SayHello", other, timeout=5
+        )
+        wait_for(lambda: len(calls) == 2)
+        longer = executor.submit(coalescing_client.request, SERVICE, "SayHello", other)
+        wait_for(lambda: len(calls) == 3)
+        assert coalescing_client._single_flight.coalesced == 1
+        shared = executor.submit(
+            coalescing_client.request, SERVICE, "SayHello", other, timeout=10
+        )
+        wait_for(lambda: coalescing_client._single_flight.coalesced == 2)
+        release.set()
+        assert leader.result() == {"message": "Hello, sinsky!"}
+        assert shorter.result() == longer.result() == shared.result()
+    assert len(calls) == 3
+
+
+def test_different_calls_are_not_shared(coalescing_client):
+    # each call waits for the other one, which only returns if both reach the server
+    barrier = threading.Barrier(2, timeout=5)
+
+    def wrap(handler):
+        def call(request, **kwargs):
+            barrier.wait()
+            return handler(request, **kwargs)
+
+        return call
+
+    replace_handler(
+        coalescing_client, coalescing_client.get_methods_meta(SERVICE), "SayHello", wrap
+    )
+    with ThreadPoolExecutor(2) as executor:
+        first = executor.submit(
+            coalescing_client.request, SERVICE, "SayHello", {"name": "sinsky"}
+        )
+        second = executor.submit(
+            coalescing_client.request,
+            SERVICE,
+            "SayHello",
+            {"name": "sinsky"},
+            metadata=[("authorization", "other")],
+        )
+        assert first.result() == second.result()
+    assert coalescing_client._single_flight.coalesced == 0
+
+
+def test_methods_not_idempotent_are_not_shared():
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        idempotent_methods=[f"{SERVICE}/SayHelloGroup"],
+    )
+    barrier = threading.Barrier(2, timeout=5)
+
+    def wrap(handler):
+        def call(request, **kwargs):
+            barrier.wait()
+            return handler(request, **kwargs)
+
+        return call
+
+    replace_handler(client, client.get_methods_meta(SERVICE), "SayHello", wrap)
+    with ThreadPoolExecutor(2) as executor:
+        futures = [
+            executor.submit(client.request, SERVICE, "SayHello", {"name": "sinsky"})
+            for _ in range(2)
+        ]
+        assert [future.result() for future in futures] == [
+            {"message": "Hello, sinsky!"}
+        ] * 2
+    # SayHelloGroup streams its responses, so it is never shared either
+    assert list(client.request(SERVICE, "SayHelloGroup", {"name": "a b"})) == [
+        {"message": "Hello, a!"},
+        {"message": "Hello, b!"},
+    ]
+    client.channel.close()
+
+
+@pytest.mark.asyncio
+async def test_async_identical_calls_share_one_rpc():
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        idempotent_methods=[SAY_HELLO],
+    )
+    calls = []
+    release = asyncio.Event()
+
+    def wrap(handler):
+        async def call(request, **kwargs):
+            calls.append(request)
+            await release.wait()
+            return await handler(request, **kwargs)
+
+        return call
+
+    replace_handler(client, await client.get_methods_meta(SERVICE), "SayHello", wrap)
+    bound = await client.bind_method(SERVICE, "SayHello")
+    tasks = [
+        asyncio.ensure_future(client.request(SERVICE, "SayHello", {"name": "sinsky"}))
+        for _ in range(3)
+    ]
+    tasks.append(asyncio.ensure_future(bound({"name": "sinsky"})))
+    while client._single_flight.coalesced < 3:
+        await asyncio.sleep(0.01)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert len(calls) == 1
+    assert client._single_flight.coalesced == 3
+    assert results == [{"message": "Hello, sinsky!"}] * 4
+    await client.channel.close()
+
+
+@pytest.mark.asyncio
+async def test_async_cancelled_caller_does_not_cancel_the_call():
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        idempotent_methods=[SAY_HELLO],
+    )
+    release = asyncio.Event()
+
+    def wrap(handler):
+        async def call(request, **kwargs):
+            await release.wait()
+            return await handler(request, **kwargs)
+
+        return call
+
+    replace_handler(client, await client.get_methods_meta(SERVICE), "SayHello", wrap)
+    first, second = (
+        asyncio.ensure_future(client.request(SERVICE, "SayHello", {"name": "sinsky"}))
+        for _ in range(2)
+    )
+    while client._single_flight.coalesced < 1:
+        await asyncio.sleep(0.01)
+    first.cancel()
+    release.set()
+    assert await second == {"message": "Hello, sinsky!"}
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    await client.channel.close()
+
+
+@pytest.mark.asyncio
+async def test_async_waiting_calls_keep_their_own_deadline():
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        idempotent_methods=[SAY_HELLO],
+    )
+    release = asyncio.Event()
+
+    def wrap(handler):
+        async def call(request, **kwargs):
+            await release.wait()
+            return await handler(request, **kwargs)
+
+        return call
+
+    replace_handler(client, await client.get_methods_meta(SERVICE), "SayHello", wrap)
+    leader = asyncio.ensure_future(
+        client.request(SERVICE, "SayHello", {"name": "sinsky"})
+    )
+    await asyncio.sleep(0)
+    with pytest.raises(grpc.RpcError) as err:
+        await client.request(SERVICE, "SayHello", {"name": "sinsky"}, timeout=0.1)
+    assert err.value.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+    assert client._single_flight.coalesced == 1
+    release.set()
+    assert await leader == {"message": "Hello, sinsky!"}
+    await client.channel.close()
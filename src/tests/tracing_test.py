@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import grpc
+import pytest
+from google.protobuf import descriptor_pool
+from grpc_requests.aio import AsyncClient, ExecutorMessageParsers
+from grpc_requests.client import Client, StubClient
+from grpc_requests.tracing import OpenTelemetryTracer, Tracer
+from tests.test_servers.client_tester import client_tester_pb2
+from tests.test_servers.helloworld.helloworld_pb2 import HelloReply, HelloRequest
+
+"""
+Test cases for client tracing hooks
+"""
+
+logger = logging.getLogger("name")
+
+SAY_HELLO = "helloworld.Greeter/SayHello"
+
+
+class RecordingTracer(Tracer):
+    def __init__(self):
+        self.rpcs = []
+        self.ended = {}
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def start_rpc(self, name, attributes):
+        with self._lock:
+            span = len(self.rpcs)
+            self.rpcs.append((name, attributes))
+        return span
+
+    def end_rpc(self, span, error=None):
+        with self._lock:
+            self.ended[span] = error
+
+    def inject(self, span, metadata):
+        return [*(metadata or ()), ("x-span", str(span))]
+
+    @contextmanager
+    def span(self, name, attributes):
+        with self._lock:
+            self.spans.append(name)
+        yield
+
+    def ended_names(self):
+        return [self.rpcs[span][0] for span in sorted(self.ended)]
+
+
+def test_rpc_spans():
+    tracer = RecordingTracer()
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        tracer=tracer,
+    )
+    assert "grpc_requests.reflection" in tracer.spans
+    assert "grpc_requests.resolve_services" in tracer.spans
+    assert "grpc_requests.register_file_descriptors" in tracer.spans
+    assert "grpc_requests.register_service" in tracer.spans
+    tracer.spans.clear()
+
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    name, attributes = tracer.rpcs[0]
+    assert name == SAY_HELLO
+    assert attributes == {
+        "rpc.system": "grpc",
+        "rpc.service": "helloworld.Greeter",
+        "rpc.method": "SayHello",
+    }
+    assert tracer.ended == {0: None}
+    assert tracer.spans == ["grpc_requests.encode", "grpc_requests.decode"]
+
+    # the span of a response stream ends with the stream
+    say_hello_group = client.bind_method("helloworld.Greeter", "SayHelloGroup")
+    responses = say_hello_group({"name": "a b"})
+    assert 1 not in tracer.ended
+    assert len(list(responses)) == 2
+    assert tracer.ended_names() == [SAY_HELLO, "helloworld.Greeter/SayHelloGroup"]
+
+
+def test_trace_context_is_injected_into_metadata():
+    tracer = RecordingTracer()
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        tracer=tracer,
+    )
+    say_hello = client.get_method_meta("helloworld.Greeter", "SayHello").handler
+    metadata = []
+
+    def call(request, **kwargs):
+        metadata.append(kwargs["metadata"])
+        return HelloReply(message="sent")
+
+    say_hello._multicallable = call
+    client.request(
+        "helloworld.Greeter", "SayHello", {}, metadata=[("x-user", "sinsky")]
+    )
+    assert metadata == [[("x-user", "sinsky"), ("x-span", "0")]]
+
+
+def test_rpc_span_records_errors():
+    tracer = RecordingTracer()
+    client = StubClient(
+        "localhost:50051",
+        service_descriptors=[
+            client_tester_pb2.DESCRIPTOR.services_by_name["ClientTester"]
+        ],
+        tracer=tracer,
+    )
+    with pytest.raises(grpc.RpcError):
+        client.request("client_tester.ClientTester", "TestUnaryUnary", {})
+    assert tracer.ended[0].code() == grpc.StatusCode.UNIMPLEMENTED
+
+
+def test_cancelled_future_ends_span():
+    tracer = RecordingTracer()
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        tracer=tracer,
+    )
+    release = threading.Event()
+
+    def requests():
+        # keeps the call in flight until it is cancelled
+        release.wait(5)
+        yield HelloRequest(name="sinsky")
+
+    hello_everyone = client.get_method_meta("helloworld.Greeter", "HelloEveryone")
+    future = hello_everyone.handler.future(requests())
+    assert future.cancel()
+    release.set()
+    # done callbacks run on a grpc thread
+    deadline = time.monotonic() + 5
+    while 0 not in tracer.ended and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert isinstance(tracer.ended[0], grpc.FutureCancelledError)
+
+
+def test_failed_future_call_ends_span():
+    tracer = RecordingTracer()
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        tracer=tracer,
+    )
+    say_hello = client.get_method_meta("helloworld.Greeter", "SayHello").handler
+    error = ValueError("cannot start call")
+
+    class Failing:
+        def future(self, *args, **kwargs):
+            raise error
+
+    say_hello._multicallable = Failing()
+    with pytest.raises(ValueError):
+        say_hello.future(HelloRequest())
+    assert tracer.ended == {0: error}
+
+
+def test_no_op_tracer():
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        tracer=Tracer(),
+    )
+    responses = client.request_many("helloworld.Greeter", "SayHello", [{}] * 3)
+    assert list(responses) == [{"message": "Hello, !"}] * 3
+
+
+def test_open_telemetry_tracer():
+    pytest.importorskip("opentelemetry.trace")
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        tracer=OpenTelemetryTracer(),
+    )
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("message_parsers", [None, ExecutorMessageParsers()])
+async def test_async_rpc_spans(message_parsers):
+    tracer = RecordingTracer()
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        message_parsers=message_parsers,
+        tracer=tracer,
+    )
+    greeter = await client.service("helloworld.Greeter")
+    assert "grpc_requests.resolve_services" in tracer.spans
+    assert "grpc_requests.reflection" in tracer.spans
+    tracer.spans.clear()
+
+    assert await greeter.SayHello({"name": "sinsky"}) == {"message": "Hello, sinsky!"}
+    assert tracer.ended_names() == [SAY_HELLO]
+    assert tracer.spans == ["grpc_requests.encode", "grpc_requests.decode"]
+
+    responses = [x async for x in await greeter.SayHelloOneByOne([{}, {}])]
+    assert len(responses) == 2
+    await greeter.HelloEveryone([{"name": "a"}, {"name": "b"}])
+    assert tracer.ended_names() == [
+        SAY_HELLO,
+        "helloworld.Greeter/SayHelloOneByOne",
+        "helloworld.Greeter/HelloEveryone",
+    ]
+    assert all(error is None for error in tracer.ended.values())
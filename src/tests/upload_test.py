@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+
+import grpc
+import pytest
+from google.protobuf import descriptor_pool
+from google.protobuf.json_format import ParseError
+from grpc_requests.aio import AsyncClient, ExecutorMessageParsers
+from grpc_requests.client import Client, CompiledMessageParsers
+from grpc_requests.codec import MessageEncoder
+from grpc_requests.upload import BufferedUpload
+from tests.test_servers.helloworld.helloworld_pb2 import HelloRequest
+
+"""
+Test cases for chunked stream_unary uploads
+"""
+
+logger = logging.getLogger("name")
+
+NAMES = [f"n{i}" for i in range(1000)]
+EXPECTED = {"message": f"Hello, {' '.join(NAMES)}!"}
+
+
+def _records():
+    for name in NAMES:
+        yield {"name": name}
+
+
+async def _async_records():
+    for name in NAMES:
+        yield {"name": name}
+
+
+def test_stream_upload():
+    client = Client("localhost:50051")
+    response, stats = client.stream_upload(
+        "helloworld.Greeter", "HelloEveryone", _records(), chunk_size=64
+    )
+    assert response == EXPECTED
+    assert stats.messages == len(NAMES)
+    assert stats.chunks == 16
+    assert stats.elapsed > 0
+    assert stats.messages_per_second > 0
+
+
+def test_stream_upload_raises_encoding_errors():
+    client = Client("localhost:50051")
+    records = [{"name": "a"}, {"unknown": "b"}]
+    with pytest.raises(ParseError):
+        client.stream_upload(
+            "helloworld.Greeter", "HelloEveryone", records, chunk_size=1
+        )
+    with pytest.raises(ValueError):
+        client.stream_upload("helloworld.Greeter", "SayHello", records)
+
+
+def test_buffered_upload_stops_producer_when_closed():
+    pulled = []
+
+    def records():
+        for i in range(1000):
+            pulled.append(i)
+            yield i
+
+    upload = BufferedUpload(list, chunk_size=1, buffer_chunks=1)
+    requests = upload.requests(records())
+    assert next(requests) == 0
+    requests.close()
+    time.sleep(0.3)
+    # the producer fills the buffer once more at most, then stops
+    assert len(pulled) <= 3
+    assert upload.stats().messages == 1
+
+
+def test_stream_upload_stops_producer_when_call_fails():
+    client = Client("localhost:50051")
+    producers = []
+
+    def records():
+        producers.append(threading.current_thread())
+        while True:
+            yield {"name": "sinsky"}
+
+    with pytest.raises(grpc.RpcError) as err:
+        client.stream_upload(
+            "helloworld.Greeter", "HelloEveryone", records(), timeout=0.5
+        )
+    assert err.value.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+    producers[0].join(5)
+    assert not producers[0].is_alive()
+
+
+@pytest.mark.parametrize("message_parsers", [None, CompiledMessageParsers()])
+def test_stream_upload_encodes_chunks_at_once(monkeypatch, message_parsers):
+    client = Client("localhost:50051", message_parsers=message_parsers)
+    encoded = []
+    encode_chunk = MessageEncoder.encode_chunk
+
+    def record_chunk(self, chunk, message_class):
+        encoded.append(len(chunk))
+        return encode_chunk(self, chunk, message_class)
+
+    monkeypatch.setattr(MessageEncoder, "encode_chunk", record_chunk)
+    response, _ = client.stream_upload(
+        "helloworld.Greeter",
+        "HelloEveryone",
+        [{"name": "a"}, None, HelloRequest(name="b")],
+        chunk_size=2,
+    )
+    assert response == {"message": "Hello, a  b!"}
+    assert encoded == [2, 1]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("records", [_records, _async_records])
+@pytest.mark.parametrize("message_parsers", [None, ExecutorMessageParsers()])
+async def test_async_stream_upload(records, message_parsers):
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        message_parsers=message_parsers,
+    )
+    response, stats = await client.stream_upload(
+        "helloworld.Greeter", "HelloEveryone", records(), chunk_size=100
+    )
+    assert response == EXPECTED
+    assert stats.messages == len(NAMES)
+    assert stats.chunks == 10
+
+
+@pytest.mark.asyncio
+async def test_async_stream_upload_raises_encoding_errors():
+    client = AsyncClient(
+        "localhost:50051", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    with pytest.raises(ParseError):
+        await client.stream_upload(
+            "helloworld.Greeter", "HelloEveryone", [{"unknown": "b"}]
+        )